@@ -0,0 +1,64 @@
+# Command line entry point: python -m benchmarks
+import argparse
+import os
+import sys
+
+from .harness import HeadlessDisplay, compare, load_baseline, save_baseline, unrecorded
+from .suite import DEFAULT_SIZES, run_suite
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MDX file manager at bucket scale")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="number of objects in each synthetic bucket")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance-scale", type=float, default=1.0,
+                        help="multiply relative tolerances, e.g. 2 on a noisy machine")
+    parser.add_argument("--no-tk", action="store_true", help="skip benchmarks that need a display")
+    parser.add_argument("--allow-new", action="store_true",
+                        help="pass even if some benchmarks have no baseline yet")
+    return parser.parse_args(argv)
+
+
+def format_results(results):
+    lines = []
+    for name, metrics in sorted(results.items()):
+        details = ", ".join(f"{metric}={value}" for metric, value in sorted(metrics.items()))
+        lines.append(f"{name:<24} {details}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with HeadlessDisplay() as display:
+        if not args.no_tk and not display.available:
+            # Skipping them silently would let render, filter and refresh regressions pass
+            print("No display or Xvfb for the Tk benchmarks; install Xvfb or pass --no-tk to skip them")
+            return 1
+        results = run_suite(args.sizes, args.repeat, not args.no_tk)
+    print(format_results(results))
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(args.baseline, baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    new = unrecorded(results, baseline)
+    for name in new:
+        print(f"NEW {name}: no baseline yet (run with --update-baseline to record it)")
+    regressions = compare(results, baseline, scale=args.tolerance_scale)
+    for name, metric, before, after in regressions:
+        print(f"REGRESSION {name} {metric}: {before} -> {after}")
+    return 1 if regressions or (new and not args.allow_new) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
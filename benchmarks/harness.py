@@ -0,0 +1,159 @@
+# Measurement helpers: wall time, Tk call counts, peak memory and baseline comparison
+import gc
+import json
+import os
+import shutil
+import subprocess
+import time
+import tracemalloc
+
+# Allowed slowdown before a result counts as a regression, per metric:
+# (relative tolerance, absolute slack)
+DEFAULT_TOLERANCES = {
+    "wall_s": (0.30, 0.05),
+    "tk_calls": (0.10, 50),
+    "peak_kib": (0.25, 256),
+    "requests": (0.0, 0),
+}
+
+
+class TkCallCounter:
+    """Stands in for `root.tk` and counts round trips into the Tcl interpreter.
+
+    Widgets copy `master.tk` when they are created, so install the counter
+    before building the UI.
+    """
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self._tkapp.eval(script)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+    @classmethod
+    def install(cls, root):
+        counter = cls(root.tk)
+        root.tk = counter
+        return counter
+
+
+class HeadlessDisplay:
+    """Makes a display available for Tk: the current one, or a private Xvfb server.
+
+    `available` is False when there is neither, and Tk benchmarks are skipped.
+    """
+
+    def __init__(self, display=":99"):
+        self.display = display
+        self._process = None
+        self._previous = os.environ.get("DISPLAY")
+
+    def __enter__(self):
+        if not self._previous and os.name == "posix" and shutil.which("Xvfb"):
+            self._process = subprocess.Popen(
+                ["Xvfb", self.display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            os.environ["DISPLAY"] = self.display
+            time.sleep(0.5)
+        return self
+
+    @property
+    def available(self):
+        if os.name != "posix":
+            return True
+        return bool(os.environ.get("DISPLAY"))
+
+    def __exit__(self, *exc):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            if self._previous is None:
+                os.environ.pop("DISPLAY", None)
+
+
+def measure(setup, run, teardown=None, repeat=3, trace_memory=True):
+    """Run `run(state)` against fresh `setup()` state and collect its metrics.
+
+    Wall time is the best of `repeat` untraced runs; peak memory comes from a
+    separate run under tracemalloc so tracing overhead never skews timings.
+    `run` may return a dict of extra counters (Tk calls, requests, ...), taken
+    from the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        try:
+            gc.collect()
+            start = time.perf_counter()
+            counters = run(state) or {}
+            elapsed = time.perf_counter() - start
+        finally:
+            if teardown is not None:
+                teardown(state)
+        if best is None or elapsed < best["wall_s"]:
+            best = {"wall_s": round(elapsed, 4), **counters}
+
+    if trace_memory:
+        state = setup()
+        try:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                run(state)
+                best["peak_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+            finally:
+                tracemalloc.stop()
+        finally:
+            if teardown is not None:
+                teardown(state)
+    return best
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def unrecorded(results, baseline):
+    """Names of benchmarks in `results` that have no baseline to be compared with."""
+    return sorted(name for name in results if not baseline.get(name))
+
+
+def compare(results, baseline, tolerances=DEFAULT_TOLERANCES, scale=1.0):
+    """Return (name, metric, baseline, current) for every metric past its tolerance.
+
+    `scale` multiplies every relative tolerance (e.g. 2.0 on a noisy machine).
+    Benchmarks or metrics missing from the baseline are not regressions (see
+    unrecorded).
+    """
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, value in sorted(metrics.items()):
+            if metric not in reference or metric not in tolerances:
+                continue
+            relative, absolute = tolerances[metric]
+            limit = reference[metric] * (1 + relative * scale) + absolute
+            if value > limit:
+                regressions.append((name, metric, reference[metric], value))
+    return regressions
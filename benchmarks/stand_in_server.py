@@ -0,0 +1,181 @@
+# Local stand-in for the Supabase Storage REST API, backed by MemoryStorageBackend
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from src.async_bridge import AsyncBridge
+from src.storage_backend import MemoryStorageBackend, StorageError, SupabaseStorageBackend
+
+STORAGE_PREFIX = "/storage/v1"
+
+
+class StandInStorageServer:
+    """Serves the subset of the Storage API that storage3 uses, over real HTTP.
+
+    Requests are answered from a MemoryStorageBackend so the Supabase client,
+    its connection pool and the app's error handling all run for real, but
+    without network access or credentials.
+    """
+
+    def __init__(self, backend=None, bucket="mdx-files", host="127.0.0.1", port=0):
+        self.backend = backend or MemoryStorageBackend()
+        self.bucket = bucket
+        self.requests = 0
+        self._bridge = AsyncBridge()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def storage_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{STORAGE_PREFIX}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stand-in-storage", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._bridge.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def create_backend(self, http_client=None):
+        """A SupabaseStorageBackend pointed at this server (use it from a single event loop)."""
+        from storage3 import AsyncStorageClient
+        from src.supabase_module import create_http_client
+
+        client = AsyncStorageClient(
+            self.storage_url,
+            {"apiKey": "stand-in", "Authorization": "Bearer stand-in"},
+            http_client=http_client or create_http_client(asynchronous=True),
+        )
+        return SupabaseStorageBackend(client.from_(self.bucket), label=f"stand-in:{self.bucket}")
+
+    def call(self, coro):
+        """Run a backend coroutine on the server's own event loop."""
+        with self._lock:
+            self.requests += 1
+        return self._bridge.run(coro)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get("content-length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _json(self, status, payload):
+                self._send(status, json.dumps(payload).encode())
+
+            def _error(self, error):
+                status = error.status or 500
+                self._json(status, {"statusCode": str(status), "error": "Error", "message": error.message})
+
+            def _route(self):
+                """Return (action, object path) for the request path."""
+                path = unquote(urlsplit(self.path).path)
+                if not path.startswith(STORAGE_PREFIX + "/object/"):
+                    return None, None
+                parts = path[len(STORAGE_PREFIX) + len("/object/"):].split("/")
+                if parts[0] in ("list", "move", "copy"):
+                    return parts[0], None
+                if parts[0] == "public":
+                    parts = parts[1:]
+                if parts[0] != server.bucket:
+                    return None, None
+                return "object", "/".join(parts[1:])
+
+            def _handle(self):
+                action, object_path = self._route()
+                body = self._body()
+                try:
+                    if action == "list" and self.command == "POST":
+                        options = json.loads(body or b"{}")
+                        entries = server.call(server.backend.list(
+                            options.get("prefix", ""), options.get("limit", 100), options.get("offset", 0)))
+                        self._json(200, entries)
+                    elif action in ("move", "copy") and self.command == "POST":
+                        options = json.loads(body)
+                        operation = getattr(server.backend, action)
+                        server.call(operation(options["sourceKey"], options["destinationKey"]))
+                        self._json(200, {"message": "Successfully moved" if action == "move" else "Successfully copied"})
+                    elif action == "object" and self.command in ("GET", "HEAD"):
+                        self._download(object_path)
+                    elif action == "object" and self.command in ("POST", "PUT"):
+                        self._upload(object_path, body)
+                    elif action == "object" and self.command == "DELETE":
+                        prefixes = json.loads(body).get("prefixes", [])
+                        self._json(200, server.call(server.backend.remove(prefixes)))
+                    else:
+                        self._json(404, {"statusCode": "404", "error": "Not Found", "message": "Route not found"})
+                except StorageError as e:
+                    self._error(e)
+
+            def _download(self, object_path):
+                data = server.call(server.backend.download(object_path))
+                byte_range = self.headers.get("range")
+                if byte_range and byte_range.startswith("bytes="):
+                    start, _, end = byte_range[len("bytes="):].partition("-")
+                    start = int(start)
+                    end = int(end) if end else len(data) - 1
+                    chunk = data[start:end + 1]
+                    self._send(206, chunk, "application/octet-stream", {
+                        "Accept-Ranges": "bytes",
+                        "Content-Range": f"bytes {start}-{start + len(chunk) - 1}/{len(data)}",
+                    })
+                else:
+                    self._send(200, data, "application/octet-stream", {"Accept-Ranges": "bytes"})
+
+            def _upload(self, object_path, body):
+                message = BytesParser(policy=default_policy).parsebytes(
+                    b"Content-Type: " + self.headers["content-type"].encode() + b"\r\n\r\n" + body)
+                data, content_type = b"", "application/octet-stream"
+                for part in message.iter_parts():
+                    if part.get_param("name", header="content-disposition") == "file":
+                        data = part.get_payload(decode=True) or b""
+                        content_type = part.get_content_type()
+                upsert = self.headers.get("x-upsert", "false") == "true"
+                if self.command == "PUT" or upsert:
+                    try:
+                        server.call(server.backend.update(object_path, data, content_type))
+                    except StorageError as e:
+                        if not (upsert and e.not_found):
+                            raise
+                        server.call(server.backend.upload(object_path, data, content_type))
+                else:
+                    server.call(server.backend.upload(object_path, data, content_type))
+                self._json(200, {"Key": f"{server.bucket}/{object_path}", "Id": object_path})
+
+            do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = _handle
+
+        return Handler
@@ -0,0 +1,204 @@
+# Benchmarks for listing, rendering, filtering and transfers at bucket scale
+import asyncio
+import time
+
+from src.storage_backend import MemoryStorageBackend, walk
+
+from .harness import TkCallCounter, measure
+from .stand_in_server import StandInStorageServer
+from .synthetic import synthetic_article, synthetic_backend, synthetic_listing
+
+DEFAULT_SIZES = (10_000, 100_000)
+TRANSFER_COUNT = 200
+TRANSFER_CONCURRENCY = 8
+SEARCH_QUERY = "throughput"
+# Give up on a Tk benchmark that has not settled after this long
+PUMP_TIMEOUT = 600.0
+
+
+async def _close(backend):
+    await backend.bucket._client.aclose()
+
+
+def _listing_benchmark(server, repeat):
+    def run(backend):
+        async def collect():
+            try:
+                return [entry async for entry in walk(backend, include_folders=True)]
+            finally:
+                await _close(backend)
+        before = server.requests
+        entries = asyncio.run(collect())
+        return {"entries": len(entries), "requests": server.requests - before}
+
+    return measure(server.create_backend, run, repeat=repeat)
+
+
+def _transfer_benchmarks(repeat):
+    """Concurrent uploads then streamed downloads of TRANSFER_COUNT articles."""
+    bodies = {f"bench/transfer-{i:04d}.mdx": synthetic_article(i) for i in range(TRANSFER_COUNT)}
+    results = {}
+
+    async def gather_limited(calls):
+        semaphore = asyncio.Semaphore(TRANSFER_CONCURRENCY)
+
+        async def limited(call):
+            async with semaphore:
+                return await call()
+        return await asyncio.gather(*(limited(call) for call in calls))
+
+    def upload_setup():
+        server = StandInStorageServer().start()
+        return server, server.create_backend()
+
+    def upload_run(state):
+        server, backend = state
+
+        async def upload_all():
+            try:
+                await gather_limited([
+                    (lambda p=path, d=data: backend.upload(p, d)) for path, data in bodies.items()])
+            finally:
+                await _close(backend)
+        asyncio.run(upload_all())
+        return {"bytes": sum(map(len, bodies.values()))}
+
+    def download_setup():
+        server = StandInStorageServer(MemoryStorageBackend(bodies)).start()
+        return server, server.create_backend()
+
+    def download_run(state):
+        server, backend = state
+
+        async def download_all():
+            sinks = [_CountingSink() for _ in bodies]
+            try:
+                await gather_limited([
+                    (lambda p=path, s=sink: backend.download_to(p, s)) for path, sink in zip(bodies, sinks)])
+            finally:
+                await _close(backend)
+            return sum(sink.written for sink in sinks)
+        return {"bytes": asyncio.run(download_all())}
+
+    def teardown(state):
+        state[0].stop()
+
+    results[f"upload[{TRANSFER_COUNT}]"] = measure(upload_setup, upload_run, teardown, repeat=repeat)
+    results[f"download[{TRANSFER_COUNT}]"] = measure(download_setup, download_run, teardown, repeat=repeat)
+    return results
+
+
+class _CountingSink:
+    """Binary file stand-in that only counts what is written."""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, chunk):
+        self.written += len(chunk)
+
+    def seek(self, offset):
+        self.written = offset
+
+    def truncate(self):
+        pass
+
+
+class _AppUnderTest:
+    """A withdrawn SupabaseMDXManager with a Tk call counter installed."""
+
+    def __init__(self, backend):
+        import tkinter as tk
+        from src.firestore_module import SupabaseMDXManager
+
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.counter = TkCallCounter.install(self.root)
+        self.listed = False
+        self.app = SupabaseMDXManager(self.root, backend=backend)
+        display_files = self.app.display_files
+
+        def display_and_flag(*args):
+            self.listed = True
+            display_files(*args)
+        self.app.display_files = display_and_flag
+        self.pump(lambda: self.listed and self.app.display_job is None)
+
+    def pump(self, done):
+        """Run the Tk event loop until `done()` is true."""
+        deadline = time.perf_counter() + PUMP_TIMEOUT
+        while not done():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("UI did not settle")
+            self.root.update()
+
+    def settle(self):
+        """Let any outstanding display job finish, then start counting from zero."""
+        self.pump(lambda: self.app.display_job is None and not self.app.ui.pending)
+        self.counter.calls = 0
+
+    def close(self):
+        self.app.io.close()
+        self.root.destroy()
+
+
+def _tk_benchmarks(server, size, repeat):
+    listing = synthetic_listing(size)
+    results = {}
+
+    def fresh_app():
+        state = _AppUnderTest(MemoryStorageBackend())
+        state.settle()
+        return state
+
+    def render(state):
+        state.app.display_files(listing)
+        state.pump(lambda: state.app.display_job is None)
+        return {"tk_calls": state.counter.calls}
+
+    def rendered_app():
+        state = fresh_app()
+        render(state)
+        state.settle()
+        return state
+
+    def search(state):
+        # Typing a query fires filter_files through the search variable trace
+        state.app.search_var.set(SEARCH_QUERY)
+        state.root.update_idletasks()
+        return {"tk_calls": state.counter.calls}
+
+    def connected_app():
+        state = _AppUnderTest(server.create_backend())
+        state.settle()
+        state.listed = False
+        return state
+
+    def refresh(state):
+        state.app.refresh_file_list()
+        state.pump(lambda: state.listed and state.app.display_job is None)
+        return {"tk_calls": state.counter.calls}
+
+    def close(state):
+        state.close()
+
+    results[f"render[{size}]"] = measure(fresh_app, render, close, repeat=repeat)
+    results[f"filter[{size}]"] = measure(rendered_app, search, close, repeat=repeat)
+    results[f"refresh[{size}]"] = measure(connected_app, refresh, close, repeat=repeat)
+    return results
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=3, with_tk=True, log=print):
+    """Run every benchmark and return {name: metrics}."""
+    results = {}
+    for size in sizes:
+        log(f"Preparing a bucket with {size} objects...")
+        with StandInStorageServer(synthetic_backend(size)) as server:
+            log(f"  listing[{size}]")
+            results[f"listing[{size}]"] = _listing_benchmark(server, repeat)
+            if with_tk:
+                log(f"  render/filter/refresh[{size}]")
+                results.update(_tk_benchmarks(server, size, repeat))
+    log(f"Transfers of {TRANSFER_COUNT} objects...")
+    results.update(_transfer_benchmarks(repeat))
+    return results
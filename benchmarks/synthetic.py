@@ -0,0 +1,54 @@
+# Deterministic synthetic bucket contents for benchmarks
+import random
+
+from src.storage_backend import MemoryStorageBackend, guess_content_type
+
+SECTIONS = ["posts", "docs", "guides", "changelog", "drafts"]
+WORDS = ("supabase storage bucket markdown component layout render stream cache "
+         "folder upload index search filter listing latency throughput").split()
+
+
+def synthetic_paths(count, seed=0, files_per_folder=200):
+    """`count` object paths spread over nested folders, e.g. posts/2023/07/slug-00042.mdx."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        folder = i // files_per_folder
+        section = SECTIONS[folder % len(SECTIONS)]
+        year = 2015 + (folder // len(SECTIONS)) % 10
+        month = 1 + folder % 12
+        slug = "-".join(rng.sample(WORDS, 2))
+        extension = ".mdx" if i % 4 else ".md"
+        paths.append(f"{section}/{year}/{month:02d}/{slug}-{i:06d}{extension}")
+    return paths
+
+
+def synthetic_article(index, paragraphs=6, seed=0):
+    """MDX body of a few KiB with front matter, headings and prose."""
+    rng = random.Random(seed * 1_000_003 + index)
+    lines = ["---", f"title: Article {index}", f"slug: article-{index}", "---", ""]
+    for p in range(paragraphs):
+        lines.append(f"## Section {p + 1}")
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(80)))
+        lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+def synthetic_backend(count, seed=0, body_size=256):
+    """A MemoryStorageBackend holding `count` objects of roughly `body_size` bytes."""
+    backend = MemoryStorageBackend(label=f"synthetic-{count}")
+    filler = (b"# synthetic\n" * (body_size // 12 + 1))[:body_size]
+    for path in synthetic_paths(count, seed):
+        backend._put(path, filler, guess_content_type(path))
+    return backend
+
+
+def synthetic_listing(count, seed=0):
+    """The walk() output the app would receive for a synthetic bucket, without any I/O."""
+    import asyncio
+    from src.storage_backend import walk
+
+    async def collect():
+        return [entry async for entry in walk(synthetic_backend(count, seed), include_folders=True)]
+
+    return asyncio.run(collect())
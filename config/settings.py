@@ -1,2 +1,139 @@
 # Configuration settings for BlogDesktopApp
 # Add your configuration variables here
+
+# Storage HTTP client
+# One pooled keep-alive client is shared by every storage call.
+STORAGE_POOL_MAX_CONNECTIONS = 20      # open connections at most
+STORAGE_POOL_MAX_KEEPALIVE = 10        # idle connections kept warm between calls
+STORAGE_KEEPALIVE_EXPIRY = 60.0        # seconds before an idle connection is closed
+STORAGE_CONNECT_TIMEOUT = 10.0         # seconds
+STORAGE_READ_TIMEOUT = 60.0            # seconds, also used for writes and pool waits
+STORAGE_RETRIES = 2                    # retries for failed connection attempts
+STORAGE_HTTP2 = True                   # negotiate HTTP/2 when the h2 package is installed
+
+# Request governor
+# Every storage call waits for a slot; the number of slots grows while responses
+# stay fast and is halved on 429/5xx, network errors or a latency spike.
+GOVERNOR_INITIAL_LIMIT = 4             # requests in flight at start
+GOVERNOR_MIN_LIMIT = 1
+GOVERNOR_MAX_LIMIT = STORAGE_POOL_MAX_CONNECTIONS
+GOVERNOR_BACKOFF = 0.5                 # factor applied to the limit on congestion
+GOVERNOR_LATENCY_TOLERANCE = 3.0       # slower than this many times the recent best counts as congestion
+GOVERNOR_LATENCY_FLOOR = 0.05          # seconds; faster responses never count as congestion
+GOVERNOR_LATENCY_WINDOW = 100          # recent responses per operation the best is taken from
+STORAGE_CALL_RETRIES = 4               # retries of rate-limited (429) or, when idempotent, transiently failed calls
+STORAGE_RETRY_BASE_DELAY = 0.25        # seconds; doubles per retry, with full jitter
+STORAGE_RETRY_MAX_DELAY = 20.0         # seconds; a server's Retry-After is honoured as given
+
+# Storage backend
+# "supabase", "local" (plain files under LOCAL_STORAGE_ROOT) or "memory"
+STORAGE_BACKEND = "supabase"
+STORAGE_BUCKET = "mdx-files"
+# Buckets opened as workspaces. secrets.json can instead list projects, each with
+# its own URL, key and buckets:
+#   {"projects": {"staging": {"supabase_url": ..., "firestore_key": ..., "buckets": [...]}}}
+STORAGE_BUCKETS = (STORAGE_BUCKET,)
+LOCAL_STORAGE_ROOT = "local-storage"   # relative to the working directory
+
+# Signed URLs, for a private bucket
+# The URL column and "Copy URL" then show signed URLs, signed many paths per
+# request and cached until shortly before they expire.
+SIGNED_URLS = False
+SIGNED_URL_EXPIRES = 3600              # seconds a signed URL stays valid
+SIGNED_URL_REFRESH_MARGIN = 300        # seconds before expiry a URL is re-signed in the background
+SIGNED_URL_BATCH_SIZE = 500            # paths signed per request
+
+# Simulated network conditions for the local and memory backends
+SIMULATED_LATENCY = 0.0                # seconds added to every call
+SIMULATED_JITTER = 0.0                 # extra random delay, up to this many seconds
+SIMULATED_FAILURE_RATE = 0.0           # fraction of calls that fail with a 503
+SIMULATED_SEED = None                  # fix for reproducible runs
+
+# Diagnostics
+METRICS_ENABLED = True                 # time storage calls and heavy UI methods
+METRICS_SAMPLE_WINDOW = 1024           # recent samples kept per span for percentiles
+
+# Profiling (hidden menu: Ctrl+Shift+D, or `python src/main.py --profile DIR`)
+PROFILE_DIR = "profiles"               # where .pstats and allocation reports are written
+PROFILE_TOP_ALLOCATIONS = 40           # lines in each allocation-diff report
+PROFILE_SEARCH_IDLE_MS = 1500          # a search profile ends this long after the last keystroke
+
+# Local cache and state (relative to the working directory)
+CACHE_DIR = ".mdx-cache"
+HASH_MANIFEST_FILE = "hashes.json"     # content hashes of remote objects, in CACHE_DIR
+
+# Uploads and folder sync
+BULK_UPLOAD_CONCURRENCY = 16           # files in progress at once by "Upload Folder" and "Sync Folder";
+                                       # the request governor decides how many requests are in flight
+HASH_CHUNK_SIZE = 1024 * 1024          # bytes read per step when hashing local files
+LOCAL_IGNORE_NAMES = (".git", ".mdx-cache", ".DS_Store", "__pycache__")  # never uploaded or synced
+
+# Manifest export ("Export" button, or `python src/main.py --export FILE`)
+MANIFEST_BATCH_SIZE = 500              # rows written (and URLs signed) per step; an
+                                       # interrupted export resumes after the last full step
+
+# Find and replace
+BULK_REPLACE_CONCURRENCY = 8           # files downloaded or uploaded at once; originals of replaced
+                                       # files are kept in CACHE_DIR/journals for rollback
+
+# Cache-Control of uploaded objects
+# Every upload and update gets the value of the longest prefix its path starts
+# with, else the default. Supabase keeps "max-age=<seconds>" plus any directives
+# after it, so each value must start with max-age. "Apply Cache Policy" (or
+# `python src/main.py --apply-cache-policy`) updates objects uploaded before a change.
+CACHE_CONTROL_DEFAULT = "max-age=3600"   # Supabase's own default
+CACHE_CONTROL_POLICIES = (
+    ("assets/", "max-age=31536000, immutable"),  # content-hashed names, never rewritten
+    ("images/", "max-age=604800"),
+    ("posts/", "max-age=300"),                   # articles are edited in place
+)
+CACHE_POLICY_CONCURRENCY = 8           # objects re-uploaded at once by "Apply Cache Policy"
+
+# Prefetching
+# While a file is open, its neighbours in the folder, the row under the mouse and
+# recently saved files are downloaded into CACHE_DIR/content in the background.
+PREFETCH_ENABLED = True
+PREFETCH_MAX_BYTES = 2 * 1024 * 1024   # bytes downloaded per round; a new round cancels the last
+PREFETCH_CONCURRENCY = 2               # prefetch downloads at once
+PREFETCH_RESERVED_SLOTS = 1            # governor slots prefetching leaves free for the user
+PREFETCH_IDLE_POLL = 0.05              # seconds between checks for a free slot
+PREFETCH_SIBLINGS = 5                  # files after (then before) the open one
+PREFETCH_RECENT = 10                   # recently saved files fetched after a listing
+PREFETCH_HOVER_MS = 250                # pointer rest on a row before it is prefetched
+
+# Reference graph
+# Links, images and imports in articles are indexed in CACHE_DIR/references so
+# deletes warn about articles that still use a file and "Check Links" lists broken
+# links and unreferenced assets. A scan only downloads articles changed since the last.
+REFERENCES_ENABLED = True
+REFERENCE_SOURCE_EXTENSIONS = (".mdx", ".md")  # files parsed for references
+REFERENCE_SCAN_CONCURRENCY = 4         # articles downloaded at once by a scan
+
+# Compression
+# Text content can be stored gzip- or zstd-compressed (zstd needs the zstandard
+# package). Off by default: Storage cannot send a Content-Encoding, so compressed
+# objects are stored as application/gzip or application/zstd, with the original
+# type and the encoding in their metadata, and their URLs serve archives, not text.
+UPLOAD_COMPRESSION = None              # None, "gzip" or "zstd"
+COMPRESSION_MIN_SIZE = 1024            # bytes; smaller uploads are sent as they are
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+COMPRESSION_WORKERS = 2                # threads compressing uploads and cache entries
+CONTENT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # compressed file contents kept in CACHE_DIR/content
+
+# Revision history
+# Files are recorded in CACHE_DIR/revisions each time they are viewed, saved or
+# restored (large, read-only files excepted), for diffs and restores without a download.
+REVISIONS_ENABLED = True
+REVISIONS_PER_FILE = 50                # older revisions of a file are dropped
+REVISIONS_KEYFRAME_INTERVAL = 10       # every Nth revision is stored whole, the rest as deltas
+REVISIONS_MAX_BYTES = 64 * 1024 * 1024 # least recently changed histories are dropped beyond this
+
+# Image variants (needs the Pillow package; skipped without it)
+# Uploaded PNG/JPEG images also get WebP copies named <name>.w<width>.webp,
+# one per width below the original plus one at full size.
+IMAGE_VARIANTS_ENABLED = True
+IMAGE_VARIANT_WIDTHS = (480, 960, 1600)
+IMAGE_WEBP_QUALITY = 80
+IMAGE_WORKERS = 2                      # processes encoding variants
+IMAGE_CACHE_MAX_BYTES = 128 * 1024 * 1024  # encoded variants kept in CACHE_DIR/images
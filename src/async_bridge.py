@@ -0,0 +1,95 @@
+# Module for running storage I/O on one asyncio loop and handing results back to Tk
+import asyncio
+import queue
+import sys
+import threading
+import traceback
+
+# How often (ms) the Tk side checks for finished operations
+POLL_INTERVAL_MS = 10
+
+
+class AsyncBridge:
+    """Runs coroutines on a dedicated event-loop thread.
+
+    Completions are put on a thread-safe queue and the callbacks run on the
+    Tk thread when `pump()` drains it, so widgets are only ever touched from
+    the thread that owns them. Pass `deliver` (e.g. UIDispatcher.post) to hand
+    completions to another thread-safe queue instead.
+    """
+
+    def __init__(self, deliver=None):
+        self.loop = asyncio.new_event_loop()
+        self._completions = queue.SimpleQueue()
+        if deliver is not None:
+            self.deliver = deliver
+        self._root = None
+        self._thread = threading.Thread(target=self._run_loop, name="storage-io", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro, on_success=None, on_error=None):
+        """Schedule `coro` on the I/O loop; callbacks receive the result or exception on the Tk thread."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(lambda f: self._complete(f, on_success, on_error))
+        return future
+
+    def run(self, coro, timeout=None):
+        """Run `coro` on the I/O loop and block until it finishes (for non-UI callers)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def deliver(self, callback, *args):
+        """Queue `callback(*args)` to run on the Tk thread."""
+        self._completions.put((callback, args))
+
+    def _complete(self, future, on_success, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                self.deliver(on_error, error)
+        elif on_success is not None:
+            self.deliver(on_success, future.result())
+
+    def attach(self, root, interval_ms=POLL_INTERVAL_MS):
+        """Start draining completions from the Tk event loop of `root`."""
+        self._root = root
+        self._interval_ms = interval_ms
+        self._poll()
+
+    def _poll(self):
+        try:
+            self.pump()
+        finally:
+            self._root.after(self._interval_ms, self._poll)
+
+    def pump(self):
+        """Run every queued completion callback; returns how many ran.
+
+        A callback that raises is reported (through Tk once attached) and the
+        remaining ones still run.
+        """
+        ran = 0
+        while True:
+            try:
+                callback, args = self._completions.get_nowait()
+            except queue.Empty:
+                return ran
+            try:
+                callback(*args)
+            except Exception:
+                if self._root is not None:
+                    self._root.report_callback_exception(*sys.exc_info())
+                else:
+                    traceback.print_exc()
+            ran += 1
+
+    def close(self, timeout=5):
+        """Stop the event loop and wait for its thread to exit."""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,345 @@
+# Module for find-and-replace across many files, previewed as diffs and undoable from a journal
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from . import config
+from .compression import COMPRESSIBLE_TYPES, decode, encode
+from .content_hash import hash_bytes
+from .image_pipeline import detect_content_type
+from .paged_viewer import is_large_file
+from .revisions import diff_text
+from .storage_backend import LIST_PAGE_SIZE, StorageError, guess_content_type
+
+
+class Replacement:
+    """What to find and what to put in its place: literal text, or a regex with \\1-style groups."""
+
+    def __init__(self, find, replace, regex=False, ignore_case=False):
+        if not find:
+            raise ValueError("Nothing to find")
+        self.find = find
+        self.replace = replace
+        self.regex = regex
+        self.ignore_case = ignore_case
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        try:
+            self.pattern = re.compile(find if regex else re.escape(find), flags)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}") from None
+        # Literal replacements are inserted as they are, backslashes included
+        self._template = replace if regex else (lambda match: replace)
+
+    def apply(self, text):
+        """(new text, number of replacements)."""
+        try:
+            return self.pattern.subn(self._template, text)
+        except (re.error, IndexError) as e:
+            raise ValueError(f"Invalid replacement: {e}") from None
+
+    def describe(self):
+        kind = "regex" if self.regex else "text"
+        return f"{kind} {self.find!r} -> {self.replace!r}" + (" (ignore case)" if self.ignore_case else "")
+
+
+def is_text(path):
+    return guess_content_type(path).startswith(COMPRESSIBLE_TYPES)
+
+
+class FileChange:
+    """One file the replacement changes: its content before and after."""
+
+    __slots__ = ("path", "etag", "before", "after", "count")
+
+    def __init__(self, path, etag, before, after, count):
+        self.path = path
+        self.etag = etag
+        self.before = before
+        self.after = after
+        self.count = count
+
+    def diff(self):
+        return diff_text(self.before, self.after, f"a/{self.path}", f"b/{self.path}")
+
+
+class TransformPlan:
+    """Result of a dry run: files that would change, files left as they are, files not read."""
+
+    def __init__(self, replacement):
+        self.replacement = replacement
+        self.changes = []
+        self.unchanged = 0
+        self.skipped = []
+        self.failed = []
+
+    def __len__(self):
+        return len(self.changes)
+
+    def summary(self):
+        replacements = sum(change.count for change in self.changes)
+        parts = [f"{replacements} replacement(s) in {len(self.changes)} file(s)", f"{self.unchanged} unchanged"]
+        if self.skipped:
+            parts.append(f"{len(self.skipped)} skipped")
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed")
+        return ", ".join(parts)
+
+
+class ReplaceReport:
+    """What applying a plan did; entries are (path, stored size, stored MD5, content type, encoding) of written files."""
+
+    __slots__ = ("applied", "conflicts", "failed", "entries")
+
+    def __init__(self):
+        self.applied = 0
+        self.conflicts = []
+        self.failed = []
+        self.entries = []
+
+
+async def preview(backend, entries, replacement, concurrency=None, on_progress=None):
+    """Download, transform and diff `entries` without writing anything; returns a TransformPlan.
+
+    Files that are not text (by extension), too large for the editor or not
+    valid UTF-8 are skipped. `on_progress(done, total)` is called from the
+    event loop after each file.
+    """
+    plan = TransformPlan(replacement)
+    semaphore = asyncio.Semaphore(concurrency or config.BULK_REPLACE_CONCURRENCY)
+    candidates = []
+    for entry in entries:
+        if entry.is_folder:
+            continue
+        if not is_text(entry.path) or is_large_file(entry.size):
+            plan.skipped.append((entry.path, "not a text file" if not is_text(entry.path) else "too large"))
+        else:
+            candidates.append(entry)
+    # Metadata as listed now rather than when the tree was loaded, for the conflict check in apply_changes
+    listed = await current_metadata(backend, [entry.path for entry in candidates])
+    done = 0
+
+    async def preview_one(entry):
+        nonlocal done
+        async with semaphore:
+            try:
+                metadata = listed.get(entry.path, {})
+                before = await decode(await backend.download(entry.path), metadata.get("contentEncoding"))
+                try:
+                    text = before.decode("utf-8")
+                except UnicodeDecodeError:
+                    plan.skipped.append((entry.path, "not UTF-8"))
+                else:
+                    after, count = await asyncio.to_thread(replacement.apply, text)
+                    if count and after != text:
+                        plan.changes.append(FileChange(entry.path, metadata.get("eTag"), before,
+                                                       after.encode("utf-8"), count))
+                    else:
+                        plan.unchanged += 1
+            except (StorageError, ValueError) as e:
+                plan.failed.append((entry.path, str(e)))
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(candidates))
+
+    await asyncio.gather(*(preview_one(entry) for entry in candidates))
+    plan.changes.sort(key=lambda change: change.path)
+    return plan
+
+
+async def current_metadata(backend, paths):
+    """{path: listing metadata} as the bucket lists them now, one listing per folder involved."""
+    folders = {}
+    for path in paths:
+        folder, _, name = path.rpartition("/")
+        folders.setdefault(folder, set()).add(name)
+    listed = {}
+    for folder, names in folders.items():
+        offset = 0
+        while True:
+            page = await backend.list(folder, limit=LIST_PAGE_SIZE, offset=offset)
+            for entry in page:
+                if entry["name"] in names and entry.get("id") is not None:
+                    path = f"{folder}/{entry['name']}" if folder else entry["name"]
+                    listed[path] = entry.get("metadata") or {}
+            if len(page) < LIST_PAGE_SIZE:
+                break
+            offset += len(page)
+    return listed
+
+
+async def _mark(journal, report, path, status, verb):
+    """Note a written file's new status; the file counts as failed too if the journal cannot be saved."""
+    try:
+        await asyncio.to_thread(journal.mark, path, status)
+    except OSError as e:
+        report.failed.append((path, f"{verb}, but the journal could not record it: {e}"))
+
+
+async def apply_changes(backend, plan, journal, concurrency=None, on_progress=None):
+    """Upload the changed files of a previewed plan; returns a ReplaceReport.
+
+    Files changed in the bucket since the preview (their eTag moved) are left
+    alone and reported as conflicts. Each file's original content is saved in
+    `journal` before it is overwritten, so the run can be rolled back; a file
+    whose original cannot be saved is reported as failed and left as it is.
+    """
+    report = ReplaceReport()
+    semaphore = asyncio.Semaphore(concurrency or config.BULK_REPLACE_CONCURRENCY)
+    listed = await current_metadata(backend, [change.path for change in plan.changes])
+    done = 0
+
+    async def apply_one(change):
+        nonlocal done
+        async with semaphore:
+            try:
+                if listed.get(change.path, {}).get("eTag") != change.etag:
+                    report.conflicts.append((change.path, "changed in the bucket since the preview"))
+                else:
+                    content_type = detect_content_type(change.after, change.path)
+                    payload, encoding = await encode(change.after, content_type)
+                    try:
+                        await asyncio.to_thread(journal.record, change.path, change.before, change.after)
+                    except OSError as e:
+                        # A file whose original is not kept is never overwritten
+                        report.failed.append((change.path, f"original could not be kept: {e}"))
+                    else:
+                        await backend.update(change.path, payload, content_type, content_encoding=encoding)
+                        report.applied += 1
+                        report.entries.append((change.path, len(payload), await asyncio.to_thread(hash_bytes, payload),
+                                               content_type, encoding))
+                        await _mark(journal, report, change.path, "applied", "replaced")
+            except StorageError as e:
+                report.failed.append((change.path, str(e)))
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(plan.changes))
+
+    await asyncio.gather(*(apply_one(change) for change in plan.changes))
+    return report
+
+
+class ReplaceJournal:
+    """Original contents of the files one find-and-replace overwrote, kept under CACHE_DIR/journals.
+
+    A journal is a directory with journal.json (the bucket, the replacement
+    and each file's status) and the original bytes of every file, gzipped.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        with open(os.path.join(directory, "journal.json"), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+
+    @classmethod
+    def create(cls, bucket, description, root=None):
+        root = root or os.path.join(config.CACHE_DIR, "journals")
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for n in range(1000):
+            directory = os.path.join(root, f"{stamp}-{n}")
+            try:
+                os.makedirs(directory)
+                break
+            except FileExistsError:
+                continue
+        index = {"bucket": bucket, "description": description, "time": time.time(), "files": {}}
+        with open(os.path.join(directory, "journal.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        return cls(directory)
+
+    @classmethod
+    def history(cls, bucket, root=None):
+        """Journals of `bucket`, newest first."""
+        root = root or os.path.join(config.CACHE_DIR, "journals")
+        journals = []
+        try:
+            names = sorted(os.listdir(root), reverse=True)
+        except OSError:
+            return []
+        for name in names:
+            try:
+                journal = cls(os.path.join(root, name))
+            except (OSError, ValueError):
+                continue
+            if journal.index["bucket"] == bucket:
+                journals.append(journal)
+        return journals
+
+    @property
+    def description(self):
+        return self.index["description"]
+
+    def _save(self):
+        tmp_path = os.path.join(self.directory, "journal.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.directory, "journal.json"))
+
+    def _blob(self, path):
+        return os.path.join(self.directory, hashlib.sha1(path.encode("utf-8")).hexdigest()[:20] + ".gz")
+
+    def record(self, path, before, after):
+        """Keep `before` and note the file as about to be replaced."""
+        with open(self._blob(path), "wb") as f:
+            f.write(gzip.compress(before, mtime=0))
+        with self._lock:
+            self.index["files"][path] = {"status": "pending", "before": hash_bytes(before), "after": hash_bytes(after)}
+            self._save()
+
+    def mark(self, path, status):
+        with self._lock:
+            self.index["files"][path]["status"] = status
+            self._save()
+
+    def original(self, path):
+        with open(self._blob(path), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def applied(self):
+        return sorted(path for path, item in self.index["files"].items() if item["status"] == "applied")
+
+
+async def rollback(backend, journal, concurrency=None, on_progress=None):
+    """Put back the originals of a journal's files that still hold the replaced content.
+
+    Files edited since the replacement are reported as conflicts and left as
+    they are. Returns a ReplaceReport.
+    """
+    report = ReplaceReport()
+    semaphore = asyncio.Semaphore(concurrency or config.BULK_REPLACE_CONCURRENCY)
+    paths = journal.applied()
+    listed = await current_metadata(backend, paths)
+    done = 0
+
+    async def rollback_one(path):
+        nonlocal done
+        async with semaphore:
+            try:
+                current = await decode(await backend.download(path), listed.get(path, {}).get("contentEncoding"))
+                if hash_bytes(current) != journal.index["files"][path]["after"]:
+                    report.conflicts.append((path, "changed since the replacement"))
+                else:
+                    before = await asyncio.to_thread(journal.original, path)
+                    content_type = detect_content_type(before, path)
+                    payload, encoding = await encode(before, content_type)
+                    await backend.update(path, payload, content_type, content_encoding=encoding)
+                    report.applied += 1
+                    report.entries.append((path, len(payload), await asyncio.to_thread(hash_bytes, payload),
+                                           content_type, encoding))
+                    await _mark(journal, report, path, "rolled back", "restored")
+            except StorageError as e:
+                report.failed.append((path, str(e)))
+            except OSError as e:
+                # The original is missing or unreadable; the file is left as it is
+                report.failed.append((path, f"original could not be read: {e}"))
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(paths))
+
+    await asyncio.gather(*(rollback_one(path) for path in paths))
+    return report
@@ -0,0 +1,98 @@
+# Module for uploading many local files at once, skipping unchanged ones
+import asyncio
+import os
+
+from . import config
+from .compression import encode
+from .content_hash import hash_bytes
+from .image_pipeline import detect_content_type, publish_variants
+from .storage_backend import StorageError
+
+
+class UploadReport:
+    """What a bulk upload did: files and bytes sent, skipped as unchanged, or failed."""
+
+    __slots__ = ("uploaded", "variants", "skipped", "failed", "bytes_sent", "bytes_avoided", "entries")
+
+    def __init__(self):
+        self.uploaded = 0
+        self.variants = 0
+        self.skipped = 0
+        self.failed = []
+        self.bytes_sent = 0
+        self.bytes_avoided = 0
+        # (remote path, stored size, stored MD5, content type, encoding) of every file sent
+        self.entries = []
+
+
+def local_files(directory, prefix="", ignore=None):
+    """(local path, remote path) for every file below `directory`, remote paths under `prefix`.
+
+    Files and folders named in `ignore` (default: LOCAL_IGNORE_NAMES) are left out.
+    """
+    prefix = prefix.strip("/")
+    ignore = set(config.LOCAL_IGNORE_NAMES if ignore is None else ignore)
+    pairs = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if d not in ignore)
+        for filename in sorted(f for f in filenames if f not in ignore):
+            local_path = os.path.join(dirpath, filename)
+            relative = os.path.relpath(local_path, directory).replace(os.sep, "/")
+            pairs.append((local_path, f"{prefix}/{relative}" if prefix else relative))
+    return pairs
+
+
+async def upload_files(backend, pairs, known_digests, concurrency=4, on_progress=None, variant_cache=None):
+    """Upload (local path, remote path) pairs, at most `concurrency` at a time.
+
+    `known_digests` maps remote paths that already exist to the MD5 of their
+    stored bytes (None when unknown); files whose payload, compressed as
+    UPLOAD_COMPRESSION says, hashes the same are not sent. Existing objects are
+    updated, new ones uploaded, and images get their WebP variants (see
+    image_pipeline). `on_progress(done, total)` is
+    called from the event loop after each file. Returns an UploadReport.
+    """
+    report = UploadReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def upload_one(local_path, remote_path):
+        nonlocal done
+        async with semaphore:
+            try:
+                with open(local_path, "rb") as f:
+                    data = await asyncio.to_thread(f.read)
+                content_type = detect_content_type(data, remote_path)
+                payload, encoding = await encode(data, content_type)
+                digest = await asyncio.to_thread(hash_bytes, payload)
+                if remote_path in known_digests and known_digests[remote_path] == digest:
+                    report.skipped += 1
+                    report.bytes_avoided += len(payload)
+                else:
+                    if remote_path in known_digests:
+                        await backend.update(remote_path, payload, content_type, content_encoding=encoding)
+                    else:
+                        try:
+                            await backend.upload(remote_path, payload, content_type, content_encoding=encoding)
+                        except StorageError as e:
+                            # Created since the listing was taken
+                            if not e.already_exists:
+                                raise
+                            await backend.update(remote_path, payload, content_type, content_encoding=encoding)
+                    report.uploaded += 1
+                    report.bytes_sent += len(payload)
+                    report.entries.append((remote_path, len(payload), digest, content_type, encoding))
+                    for path, variant, variant_digest in await publish_variants(
+                            backend, remote_path, data, content_type, variant_cache):
+                        report.variants += 1
+                        report.bytes_sent += len(variant)
+                        report.entries.append((path, len(variant), variant_digest, "image/webp", None))
+            except Exception as e:
+                report.failed.append((remote_path, str(e)))
+            finally:
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, len(pairs))
+
+    await asyncio.gather(*(upload_one(local, remote) for local, remote in pairs))
+    return report
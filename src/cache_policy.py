@@ -0,0 +1,152 @@
+# Module for Cache-Control policies per path prefix, set on upload and re-applied to existing objects
+import asyncio
+
+from . import config
+from .storage_backend import LIST_PAGE_SIZE, StorageError, guess_content_type, walk
+
+
+def normalize(value):
+    """`value` with directives lower-cased and separated by ", "; None stays None."""
+    if value is None:
+        return None
+    return ", ".join(part.strip().lower() for part in value.split(",") if part.strip())
+
+
+class CachePolicy:
+    """Cache-Control value for each path: the longest matching prefix's, else the default.
+
+    `rules` are (prefix, value) pairs; prefixes are matched as plain string
+    prefixes of the object path, so "posts/" covers every post and "assets/app."
+    only the files it starts. Values must start with `max-age=<seconds>`, the
+    only form Supabase Storage keeps.
+    """
+
+    def __init__(self, rules=None, default=None):
+        rules = config.CACHE_CONTROL_POLICIES if rules is None else rules
+        self.default = self._check(default or config.CACHE_CONTROL_DEFAULT)
+        self.rules = sorted(((prefix.lstrip("/"), self._check(value)) for prefix, value in rules),
+                            key=lambda rule: len(rule[0]), reverse=True)
+
+    @staticmethod
+    def _check(value):
+        value = normalize(value)
+        seconds = (value or "").split(",")[0][len("max-age="):]
+        if not value or not value.startswith("max-age=") or not seconds.isdigit():
+            raise ValueError(f"Cache-Control policy must start with max-age=<seconds>: {value!r}")
+        return value
+
+    def for_path(self, path):
+        for prefix, value in self.rules:
+            if path.startswith(prefix):
+                return value
+        return self.default
+
+
+class CachePolicyBackend:
+    """StorageBackend wrapper giving every upload and update its policy's Cache-Control.
+
+    A caller passing `cache_control` itself keeps it; moves and copies keep the
+    source object's value, as Supabase does.
+    """
+
+    def __init__(self, backend, policy=None):
+        self.backend = backend
+        self.policy = policy or CachePolicy()
+
+    @property
+    def label(self):
+        return self.backend.label
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    async def upload(self, path, data, *args, cache_control=None, **kwargs):
+        return await self.backend.upload(path, data, *args, cache_control=cache_control or self.policy.for_path(path),
+                                         **kwargs)
+
+    async def update(self, path, data, *args, cache_control=None, **kwargs):
+        return await self.backend.update(path, data, *args, cache_control=cache_control or self.policy.for_path(path),
+                                         **kwargs)
+
+
+class PolicyReport:
+    """What a re-application did; `changed` holds (path, old value, new value) of objects re-uploaded."""
+
+    __slots__ = ("checked", "changed", "failed", "unsupported")
+
+    def __init__(self):
+        self.checked = 0
+        self.changed = []
+        self.failed = []
+        self.unsupported = 0
+
+    def summary(self, dry_run=False):
+        verb = "would change" if dry_run else "changed"
+        parts = [f"{self.checked} object(s) checked", f"{len(self.changed)} {verb}"]
+        if self.unsupported:
+            parts.append(f"{self.unsupported} without Cache-Control support")
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed")
+        return ", ".join(parts)
+
+
+async def reapply(backend, policy=None, prefix="", concurrency=None, dry_run=False, on_progress=None):
+    """Bring the Cache-Control of every object under `prefix` in line with `policy`.
+
+    The listing says which objects differ; only those are downloaded and
+    uploaded again with the same bytes, content type and encoding, so their
+    eTags (and every cache keyed by them) stay valid. Up to `concurrency`
+    objects are in progress while the listing continues. `on_progress(checked,
+    changed)` is called from the event loop. Returns a PolicyReport.
+    """
+    policy = policy or CachePolicy()
+    report = PolicyReport()
+    semaphore = asyncio.Semaphore(concurrency or config.CACHE_POLICY_CONCURRENCY)
+    pending = set()
+
+    def progress():
+        if on_progress is not None:
+            on_progress(report.checked, len(report.changed))
+
+    async def reapply_one(path, metadata, wanted):
+        try:
+            data = await backend.download(path)
+            encoding = metadata.get("contentEncoding")
+            # A compressed object is listed with its stored type, not the original one
+            content_type = (None if encoding else metadata.get("mimetype")) or guess_content_type(path)
+            await backend.update(path, data, content_type, content_encoding=encoding, cache_control=wanted)
+            report.changed.append((path, metadata.get("cacheControl"), wanted))
+        except StorageError as e:
+            report.failed.append((path, str(e)))
+        finally:
+            semaphore.release()
+        progress()
+
+    try:
+        async for entry in walk(backend, prefix):
+            metadata = entry.get("metadata") or {}
+            report.checked += 1
+            current = normalize(metadata.get("cacheControl"))
+            wanted = policy.for_path(entry["name"])
+            if current is None:
+                report.unsupported += 1
+            elif current != wanted:
+                if dry_run:
+                    report.changed.append((entry["name"], metadata.get("cacheControl"), wanted))
+                else:
+                    # Listing waits here while `concurrency` objects are in progress
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(reapply_one(entry["name"], metadata, wanted))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if report.checked % LIST_PAGE_SIZE == 0:
+                progress()
+        if pending:
+            await asyncio.gather(*pending)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+    report.changed.sort()
+    progress()
+    return report
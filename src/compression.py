@@ -0,0 +1,240 @@
+# Module for compressing uploads and cached content off the UI thread
+import gzip
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Content types worth compressing; images, archives and video already are
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/xml", "application/javascript",
+                      "image/svg+xml")
+
+# A full cache is trimmed to this fraction of its limit, so the next writes do not walk it again
+TRIM_TARGET = 0.9
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _zstd():
+    """The zstandard module, or None when it is not installed."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings():
+    return ("gzip", "zstd") if _zstd() is not None else ("gzip",)
+
+
+def should_compress(content_type, size):
+    return size >= config.COMPRESSION_MIN_SIZE and (content_type or "").startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, level=None):
+    """Compress `data` as "gzip" or "zstd"; the same input always gives the same bytes."""
+    if encoding == "gzip":
+        # mtime=0 keeps the output stable, so the eTag of unchanged content does not change
+        return gzip.compress(data, compresslevel=level or config.GZIP_LEVEL, mtime=0)
+    if encoding == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=level or config.ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unknown content encoding: {encoding!r}")
+
+
+def encoding_of(data):
+    """"gzip" or "zstd" when `data` starts with that format's magic number, else None.
+
+    Only for data this app compressed itself, such as cache entries; objects
+    say how they are encoded in their listing metadata.
+    """
+    if data[:2] == GZIP_MAGIC:
+        return "gzip"
+    if data[:4] == ZSTD_MAGIC:
+        return "zstd"
+    return None
+
+
+def _zstd_or_fail():
+    zstandard = _zstd()
+    if zstandard is None:
+        raise ValueError("Object is zstd-compressed but the zstandard package is not installed")
+    return zstandard
+
+
+def decompress(data, encoding):
+    """Original bytes of `data` compressed as `encoding`; with no encoding `data` is returned as it is."""
+    if not encoding:
+        return data
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        return _zstd_or_fail().ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unknown content encoding: {encoding!r}")
+
+
+def decompress_file(path, encoding, chunk_size=1024 * 1024):
+    """Decompress a downloaded file in place, streaming; returns whether it was compressed."""
+    if not encoding:
+        return False
+    if encoding not in ("gzip", "zstd"):
+        raise ValueError(f"Unknown content encoding: {encoding!r}")
+    tmp_path = f"{path}.decoded"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        if encoding == "gzip":
+            reader = gzip.GzipFile(fileobj=src)
+        else:
+            reader = _zstd_or_fail().ZstdDecompressor().stream_reader(src)
+        for chunk in iter(lambda: reader.read(chunk_size), b""):
+            dst.write(chunk)
+    os.replace(tmp_path, path)
+    return True
+
+
+def worker_pool():
+    """Shared pool for compression; zlib and zstandard release the GIL while they work."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(config.COMPRESSION_WORKERS, thread_name_prefix="compress")
+        return _pool
+
+
+async def encode(data, content_type, encoding=None):
+    """(payload, content encoding) for an upload, compressed in the worker pool.
+
+    `encoding` defaults to UPLOAD_COMPRESSION; small or already compressed
+    content is sent as it is, with an encoding of None.
+    """
+    import asyncio
+    encoding = encoding or config.UPLOAD_COMPRESSION
+    if not encoding or not should_compress(content_type, len(data)):
+        return data, None
+    payload = await asyncio.get_running_loop().run_in_executor(worker_pool(), compress, data, encoding)
+    if len(payload) >= len(data):
+        return data, None
+    return payload, encoding
+
+
+async def decode(data, encoding):
+    """Downloaded bytes of an object listed with content `encoding`, decompressed in the worker pool."""
+    import asyncio
+    if not encoding:
+        return data
+    return await asyncio.get_running_loop().run_in_executor(worker_pool(), decompress, data, encoding)
+
+
+class ContentCache:
+    """Downloaded file contents kept compressed on disk, keyed by bucket, path and eTag.
+
+    A changed object has a new eTag, so stale entries are never returned; the
+    least recently used files are deleted once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, encoding=None):
+        self.directory = directory or os.path.join(config.CACHE_DIR, "content")
+        self.max_bytes = config.CONTENT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.encoding = encoding or available_encodings()[-1]
+        self.budget = DiskBudget(self.directory, self.max_bytes)
+
+    def _path(self, bucket, path, etag):
+        key = hashlib.sha1(f"{bucket}\n{path}\n{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, bucket, path, etag):
+        if not etag:
+            return None
+        cache_path = self._path(bucket, path, etag)
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+            os.utime(cache_path)
+        except OSError:
+            return None
+        return decompress(data, encoding_of(data))
+
+    def has(self, bucket, path, etag):
+        return bool(etag) and os.path.exists(self._path(bucket, path, etag))
+
+    def put(self, bucket, path, etag, data):
+        if not etag or self.max_bytes <= 0:
+            return
+        cache_path = self._path(bucket, path, etag)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        blob = compress(data, self.encoding)
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        self.budget.replace(tmp_path, cache_path, len(blob))
+
+
+class DiskBudget:
+    """Running byte total of a cache directory, so a write walks it only when it must be trimmed.
+
+    The total is read from disk on the first write and kept up to date from
+    there; trimming goes down to TRIM_TARGET of the limit and re-reads it.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._total = None
+        self._lock = threading.Lock()
+
+    def replace(self, tmp_path, path, size):
+        """Move a freshly written file of `size` bytes into place and trim if the limit is passed."""
+        with self._lock:
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._total is None:
+                self._total = directory_size(self.directory)
+            else:
+                self._total += size - replaced
+            if self._total > self.max_bytes:
+                self._total = trim_directory(self.directory, int(self.max_bytes * TRIM_TARGET))
+
+
+def directory_size(directory):
+    total = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def trim_directory(directory, max_bytes):
+    """Delete the least recently used files below `directory` until it fits in `max_bytes`; returns its size."""
+    files = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+    return total
@@ -0,0 +1,97 @@
+# Module for content hashes used to skip uploads of unchanged files
+import hashlib
+import json
+import os
+import threading
+
+from . import config
+
+
+def hash_bytes(data):
+    """MD5 hex digest of `data`, the same digest Supabase reports as an object's eTag."""
+    return hashlib.md5(data).hexdigest()
+
+
+def hash_file(path, chunk_size=None):
+    """MD5 hex digest of a local file, read a chunk at a time."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size or config.HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def etag_digest(etag):
+    """Content MD5 carried by an eTag, or None.
+
+    Single-part uploads get the quoted MD5 of their content as eTag; multipart
+    eTags (with a "-N" suffix) and the local backend's size-mtime tags do not
+    identify the content.
+    """
+    if not etag:
+        return None
+    value = etag.strip().strip('"').lower()
+    if len(value) == 32 and all(c in "0123456789abcdef" for c in value):
+        return value
+    return None
+
+
+class HashManifest:
+    """Content hashes of remote objects whose eTag is not an MD5, persisted as JSON.
+
+    A hash is only trusted while the object still has the eTag it had when
+    the hash was recorded, so any remote change invalidates it.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.CACHE_DIR, config.HASH_MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._buckets = json.load(f)
+        except (OSError, ValueError):
+            self._buckets = {}
+
+    def lookup(self, bucket, path, etag):
+        with self._lock:
+            record = self._buckets.get(bucket, {}).get(path)
+        if record is None or etag is None or record.get("etag") != etag:
+            return None
+        return record.get("md5")
+
+    def record(self, bucket, path, md5, etag):
+        if etag is None or etag_digest(etag) is not None:
+            # Nothing to remember: unknown eTag, or the eTag already is the hash
+            return
+        with self._lock:
+            self._buckets.setdefault(bucket, {})[path] = {"md5": md5, "etag": etag}
+            self._dirty = True
+
+    def forget(self, bucket, path):
+        with self._lock:
+            if self._buckets.get(bucket, {}).pop(path, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the manifest if it changed (atomically, via a temp file)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._buckets, indent=1, sort_keys=True)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def known_digest(entry, manifest=None, bucket=None):
+    """Content MD5 of a listed object, from its eTag or the manifest, or None if unknown."""
+    if entry is None or entry.is_folder:
+        return None
+    digest = etag_digest(entry.etag)
+    if digest is None and manifest is not None:
+        digest = manifest.lookup(bucket, entry.path, entry.etag)
+    return digest
@@ -0,0 +1,125 @@
+# Module for the diagnostics window showing timing spans
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+# How often (ms) the open window re-reads the registry
+REFRESH_INTERVAL_MS = 1000
+
+COLUMNS = (
+    ("count", "Calls", 70),
+    ("errors", "Errors", 60),
+    ("p50_s", "p50", 80),
+    ("p95_s", "p95", 80),
+    ("p99_s", "p99", 80),
+    ("bytes", "Bytes", 100),
+)
+
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    if value < 1:
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.2f} s"
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def format_governor(state):
+    text = (f"Requests in flight: {state['in_flight']} of {state['limit']}, "
+            f"throttled {state['throttled']}, retried {state['retries']}")
+    if state["paused_s"] > 0:
+        text += f", paused {state['paused_s']:.1f} s (Retry-After)"
+    return text
+
+
+class DiagnosticsWindow:
+    """Toplevel listing every span with its latency percentiles, bytes and errors.
+
+    With a request governor, its current limit and counters are shown below.
+    """
+
+    def __init__(self, root, metrics, governor=None):
+        self.metrics = metrics
+        self.governor = governor
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        self.window.geometry("720x400")
+
+        self.tree = ttk.Treeview(self.window, columns=[c[0] for c in COLUMNS], show="tree headings")
+        self.tree.heading("#0", text="Span")
+        self.tree.column("#0", width=220)
+        for key, title, width in COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor="e")
+
+        buttons = ttk.Frame(self.window, padding=5)
+        self.enabled_var = tk.BooleanVar(value=metrics.enabled)
+        ttk.Checkbutton(buttons, text="Collect metrics", variable=self.enabled_var,
+                        command=self.toggle_enabled).grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(buttons, text="Reset", command=self.reset).grid(row=0, column=1, padx=(0, 5))
+        ttk.Button(buttons, text="Export JSON...", command=lambda: self.export("json")).grid(row=0, column=2, padx=(0, 5))
+        ttk.Button(buttons, text="Export Prometheus...", command=lambda: self.export("prometheus")).grid(row=0, column=3)
+
+        self.governor_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.governor_var, padding=(5, 0)).grid(row=1, column=0, sticky="w")
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        buttons.grid(row=2, column=0, sticky="ew")
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(0, weight=1)
+
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        snapshot = self.metrics.snapshot()
+        for name in set(self.tree.get_children()) - set(snapshot):
+            self.tree.delete(name)
+        for name, summary in snapshot.items():
+            values = (
+                summary["count"],
+                summary["errors"],
+                format_seconds(summary["p50_s"]),
+                format_seconds(summary["p95_s"]),
+                format_seconds(summary["p99_s"]),
+                format_bytes(summary["bytes"]) if summary["bytes"] else "",
+            )
+            if self.tree.exists(name):
+                self.tree.item(name, values=values)
+            else:
+                self.tree.insert("", "end", iid=name, text=name, values=values)
+        if self.governor is not None:
+            self.governor_var.set(format_governor(self.governor.snapshot()))
+        self.window.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def toggle_enabled(self):
+        self.metrics.enabled = self.enabled_var.get()
+
+    def reset(self):
+        self.metrics.reset()
+        self.tree.delete(*self.tree.get_children())
+
+    def export(self, fmt):
+        extension = ".json" if fmt == "json" else ".prom"
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Export Metrics",
+            defaultextension=extension,
+            filetypes=[("JSON", "*.json")] if fmt == "json" else [("Prometheus text", "*.prom *.txt")],
+        )
+        if not path:
+            return
+        text = self.metrics.to_json() if fmt == "json" else self.metrics.to_prometheus()
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to export metrics: {e}", parent=self.window)
@@ -0,0 +1,277 @@
+# Module for the in-memory index of listed files and folders, keyed by path
+from bisect import bisect_left, insort
+from datetime import datetime
+
+# Objects Supabase uses to keep otherwise empty folders alive
+PLACEHOLDER_NAMES = (".emptyFolderPlaceholder",)
+
+# Sort key per sortable column; folders carry their recursive size and latest change
+SORT_KEYS = {
+    "name": lambda entry: entry.name_key,
+    "path": lambda entry: entry.search_key,
+    "size": lambda entry: entry.size,
+    "modified": lambda entry: entry.updated if entry.updated is not None else -1.0,
+}
+
+
+def parse_timestamp(value):
+    """Seconds since the epoch for an ISO 8601 timestamp, or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class FileEntry:
+    """One file or folder with its raw metadata; formatting happens at render time."""
+
+    __slots__ = ("path", "name", "parent", "is_folder", "size", "created", "updated",
+                 "etag", "mimetype", "encoding", "public_url", "search_key", "name_key")
+
+    def __init__(self, path, is_folder=False, size=0, created=None, updated=None,
+                 etag=None, mimetype=None, public_url="", encoding=None):
+        self.path = path
+        self.parent, _, self.name = path.rpartition('/')
+        self.is_folder = is_folder
+        self.size = size
+        self.created = created
+        self.updated = updated
+        self.etag = etag
+        self.mimetype = mimetype
+        # Compression of the stored bytes ("gzip", "zstd" or None), as listed
+        self.encoding = encoding
+        self.public_url = public_url
+        self.search_key = path.lower()
+        self.name_key = self.name.casefold()
+
+    @classmethod
+    def from_listing(cls, file_info):
+        """Build an entry from a listing dict (full path in 'name', as walk() yields)."""
+        path = file_info.get('name', '')
+        if file_info.get('id') is None:
+            return cls(path, is_folder=True)
+        metadata = file_info.get('metadata') or {}
+        return cls(
+            path,
+            size=metadata.get('size') or 0,
+            created=parse_timestamp(file_info.get('created_at')),
+            updated=parse_timestamp(file_info.get('updated_at')),
+            etag=metadata.get('eTag'),
+            mimetype=metadata.get('mimetype'),
+            public_url=file_info.get('public_url', ""),
+            encoding=metadata.get('contentEncoding'),
+        )
+
+
+class FileStore:
+    """Entries keyed by path plus each folder's children ("" is the bucket root).
+
+    Lookups never touch Tk, and missing parent folders are created implicitly.
+    Folder entries hold the total size and latest update of everything below
+    them; both are adjusted along the ancestor chain on every change instead of
+    being recomputed over the whole tree.
+
+    Children are ordered by the current sort column. Each folder's order is a
+    sorted list of precomputed keys, built on first use and then kept sorted
+    with binary search as entries change. `take_changes()` reports which rows
+    need redrawing since the last call.
+    """
+
+    def __init__(self):
+        self.sort_column = "name"
+        self.sort_reverse = False
+        self.clear()
+
+    def clear(self):
+        self._entries = {}
+        # folder path -> {child path: None}, an insertion-ordered set
+        self._children = {"": {}}
+        # folder path -> sorted child keys for the current sort column
+        self._order = {}
+        self._touched = set()
+        self._removed = set()
+
+    def load(self, files):
+        """Replace the contents with a listing (as produced by walk())."""
+        self.clear()
+        for file_info in files:
+            path = file_info.get('name', '')
+            if not path:
+                continue
+            parent, _, name = path.rpartition('/')
+            if name in PLACEHOLDER_NAMES:
+                # The placeholder itself is hidden but its folder is shown
+                self._ensure_folder(parent)
+                continue
+            self._add(FileEntry.from_listing(file_info))
+        self.take_changes()
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def get(self, path):
+        return self._entries.get(path)
+
+    def is_folder(self, path):
+        entry = self._entries.get(path)
+        return entry is not None and entry.is_folder
+
+    # Ordering
+
+    def set_sort(self, column, reverse=False):
+        """Order children by `column` (a SORT_KEYS name); folders always come first."""
+        if column not in SORT_KEYS:
+            raise ValueError(f"Unknown sort column: {column!r}")
+        if column != self.sort_column:
+            self._order = {}
+        self.sort_column = column
+        self.sort_reverse = reverse
+
+    def _sort_key(self, entry):
+        # The path makes every key unique, so an entry's key can be found again by bisection
+        return (not entry.is_folder, SORT_KEYS[self.sort_column](entry), entry.name_key, entry.path)
+
+    def _keys(self, folder):
+        keys = self._order.get(folder)
+        if keys is None:
+            entries = self._entries
+            keys = self._order[folder] = sorted(self._sort_key(entries[p]) for p in self._children.get(folder, ()))
+        return keys
+
+    def _index(self, entry):
+        keys = self._order.get(entry.parent)
+        if keys is not None:
+            insort(keys, self._sort_key(entry))
+
+    def _unindex(self, entry):
+        keys = self._order.get(entry.parent)
+        if keys is not None:
+            key = self._sort_key(entry)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def children(self, folder=""):
+        """Paths directly under `folder` in the current sort order, folders first."""
+        keys = self._keys(folder)
+        paths = [key[-1] for key in keys]
+        if self.sort_reverse:
+            folders = bisect_left(keys, (True,))
+            paths = paths[:folders][::-1] + paths[folders:][::-1]
+        return paths
+
+    def folders(self):
+        """Folder paths, parents before their children."""
+        return sorted((p for p, e in self._entries.items() if e.is_folder), key=lambda p: (p.count('/'), p))
+
+    def walk(self, folder=""):
+        """Entries below `folder` in display order, each folder before its contents."""
+        for path in self.children(folder):
+            entry = self._entries[path]
+            yield entry
+            if entry.is_folder:
+                yield from self.walk(path)
+
+    def ancestors(self, path):
+        """Folder paths containing `path`, innermost first."""
+        parent = path.rpartition('/')[0]
+        while parent:
+            yield parent
+            parent = parent.rpartition('/')[0]
+
+    # Changes
+
+    def take_changes(self):
+        """(paths added or changed, paths removed) since the last call."""
+        touched, removed = self._touched, self._removed
+        self._touched, self._removed = set(), set()
+        return touched, removed
+
+    def _ensure_folder(self, path):
+        if path and path not in self._entries:
+            self._add(FileEntry(path, is_folder=True))
+
+    def _add(self, entry):
+        self._ensure_folder(entry.parent)
+        existing = self._entries.get(entry.path)
+        if existing is not None and existing.is_folder and entry.is_folder:
+            return existing
+        self._entries[entry.path] = entry
+        self._children.setdefault(entry.parent, {})[entry.path] = None
+        if entry.is_folder:
+            self._children.setdefault(entry.path, {})
+        self._index(entry)
+        self._touched.add(entry.path)
+        self._removed.discard(entry.path)
+        self._propagate(entry.parent, entry.size, added=entry.updated)
+        return entry
+
+    def _propagate(self, folder, size_delta, added=None, removed=None):
+        """Adjust the totals of `folder` and its ancestors after a child was added or removed."""
+        while folder:
+            entry = self._entries[folder]
+            updated = entry.updated
+            if added is not None and (updated is None or added > updated):
+                updated = added
+            elif removed is not None and updated == removed:
+                # The latest change went away: look at this folder's direct children only
+                updated = max((self._entries[p].updated for p in self._children[folder]
+                               if self._entries[p].updated is not None), default=None)
+            if not size_delta and updated == entry.updated:
+                return
+            self._unindex(entry)
+            entry.size += size_delta
+            entry.updated = updated
+            self._index(entry)
+            self._touched.add(folder)
+            folder = entry.parent
+
+    def upsert(self, entry):
+        """Add or replace a file entry; returns it."""
+        existing = self._entries.get(entry.path)
+        if existing is not None and not existing.is_folder:
+            if entry.created is None:
+                entry.created = existing.created
+            self.remove(entry.path)
+        return self._add(entry)
+
+    def add_folder(self, path):
+        return self._add(FileEntry(path, is_folder=True))
+
+    def remove(self, path):
+        """Drop `path` (and everything below it for a folder); returns the removed entry."""
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        self._unindex(entry)
+        self._children[entry.parent].pop(path, None)
+        self._drop(entry)
+        self._propagate(entry.parent, -entry.size, removed=entry.updated)
+        return entry
+
+    def _drop(self, entry):
+        del self._entries[entry.path]
+        self._touched.discard(entry.path)
+        self._removed.add(entry.path)
+        if entry.is_folder:
+            self._order.pop(entry.path, None)
+            for child in self._children.pop(entry.path, ()):
+                self._drop(self._entries[child])
+
+    def rename(self, old_path, new_path, public_url=""):
+        """Move a file entry to `new_path`, keeping its metadata; returns the new entry."""
+        old = self.remove(old_path)
+        if old is None:
+            return None
+        entry = FileEntry(new_path, old.is_folder, old.size, old.created, old.updated,
+                          old.etag, old.mimetype, public_url, old.encoding)
+        return self.upsert(entry)
@@ -2,48 +2,193 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
 import threading
-from datetime import datetime
-import json
-from supabase import create_client
-from storage3.exceptions import StorageApiError
+from datetime import datetime, timezone
+from pathlib import Path
+import time
+
+# asyncio, the storage backends and the Supabase client are imported on the
+# startup thread (see connect_storage) so the window can appear first
+from .ui_dispatcher import UIDispatcher
+from .paged_viewer import PagedDocument, PagedTextView, is_large_file
+from .file_store import FileEntry, FileStore
+from .content_hash import HashManifest, hash_bytes, hash_file, known_digest
+from .compression import ContentCache, decode, decompress_file, encode, worker_pool
+from .revisions import RevisionStore
+from .metrics import REGISTRY, timed
+from .profiling import ActionProfiler
+from .startup import StartupMetrics
+from . import config
+
+# Columns that sort the tree when their heading is clicked
+SORTABLE_COLUMNS = {"name": "Name", "path": "Path", "size": "Size", "modified": "Modified"}
 
 class SupabaseMDXManager:
-    def __init__(self, root):
+    def __init__(self, root, backend=None, profile_dir=None, startup=None):
         self.root = root
         self.root.title("Supabase MDX File Manager")
         self.root.geometry("1200x800")
         self.root.minsize(800, 600)
+        self.metrics = REGISTRY
+        self.startup = startup or StartupMetrics(metrics=self.metrics)
         
-        # Initialize Supabase client
-        self.setup_supabase()
+        # Start connecting to storage in the background (configured backend unless one is passed in)
+        self.setup_storage(backend, profile_dir)
         
         # Setup UI
         self.setup_styles()
         self.create_widgets()
         self.setup_layout()
-        
-        # Load files on startup
-        self.refresh_file_list()
-
         self.bind_additional_events()
+        self.startup.mark("window")
+        self.root.after_idle(lambda: self.startup.mark("first_paint"))
+        
+        # Files are loaded once the storage connection is ready
+        self.start_loading("Connecting to storage...")
     
-    def setup_supabase(self):
-        """Initialize Supabase client"""
+    def setup_storage(self, backend=None, profile_dir=None):
+        """Initialize UI plumbing and start connecting to storage off the Tk thread"""
+        # Background results reach Tk through one batched UI queue
+        self.ui = UIDispatcher()
+        self.ui.attach(self.root)
+        self.display_job = None
+        # Set by storage_ready: the I/O loop, the open workspaces and the active one
+        self.io = None
+        self.workspaces = None
+        self.workspace = None
+        # The active workspace's timed StorageBackend; store, folder_states,
+        # content_cache and signed_urls below also belong to it (see activate_workspace)
+        self.backend = None
+        # With a profile directory every user action is profiled, otherwise only on request
+        self.profiler = ActionProfiler(profile_dir, auto=profile_dir is not None)
+        self.search_profile_timer = None
+        self.folder_states = {} 
+        # Listed files and folders with raw metadata; tree item ids are their paths
+        self.store = FileStore()
+        # Paths shown while a search query is active (None shows everything)
+        self.visible_paths = None
+        # Content hashes for objects whose eTag is not an MD5 (e.g. the local backend)
+        self.hash_manifest = HashManifest()
+        # Viewed file contents, kept compressed on disk until their eTag changes
+        self.content_cache = ContentCache()
+        # Encoded image variants, created with the first image upload
+        self.variant_cache = None
+        # Versions of viewed and saved files, for diffs and restores without a download
+        self.revisions = RevisionStore() if config.REVISIONS_ENABLED else None
+        # Background downloads of files likely to be opened next, the running round
+        # and the row the pointer rests on
+        self.prefetcher = None
+        self.prefetch_round = None
+        self.prefetch_hover_job = None
+        self.hovered_path = None
+        # Which articles reference which objects, and the background scan updating it (graph, future)
+        self.references = None
+        self.reference_scan = (None, None)
+        # Signed URLs when the bucket is private, and their refresh timer
+        self.signed_urls = None
+        self.url_refresh_job = None
+        threading.Thread(
+            target=self.connect_storage, args=(backend,), name="storage-startup", daemon=True
+        ).start()
+    
+    def connect_storage(self, backend=None):
+        """Runs on the startup thread: heavy imports, I/O loop and client creation"""
         try:
-            # Load credentials from config/secrets.json
-            config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'secrets.json')
-            with open(config_path, 'r') as f:
-                secrets = json.load(f)
-            url = secrets.get('supabase_url')
-            key = secrets.get('firestore_key')
-            from supabase import create_client
-            self.supabase = create_client(url, key)
-            self.bucket_name = "mdx-files"
-            self.folder_states = {} 
+            from .async_bridge import AsyncBridge
+            from .workspace import Workspaces
+            
+            # All storage I/O runs on one event-loop thread
+            io = AsyncBridge(deliver=self.ui.post)
+            workspaces = Workspaces.single(backend) if backend is not None else Workspaces.configured()
+            # Only the first workspace connects now; the others when first shown
+            io.run(workspaces.open(workspaces.items[0], self.metrics))
         except Exception as e:
-            from tkinter import messagebox
-            messagebox.showerror("Connection Error", f"Failed to connect to Supabase: {str(e)}")
-            self.root.destroy()
+            self.ui.post(self.storage_error, e)
+            return
+        self.ui.post(self.storage_ready, io, workspaces)
+    
+    def storage_ready(self, io, workspaces):
+        """Storage is connected: enable I/O and load the file list"""
+        self.io = io
+        self.workspaces = workspaces
+        self.workspace_combo.config(values=[workspace.title for workspace in workspaces.items])
+        self.activate_workspace(workspaces.items[0])
+        self.profiler.loop = io.loop
+        self.startup.mark("storage_ready")
+        self.refresh_file_list()
+    
+    def activate_workspace(self, workspace):
+        """Point the window's storage and per-bucket state at `workspace`"""
+        self.workspace = workspace
+        # Every operation goes through the StorageBackend protocol, timed and
+        # paced by the request governor (see Workspaces.open)
+        self.backend = workspace.backend
+        self.store = workspace.store
+        self.folder_states = workspace.folder_states
+        self.content_cache = workspace.content_cache
+        self.signed_urls = workspace.signed_urls
+        self.references = workspace.references
+        self.visible_paths = None
+        self.cancel_prefetch()
+        if config.PREFETCH_ENABLED:
+            from .prefetch import Prefetcher
+            self.prefetcher = Prefetcher(workspace.content_cache, metrics=self.metrics)
+        self.workspace_var.set(workspace.title)
+        title = workspace.title if len(self.workspaces.items) > 1 else self.backend.label
+        self.root.title(f"Supabase MDX File Manager - {title}")
+    
+    def on_workspace_selected(self, event=None):
+        """Show the workspace picked in the toolbar"""
+        title = self.workspace_var.get()
+        for workspace in self.workspaces.items if self.workspaces is not None else ():
+            if workspace.title == title:
+                self.switch_workspace(workspace)
+                return
+    
+    def switch_workspace(self, workspace):
+        """Show another bucket, opening its connection the first time"""
+        if workspace is self.workspace:
+            return
+        # The listing and folder state stay with the old workspace; the editor does not
+        self.workspace.selection = self.files_tree.selection()
+        self.clear_editor()
+        if self.url_refresh_job is not None:
+            self.root.after_cancel(self.url_refresh_job)
+            self.url_refresh_job = None
+        if workspace.opened:
+            self.show_workspace(workspace)
+            return
+        self.start_loading(f"Connecting to {workspace.title}...")
+        self.io.submit(
+            self.workspaces.open(workspace, self.metrics),
+            on_success=lambda _: self.workspace_opened(workspace),
+            on_error=lambda e: self.workspace_error(workspace, str(e))
+        )
+    
+    def workspace_opened(self, workspace):
+        """A workspace connected for the first time"""
+        self.stop_loading()
+        self.show_workspace(workspace)
+    
+    def show_workspace(self, workspace):
+        """Redraw the tree for `workspace`, from its cached listing when it has one"""
+        self.activate_workspace(workspace)
+        if not workspace.listed:
+            self.refresh_file_list()
+            return
+        self.start_loading(f"Showing {workspace.title}...")
+        self.show_store(f"{workspace.title}: {len(self.store)} items (cached listing, Refresh to reload)")
+    
+    def workspace_error(self, workspace, error_msg):
+        """A workspace could not be opened; stay on the current one"""
+        self.stop_loading()
+        self.workspace_var.set(self.workspace.title)
+        self.update_status(f"Could not open {workspace.title}")
+        messagebox.showerror("Connection Error", f"Failed to connect to {workspace.title}: {error_msg}")
+    
+    def storage_error(self, error):
+        """Storage could not be reached at startup"""
+        messagebox.showerror("Connection Error", f"Failed to connect to storage: {str(error)}")
+        self.root.destroy()
     
     def setup_styles(self):
         """Configure ttk styles for better appearance"""
@@ -72,6 +217,22 @@ class SupabaseMDXManager:
             style='Primary.TButton'
         )
         
+        # Upload folder button
+        self.upload_folder_btn = ttk.Button(
+            self.toolbar_frame, 
+            text="🗂️ Upload Folder", 
+            command=self.upload_folder,
+            style='Action.TButton'
+        )
+        
+        # Sync folder button
+        self.sync_btn = ttk.Button(
+            self.toolbar_frame, 
+            text="🔁 Sync Folder", 
+            command=self.sync_folder,
+            style='Action.TButton'
+        )
+        
         # Refresh button
         self.refresh_btn = ttk.Button(
             self.toolbar_frame, 
@@ -88,6 +249,31 @@ class SupabaseMDXManager:
             style='Action.TButton'
         )
         
+        # Export manifest button
+        self.export_btn = ttk.Button(
+            self.toolbar_frame, 
+            text="📋 Export", 
+            command=self.export_manifest,
+            style='Action.TButton'
+        )
+        
+        # Check links button
+        self.links_btn = ttk.Button(
+            self.toolbar_frame, 
+            text="🔗 Check Links", 
+            command=self.check_links,
+            style='Action.TButton'
+        )
+        
+        # Workspace (project and bucket) selector
+        self.workspace_frame = ttk.Frame(self.toolbar_frame)
+        self.workspace_label = ttk.Label(self.workspace_frame, text="Bucket:")
+        self.workspace_var = tk.StringVar()
+        self.workspace_combo = ttk.Combobox(
+            self.workspace_frame, textvariable=self.workspace_var, state="readonly", width=28
+        )
+        self.workspace_combo.bind("<<ComboboxSelected>>", self.on_workspace_selected)
+        
         # Search frame
         self.search_frame = ttk.Frame(self.toolbar_frame)
         self.search_label = ttk.Label(self.search_frame, text="Search:")
@@ -108,7 +294,9 @@ class SupabaseMDXManager:
         self.files_tree.heading("path", text="Path")
         self.files_tree.heading("size", text="Size")
         self.files_tree.heading("modified", text="Modified")
-        self.files_tree.heading("url", text="Public URL")
+        self.files_tree.heading("url", text="Signed URL" if config.SIGNED_URLS else "Public URL")
+        for column in SORTABLE_COLUMNS:
+            self.files_tree.heading(column, command=lambda c=column: self.sort_by(c))
         
         # Column widths
         self.files_tree.column("#0", width=50)
@@ -133,6 +321,8 @@ class SupabaseMDXManager:
         self.context_menu.add_command(label="📥 Download", command=self.download_file)
         self.context_menu.add_command(label="✏️ Rename", command=self.rename_file)
         self.context_menu.add_command(label="🔗 Copy URL", command=self.copy_url)
+        self.context_menu.add_command(label="🔗 Copy Links for Selection", command=self.copy_links_for_selection)
+        self.context_menu.add_command(label="🔁 Find and Replace in Selection", command=self.find_replace)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="🗑️ Delete", command=self.delete_file)
         
@@ -148,6 +338,7 @@ class SupabaseMDXManager:
         self.editor_frame = ttk.Frame(self.details_frame)
         self.editor_label = ttk.Label(self.editor_frame, text="Content Editor:")
         self.file_editor = scrolledtext.ScrolledText(self.editor_frame, height=15, width=60)
+        self.paged_view = PagedTextView(self.file_editor, self.file_editor.vbar)
         
         # Editor buttons
         self.editor_buttons_frame = ttk.Frame(self.editor_frame)
@@ -163,6 +354,12 @@ class SupabaseMDXManager:
             command=self.reload_file_content,
             style='Action.TButton'
         )
+        self.history_btn = ttk.Button(
+            self.editor_buttons_frame, 
+            text="🕘 History", 
+            command=self.show_history,
+            style='Action.TButton'
+        )
         
         # Status bar
         self.status_bar = ttk.Label(self.main_frame, text="Ready", relief="sunken", anchor="w")
@@ -185,16 +382,25 @@ class SupabaseMDXManager:
         # Toolbar
         self.toolbar_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
         self.upload_btn.grid(row=0, column=0, padx=(0, 5))
-        self.refresh_btn.grid(row=0, column=1, padx=(0, 5))
-        self.create_folder_btn.grid(row=0, column=2, padx=(0, 20))
+        self.upload_folder_btn.grid(row=0, column=1, padx=(0, 5))
+        self.sync_btn.grid(row=0, column=2, padx=(0, 5))
+        self.refresh_btn.grid(row=0, column=3, padx=(0, 5))
+        self.create_folder_btn.grid(row=0, column=4, padx=(0, 5))
+        self.export_btn.grid(row=0, column=5, padx=(0, 5))
+        self.links_btn.grid(row=0, column=6, padx=(0, 20))
+        
+        # Workspace
+        self.workspace_frame.grid(row=0, column=7, sticky="w")
+        self.workspace_label.grid(row=0, column=0, padx=(0, 5))
+        self.workspace_combo.grid(row=0, column=1)
         
         # Search
-        self.search_frame.grid(row=0, column=3, sticky="e")
+        self.search_frame.grid(row=0, column=8, sticky="e")
         self.search_label.grid(row=0, column=0, padx=(0, 5))
         self.search_entry.grid(row=0, column=1)
         
         # Configure toolbar column weights
-        self.toolbar_frame.grid_columnconfigure(3, weight=1)
+        self.toolbar_frame.grid_columnconfigure(8, weight=1)
         
         # Files frame (left side)
         self.files_frame.grid(row=1, column=0, sticky="nsew", padx=(0, 5))
@@ -220,7 +426,8 @@ class SupabaseMDXManager:
         self.file_editor.grid(row=1, column=0, sticky="nsew")
         self.editor_buttons_frame.grid(row=2, column=0, sticky="ew", pady=(10, 0))
         self.save_btn.grid(row=0, column=0, padx=(0, 5))
-        self.reload_btn.grid(row=0, column=1)
+        self.reload_btn.grid(row=0, column=1, padx=(0, 5))
+        self.history_btn.grid(row=0, column=2)
         
         # Configure details frame
         self.details_frame.grid_columnconfigure(0, weight=1)
@@ -262,29 +469,35 @@ class SupabaseMDXManager:
         if not remote_path:
             return
         
+        self.start_upload(file_path, remote_path)
+    
+    def start_upload(self, file_path, remote_path):
+        """Upload a local file unless the remote object already has the same content"""
+        self.profiler.begin("upload")
         self.start_loading("Uploading file...")
+        known = self.known_digest(remote_path)
+        
+        async def upload_task():
+            import asyncio
+            data = await asyncio.to_thread(Path(file_path).read_bytes)
+            entry = await self.write_object(remote_path, data, known)
+            if entry is None:
+                return len(data)
+            return [entry, *await self.publish_variants(entry, data)]
+        
+        def upload_failed(e):
+            from .storage_backend import StorageError
+            if isinstance(e, StorageError) and e.already_exists:
+                # File exists, ask to update
+                self.handle_file_exists(file_path, remote_path)
+            else:
+                self.upload_error(str(e))
         
-        def upload_task():
-            try:
-                with open(file_path, "rb") as f:
-                    result = self.supabase.storage.from_(self.bucket_name).upload(
-                        file=f,
-                        path=remote_path,
-                        file_options={"content-type": "text/markdown"}
-                    )
-                
-                self.root.after(0, lambda: self.upload_complete(result, remote_path))
-                
-            except StorageApiError as e:
-                if "already exists" in str(e):
-                    # File exists, ask to update
-                    self.root.after(0, lambda: self.handle_file_exists(file_path, remote_path))
-                else:
-                    self.root.after(0, lambda e=e: self.upload_error(str(e)))
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.upload_error(str(e)))
-        
-        threading.Thread(target=upload_task, daemon=True).start()
+        self.io.submit(
+            upload_task(),
+            on_success=lambda result: self.upload_complete(result, remote_path),
+            on_error=upload_failed
+        )
     
     def handle_file_exists(self, local_path, remote_path):
         """Handle case when file already exists"""
@@ -296,40 +509,326 @@ class SupabaseMDXManager:
         
         if result:
             self.update_file(local_path, remote_path)
+        else:
+            self.finish_profile("upload")
     
     def update_file(self, local_path, remote_path):
         """Update existing file"""
         self.start_loading("Updating file...")
-        
-        def update_task():
-            try:
-                with open(local_path, "rb") as f:
-                    result = self.supabase.storage.from_(self.bucket_name).update(
-                        file=f,
-                        path=remote_path,
-                        file_options={"content-type": "text/markdown"}
-                    )
-                
-                self.root.after(0, lambda: self.upload_complete(result, remote_path))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.upload_error(str(e)))
-        
-        threading.Thread(target=update_task, daemon=True).start()
+        known = self.known_digest(remote_path)
+        
+        async def update_task():
+            import asyncio
+            data = await asyncio.to_thread(Path(local_path).read_bytes)
+            entry = await self.write_object(remote_path, data, known, update=True)
+            if entry is None:
+                return len(data)
+            return [entry, *await self.publish_variants(entry, data)]
+        
+        self.io.submit(
+            update_task(),
+            on_success=lambda result: self.upload_complete(result, remote_path),
+            on_error=lambda e: self.upload_error(str(e))
+        )
+    
+    async def write_object(self, remote_path, data, known=None, update=False, content_type=None):
+        """Compress and write `data` unless the object already holds it (runs on the I/O loop)
+
+        `known` is the stored object's content hash. Returns the new store entry,
+        or None when nothing was sent.
+        """
+        import asyncio
+        from .image_pipeline import detect_content_type
+        content_type = content_type or detect_content_type(data, remote_path)
+        # Compression is deterministic, so unchanged content keeps its stored hash
+        payload, encoding = await encode(data, content_type)
+        digest = await asyncio.to_thread(hash_bytes, payload)
+        if digest == known:
+            return None
+        write = self.backend.update if update else self.backend.upload
+        await write(remote_path, payload, content_type, content_encoding=encoding)
+        return await self.uploaded_entry(remote_path, payload, content_type, digest, encoding)
+    
+    def image_variant_cache(self):
+        """The encoded image variant cache, created on first use"""
+        if self.variant_cache is None:
+            from .image_pipeline import VariantCache
+            self.variant_cache = VariantCache()
+        return self.variant_cache
+    
+    async def publish_variants(self, entry, data):
+        """Upload resized WebP copies of an image entry; returns their store entries (runs on the I/O loop)"""
+        from .image_pipeline import publish_variants
+        written = await publish_variants(self.backend, entry.path, data, entry.mimetype, self.image_variant_cache())
+        return [await self.uploaded_entry(path, variant, "image/webp", digest) for path, variant, digest in written]
+    
+    async def uploaded_entry(self, remote_path, data, content_type=None, digest=None, encoding=None):
+        """Store entry for an object this app just wrote (runs on the I/O loop)"""
+        from .storage_backend import DEFAULT_CONTENT_TYPE
+        # Until the next listing the entry's eTag is the content hash, as Supabase reports it
+        return FileEntry(
+            remote_path,
+            size=len(data),
+            updated=time.time(),
+            etag=f'"{digest or hash_bytes(data)}"',
+            mimetype=content_type or DEFAULT_CONTENT_TYPE,
+            public_url=(await self.object_urls([remote_path])).get(remote_path, ""),
+            encoding=encoding,
+        )
+    
+    async def object_urls(self, paths):
+        """{path: URL shown for it}: signed for a private bucket, else public (runs on the I/O loop)"""
+        if self.signed_urls is not None:
+            return await self.signed_urls.fetch(paths)
+        return {path: await self.backend.public_url(path) for path in paths}
+    
+    def known_digest(self, remote_path):
+        """Content hash of a listed object, or None if it is not listed or its hash is unknown"""
+        label = self.backend.label if self.backend is not None else None
+        return known_digest(self.store.get(remote_path), self.hash_manifest, label)
+    
+    async def remember_digest(self, entry, digest):
+        """Record the hash of content just read for `entry` (runs on the I/O loop)"""
+        import asyncio
+        self.hash_manifest.record(self.backend.label, entry.path, digest, entry.etag)
+        await asyncio.to_thread(self.hash_manifest.save)
     
     def upload_complete(self, result, remote_path):
-        """Handle successful upload"""
+        """Handle successful upload: the entries written (the file, then any image variants),
+        or the size of an upload skipped as unchanged"""
         self.stop_loading()
-        self.update_status(f"Successfully uploaded: {remote_path}")
-        messagebox.showinfo("Success", f"File uploaded successfully to {remote_path}")
-        self.refresh_file_list()
+        self.finish_profile("upload")
+        if isinstance(result, int):
+            self.update_status(f"Unchanged, not uploaded: {remote_path} ({self.format_file_size(result)} avoided)")
+            return
+        variants = f" with {len(result) - 1} WebP variant(s)" if len(result) > 1 else ""
+        self.update_status(f"Successfully uploaded: {remote_path}{variants}")
+        messagebox.showinfo("Success", f"File uploaded successfully to {remote_path}{variants}")
+        for entry in result:
+            self.store.upsert(entry)
+        self.sync_tree()
     
     def upload_error(self, error_msg):
         """Handle upload error"""
         self.stop_loading()
+        self.finish_profile("upload")
         self.update_status("Upload failed")
         messagebox.showerror("Upload Error", f"Failed to upload file: {error_msg}")
     
+    def upload_folder(self):
+        """Upload every file in a local folder, skipping files the bucket already has"""
+        directory = filedialog.askdirectory(title="Select Folder to Upload")
+        if not directory:
+            return
+        
+        prefix = tk.simpledialog.askstring(
+            "Remote Folder",
+            "Upload into remote folder (empty for the bucket root):",
+            initialvalue=f"posts/{os.path.basename(directory)}"
+        )
+        if prefix is None:
+            return
+        prefix = prefix.strip("/")
+        
+        # Hashes of existing objects are looked up here, on the Tk thread
+        known = {entry.path: self.known_digest(entry.path) for entry in self.store
+                 if not entry.is_folder and (not prefix or entry.path.startswith(prefix + "/"))}
+        self.profiler.begin("upload")
+        self.start_loading("Uploading folder...")
+        
+        async def upload_folder_task():
+            import asyncio
+            from .bulk_upload import local_files, upload_files
+            pairs = await asyncio.to_thread(local_files, directory, prefix)
+            report = await upload_files(
+                self.backend, pairs, known, config.BULK_UPLOAD_CONCURRENCY,
+                on_progress=lambda done, total: self.report_progress(done, total, "Uploading folder"),
+                variant_cache=self.image_variant_cache(),
+            )
+            urls = await self.object_urls([remote_path for remote_path, *_ in report.entries])
+            entries = []
+            for remote_path, size, digest, content_type, encoding in report.entries:
+                entries.append(FileEntry(
+                    remote_path, size=size, updated=time.time(), etag=f'"{digest}"',
+                    mimetype=content_type, public_url=urls.get(remote_path, ""), encoding=encoding,
+                ))
+            return report, entries
+        
+        self.io.submit(
+            upload_folder_task(),
+            on_success=lambda result: self.upload_folder_complete(*result),
+            on_error=lambda e: self.upload_error(str(e))
+        )
+    
+    def upload_folder_complete(self, report, entries):
+        """Show what a folder upload sent and skipped"""
+        self.stop_loading()
+        self.finish_profile("upload")
+        for entry in entries:
+            self.store.upsert(entry)
+        self.sync_tree()
+        variants = f" and {report.variants} WebP variant(s)" if report.variants else ""
+        summary = (f"Uploaded {report.uploaded} file(s){variants} ({self.format_file_size(report.bytes_sent)}), "
+                   f"skipped {report.skipped} unchanged ({self.format_file_size(report.bytes_avoided)} avoided)")
+        self.update_status(summary)
+        if report.failed:
+            failures = "\n".join(f"{path}: {error}" for path, error in report.failed[:10])
+            messagebox.showwarning("Upload Folder", f"{summary}.\n\n{len(report.failed)} failed:\n{failures}")
+        else:
+            messagebox.showinfo("Upload Folder", f"{summary}.")
+    
+    def sync_folder(self):
+        """Two-way sync of a local folder with a bucket prefix, previewed before anything changes"""
+        directory = filedialog.askdirectory(title="Select Folder to Sync")
+        if not directory:
+            return
+        
+        prefix = tk.simpledialog.askstring(
+            "Remote Folder",
+            "Sync with remote folder (empty for the bucket root):",
+            initialvalue="posts"
+        )
+        if prefix is None:
+            return
+        prefix = prefix.strip("/")
+        
+        from .folder_sync import SyncState, build_plan
+        state = SyncState(directory, self.backend.label, prefix)
+        self.start_loading("Comparing folder with bucket...")
+        
+        self.io.submit(
+            build_plan(self.backend, directory, prefix, state, concurrency=config.BULK_UPLOAD_CONCURRENCY),
+            on_success=lambda plan: self.confirm_sync(plan, directory, prefix, state),
+            on_error=lambda e: self.sync_error(str(e))
+        )
+    
+    def confirm_sync(self, plan, directory, prefix, state):
+        """Show the dry-run plan and apply it if confirmed"""
+        from .folder_sync import apply_plan
+        self.stop_loading()
+        if not len(plan):
+            if plan.agreed:
+                # Nothing to transfer, but remember the files found identical
+                self.start_loading("Recording sync state...")
+                self.io.submit(
+                    apply_plan(self.backend, plan, directory, prefix, state),
+                    on_success=lambda report: self.sync_unchanged(plan),
+                    on_error=lambda e: self.sync_error(str(e))
+                )
+            else:
+                self.sync_unchanged(plan)
+            return
+        
+        details = "\n".join(plan.describe(limit=20))
+        if not messagebox.askyesno("Sync Folder", f"{plan.summary()}:\n\n{details}\n\nApply these changes?"):
+            self.update_status("Sync cancelled")
+            return
+        
+        self.start_loading("Syncing folder...")
+        self.io.submit(
+            apply_plan(
+                self.backend, plan, directory, prefix, state, config.BULK_UPLOAD_CONCURRENCY,
+                on_progress=lambda done, total: self.report_progress(done, total, "Syncing folder"),
+                variant_cache=self.image_variant_cache(),
+            ),
+            on_success=lambda report: self.sync_complete(plan, report),
+            on_error=lambda e: self.sync_error(str(e))
+        )
+    
+    def sync_unchanged(self, plan):
+        """Report a sync that had nothing to transfer"""
+        self.stop_loading()
+        message = plan.summary()
+        if plan.conflicts:
+            message += "\n\n" + "\n".join(plan.describe(limit=20))
+        self.update_status(f"Sync: {plan.summary()}")
+        messagebox.showinfo("Sync Folder", message)
+    
+    def sync_complete(self, plan, report):
+        """Report what a sync did and reload the listing"""
+        self.stop_loading()
+        summary = (f"Synced {report.applied} change(s): {self.format_file_size(report.bytes_sent)} sent, "
+                   f"{self.format_file_size(report.bytes_received)} received")
+        self.update_status(summary)
+        problems = [f"{path}: {error}" for path, error in report.failed[:10]]
+        problems += [f"{path}: {reason}" for path, reason in plan.conflicts[:10]]
+        if problems:
+            messagebox.showwarning(
+                "Sync Folder",
+                f"{summary}.\n\n{len(report.failed)} failed, {len(plan.conflicts)} conflict(s) left alone:\n"
+                + "\n".join(problems)
+            )
+        else:
+            messagebox.showinfo("Sync Folder", f"{summary}.")
+        self.refresh_file_list()
+    
+    def sync_error(self, error_msg):
+        """Handle sync error"""
+        self.stop_loading()
+        self.update_status("Sync failed")
+        messagebox.showerror("Sync Error", f"Failed to sync folder: {error_msg}")
+    
+    def export_manifest(self):
+        """Write a JSONL or CSV inventory of a bucket folder, resuming an interrupted export"""
+        from . import manifest
+        save_path = filedialog.asksaveasfilename(
+            title="Export Manifest",
+            initialfile="manifest.jsonl",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("All files", "*.*")]
+        )
+        if not save_path:
+            return
+        
+        # Default to the selected folder (or the folder of the selected file)
+        selected = self.files_tree.selection()
+        entry = self.store.get(selected[0]) if selected else None
+        folder = ""
+        if entry is not None:
+            folder = entry.path if entry.is_folder else entry.path.rpartition("/")[0]
+        prefix = tk.simpledialog.askstring(
+            "Export Manifest",
+            "Export objects under remote folder (empty for the whole bucket):",
+            initialvalue=folder
+        )
+        if prefix is None:
+            return
+        prefix = prefix.strip("/")
+        
+        resume = False
+        if manifest.has_checkpoint(save_path):
+            resume = messagebox.askyesno(
+                "Export Manifest",
+                f"An earlier export to {os.path.basename(save_path)} did not finish.\n\n"
+                "Continue it? (No starts over)"
+            )
+        
+        self.start_loading("Exporting manifest...")
+        self.io.submit(
+            manifest.export_manifest(
+                self.backend, save_path, prefix, resume=resume, signed=config.SIGNED_URLS,
+                on_progress=lambda rows: self.update_status(f"Exporting manifest... {rows} object(s)"),
+            ),
+            on_success=lambda report: self.export_complete(save_path, report),
+            on_error=lambda e: self.export_error(str(e))
+        )
+    
+    def export_complete(self, save_path, report):
+        """Report a finished manifest export"""
+        self.stop_loading()
+        resumed = " (resumed)" if report.resumed else ""
+        summary = (f"Exported {report.rows} object(s){resumed} to {os.path.basename(save_path)} "
+                   f"({self.format_file_size(report.bytes)})")
+        self.update_status(summary)
+        messagebox.showinfo("Export Manifest", f"{summary}.")
+    
+    def export_error(self, error_msg):
+        """Handle export error; what was written so far can be resumed"""
+        self.stop_loading()
+        self.update_status("Export failed")
+        messagebox.showerror("Export Error", f"Failed to export manifest: {error_msg}\n\n"
+                             "Export to the same file again to continue where it stopped.")
+    
     def download_file(self):
         """Download selected file"""
         selected = self.files_tree.selection()
@@ -337,17 +836,16 @@ class SupabaseMDXManager:
             messagebox.showwarning("No Selection", "Please select a file to download")
             return
         
-        item = self.files_tree.item(selected[0])
-        file_path = item['values'][1]  # path column
-        
-        if not file_path:  # It's a folder
+        entry = self.store.get(selected[0])
+        if entry is None or entry.is_folder:  # It's a folder
             messagebox.showwarning("Invalid Selection", "Cannot download a folder")
             return
+        file_path = entry.path
         
         # Choose save location
         save_path = filedialog.asksaveasfilename(
             title="Save File As",
-            initialvalue=os.path.basename(file_path),
+            initialfile=os.path.basename(file_path),
             filetypes=[("MDX files", "*.mdx"), ("Markdown files", "*.md"), ("All files", "*.*")]
         )
         
@@ -356,19 +854,18 @@ class SupabaseMDXManager:
         
         self.start_loading("Downloading file...")
         
-        def download_task():
-            try:
-                response = self.supabase.storage.from_(self.bucket_name).download(file_path)
-                
-                with open(save_path, "wb") as f:
-                    f.write(response)
-                
-                self.root.after(0, lambda: self.download_complete(save_path))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.download_error(str(e)))
-        
-        threading.Thread(target=download_task, daemon=True).start()
+        async def download_task():
+            response = await self.backend.download(file_path)
+            import asyncio
+            await self.remember_digest(entry, await asyncio.to_thread(hash_bytes, response))
+            data = await decode(response, entry.encoding)
+            await asyncio.to_thread(Path(save_path).write_bytes, data)
+        
+        self.io.submit(
+            download_task(),
+            on_success=lambda _: self.download_complete(save_path),
+            on_error=lambda e: self.download_error(str(e))
+        )
     
     def download_complete(self, save_path):
         """Handle successful download"""
@@ -389,47 +886,121 @@ class SupabaseMDXManager:
             messagebox.showwarning("No Selection", "Please select a file to view")
             return
         
-        item = self.files_tree.item(selected[0])
-        file_path = item['values'][1]  # path column
-        file_name = item['values'][0]  # name column
-        
-        if not file_path:  # It's a folder
+        entry = self.store.get(selected[0])
+        if entry is None or entry.is_folder:  # It's a folder
             messagebox.showwarning("Invalid Selection", "Cannot view a folder")
             return
+        file_path = entry.path
         
         self.current_file_path = file_path
-        self.selected_file_label.config(text=f"Viewing: {file_name}")
+        self.selected_file_label.config(text=f"Viewing: {entry.name}")
         
-        self.start_loading("Loading file content...")
+        if is_large_file(entry.size):
+            self.view_large_file(file_path, entry)
+            return
         
-        def load_content_task():
-            try:
-                response = self.supabase.storage.from_(self.bucket_name).download(file_path)
-                content = response.decode('utf-8')
-                
-                self.root.after(0, lambda: self.display_file_content(content, item['values']))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.load_content_error(str(e)))
+        self.start_loading("Loading file content...")
         
-        threading.Thread(target=load_content_task, daemon=True).start()
+        async def load_content_task():
+            import asyncio
+            label = self.backend.label
+            if self.prefetcher is not None:
+                await self.prefetcher.wait(label, file_path)
+            data = await asyncio.to_thread(self.content_cache.get, label, file_path, entry.etag)
+            if self.metrics.enabled:
+                self.metrics.record("content.cache_hit" if data is not None else "content.cache_miss", 0.0)
+            if data is None:
+                response = await self.backend.download(file_path)
+                await self.remember_digest(entry, hash_bytes(response))
+                data = await decode(response, entry.encoding)
+                await asyncio.get_running_loop().run_in_executor(
+                    worker_pool(), self.content_cache.put, label, file_path, entry.etag, data
+                )
+            await self.record_revision(file_path, data, "loaded", entry.etag)
+            await self.index_references(entry, data)
+            return data.decode('utf-8')
+        
+        self.io.submit(
+            load_content_task(),
+            on_success=lambda content: self.display_file_content(content, entry),
+            on_error=lambda e: self.load_content_error(str(e))
+        )
+        # The next files in the folder are probably opened next
+        from .prefetch import siblings
+        self.prefetch(siblings(self.store, file_path, config.PREFETCH_SIBLINGS))
     
-    def display_file_content(self, content, file_info):
-        """Display file content in editor"""
+    def view_large_file(self, file_path, entry):
+        """Stream a large file to a temp file and page it into the editor"""
+        self.start_loading("Downloading large file...")
+        
+        async def stream_content_task():
+            suffix = os.path.splitext(file_path)[1]
+            import asyncio
+            import tempfile
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                try:
+                    await self.backend.download_to(file_path, tmp)
+                except BaseException:
+                    tmp.close()
+                    os.remove(tmp.name)
+                    raise
+            await self.remember_digest(entry, await asyncio.to_thread(hash_file, tmp.name))
+            await asyncio.get_running_loop().run_in_executor(worker_pool(), decompress_file, tmp.name, entry.encoding)
+            return tmp.name
+        
+        self.io.submit(
+            stream_content_task(),
+            on_success=lambda temp_path: self.display_large_file(temp_path, entry),
+            on_error=lambda e: self.load_content_error(str(e))
+        )
+    
+    def display_large_file(self, temp_path, entry):
+        """Show a downloaded large file read-only, one window of lines at a time"""
         self.stop_loading()
+        self.close_paged_view()
+        self.show_file_info(entry)
         
-        # Update file info
+        self.paged_view.attach(PagedDocument(temp_path))
+        self.save_btn.config(state="disabled")
+        self.selected_file_label.config(text=f"Viewing (read-only, large file): {entry.name}")
+        
+        self.update_status(f"Loaded: {entry.name} ({self.paged_view.describe()})")
+    
+    def close_paged_view(self):
+        """Leave large-file mode and remove its temp file"""
+        if not self.paged_view.active:
+            return
+        document = self.paged_view.detach()
+        document.close()
+        try:
+            os.remove(document.path)
+        except OSError:
+            pass
+        self.save_btn.config(state="normal")
+    
+    def show_file_info(self, entry):
+        """Fill the file info box"""
         self.file_info_text.config(state="normal")
         self.file_info_text.delete(1.0, tk.END)
-        info_text = f"Name: {file_info[0]}\nPath: {file_info[1]}\nSize: {file_info[2]}\nModified: {file_info[3]}"
+        info_text = (f"Name: {entry.name}\nPath: {entry.path}\nSize: {self.format_file_size(entry.size)}\n"
+                     f"Modified: {self.format_timestamp(entry.updated)}")
         self.file_info_text.insert(1.0, info_text)
         self.file_info_text.config(state="disabled")
+    
+    @timed("ui.display_file_content")
+    def display_file_content(self, content, entry):
+        """Display file content in editor"""
+        self.stop_loading()
+        self.close_paged_view()
+        
+        # Update file info
+        self.show_file_info(entry)
         
         # Update editor
         self.file_editor.delete(1.0, tk.END)
         self.file_editor.insert(1.0, content)
         
-        self.update_status(f"Loaded: {file_info[0]}")
+        self.update_status(f"Loaded: {entry.name}")
     
     def load_content_error(self, error_msg):
         """Handle content loading error"""
@@ -443,34 +1014,45 @@ class SupabaseMDXManager:
             messagebox.showwarning("No File", "No file is currently loaded")
             return
         
-        content = self.file_editor.get(1.0, tk.END).encode('utf-8')
+        if self.paged_view.active:
+            messagebox.showwarning("Read Only", "Large files are opened read-only and cannot be saved from the editor")
+            return
+        
+        # "end-1c" leaves out the newline Tk always keeps after the last line
+        content = self.file_editor.get(1.0, "end-1c").encode('utf-8')
+        file_path = self.current_file_path
+        known = self.known_digest(file_path)
         
         self.start_loading("Saving changes...")
         
-        def save_task():
-            try:
-                import io
-                file_like = io.BytesIO(content)
-                
-                result = self.supabase.storage.from_(self.bucket_name).update(
-                    file=file_like,
-                    path=self.current_file_path,
-                    file_options={"content-type": "text/markdown"}
+        async def save_task():
+            import asyncio
+            entry = await self.write_object(file_path, content, known, update=True)
+            if entry is not None:
+                # Reopening the file after a save then needs no download
+                await asyncio.get_running_loop().run_in_executor(
+                    worker_pool(), self.content_cache.put, self.backend.label, file_path, entry.etag, content
                 )
-                
-                self.root.after(0, lambda: self.save_complete())
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.save_error(str(e)))
-        
-        threading.Thread(target=save_task, daemon=True).start()
+                await self.record_revision(file_path, content, "saved", entry.etag)
+                await self.index_references(entry, content)
+            return entry
+        
+        self.io.submit(
+            save_task(),
+            on_success=self.save_complete,
+            on_error=lambda e: self.save_error(str(e))
+        )
     
-    def save_complete(self):
-        """Handle successful save"""
+    def save_complete(self, entry):
+        """Handle successful save; None means the content was unchanged"""
         self.stop_loading()
+        if entry is None:
+            self.update_status("No changes to save")
+            return
         self.update_status("Changes saved successfully")
         messagebox.showinfo("Success", "File saved successfully")
-        self.refresh_file_list()
+        self.store.upsert(entry)
+        self.sync_tree()
     
     def save_error(self, error_msg):
         """Handle save error"""
@@ -478,6 +1060,93 @@ class SupabaseMDXManager:
         self.update_status("Save failed")
         messagebox.showerror("Save Error", f"Failed to save file: {error_msg}")
     
+    async def record_revision(self, file_path, data, source, etag=None):
+        """Add a version of a file to the local history (runs on the I/O loop)"""
+        import asyncio
+        if self.revisions is None:
+            return
+        try:
+            await asyncio.to_thread(self.revisions.record, self.backend.label, file_path, data, source, etag)
+        except OSError:
+            # The history is best effort; the view or save itself succeeded
+            pass
+    
+    def show_history(self):
+        """Open the recorded revisions of the file in the editor"""
+        if not self.current_file_path or self.revisions is None:
+            messagebox.showwarning("No File", "No file is currently loaded")
+            return
+        file_path, label = self.current_file_path, self.backend.label
+        revisions = self.revisions.history(label, file_path)
+        if not revisions:
+            messagebox.showinfo("History", "No revisions of this file have been recorded yet")
+            return
+        from .history_window import HistoryWindow
+        window = None
+        
+        def diff(old_id, new_id):
+            # Compared with the editor only while it still shows this file
+            current = None
+            if new_id is None:
+                if file_path != self.current_file_path or self.paged_view.active:
+                    window.show_diff("The editor no longer shows this file.")
+                    return
+                current = self.file_editor.get(1.0, "end-1c").encode('utf-8')
+            self.diff_revisions(window, label, file_path, old_id, new_id, current)
+        
+        window = HistoryWindow(self.root, file_path, revisions, diff, lambda revision_id: self.restore_revision(
+            label, file_path, revision_id))
+    
+    def diff_revisions(self, window, label, file_path, old_id, new_id, current=None):
+        """Diff two revisions (or one and the editor) in a worker thread"""
+        import asyncio
+        self.io.submit(
+            asyncio.to_thread(self.revisions.diff, label, file_path, old_id, new_id, current),
+            on_success=window.show_diff,
+            on_error=lambda e: window.show_diff(f"Diff failed: {e}")
+        )
+    
+    def restore_revision(self, label, file_path, revision_id):
+        """Write an old revision back to the bucket; nothing is sent if the bucket already has it"""
+        if self.backend is None or self.backend.label != label:
+            messagebox.showwarning("History", "Switch back to the file's bucket to restore it")
+            return
+        if not messagebox.askyesno("Restore Revision", f"Replace {file_path} in the bucket with revision #{revision_id}?"):
+            return
+        known = self.known_digest(file_path)
+        self.start_loading("Restoring revision...")
+        
+        async def restore_task():
+            import asyncio
+            data = await asyncio.to_thread(self.revisions.content, label, file_path, revision_id)
+            entry = await self.write_object(file_path, data, known, update=True)
+            if entry is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    worker_pool(), self.content_cache.put, label, file_path, entry.etag, data
+                )
+                await self.record_revision(file_path, data, "restored", entry.etag)
+                await self.index_references(entry, data)
+            return data, entry
+        
+        self.io.submit(
+            restore_task(),
+            on_success=lambda result: self.restore_complete(file_path, revision_id, *result),
+            on_error=lambda e: self.save_error(str(e))
+        )
+    
+    def restore_complete(self, file_path, revision_id, data, entry):
+        """Show a restored revision; `entry` is None when the bucket already held it"""
+        self.stop_loading()
+        if entry is None:
+            self.update_status(f"{file_path} already matches revision #{revision_id}; nothing uploaded")
+        else:
+            self.update_status(f"Restored revision #{revision_id} of {file_path}")
+            self.store.upsert(entry)
+            self.sync_tree()
+        if file_path == self.current_file_path and not self.paged_view.active:
+            self.file_editor.delete(1.0, tk.END)
+            self.file_editor.insert(1.0, data.decode('utf-8', 'replace'))
+    
     def reload_file_content(self):
         """Reload current file content"""
         if self.current_file_path:
@@ -490,51 +1159,75 @@ class SupabaseMDXManager:
             messagebox.showwarning("No Selection", "Please select a file to delete")
             return
         
-        item = self.files_tree.item(selected[0])
-        file_path = item['values'][1]  # path column
-        file_name = item['values'][0]  # name column
-        
-        if not file_path:  # It's a folder
+        entry = self.store.get(selected[0])
+        if entry is None or entry.is_folder:  # It's a folder
             messagebox.showwarning("Invalid Selection", "Cannot delete a folder this way")
             return
-        
-        # Confirm deletion
-        result = messagebox.askyesno(
-            "Confirm Delete", 
-            f"Are you sure you want to delete '{file_name}'?\nThis action cannot be undone."
-        )
+        file_path, file_name = entry.path, entry.name
+        # Generated WebP variants of an image go with it
+        from .image_pipeline import variants_of
+        variants = variants_of(file_path, self.store.children(entry.parent))
+        
+        # Confirm deletion, naming the articles that would be left with a broken link
+        also = f" and its {len(variants)} WebP variant(s)" if variants else ""
+        referrers = self.referrers_of([file_path, *variants])
+        if referrers:
+            result = messagebox.askyesno(
+                "Referenced File",
+                f"'{file_name}'{also} is still used by {len(referrers)} article(s):\n\n"
+                + "\n".join(referrers[:10]) + ("\n..." if len(referrers) > 10 else "")
+                + "\n\nDelete it anyway? Their links will break.",
+                icon="warning"
+            )
+        else:
+            pending = ("\n\nArticles are still being scanned for links, so uses of this file may not be known yet."
+                       if self.scanning_references() else "")
+            result = messagebox.askyesno(
+                "Confirm Delete", 
+                f"Are you sure you want to delete '{file_name}'{also}?\nThis action cannot be undone.{pending}"
+            )
         
         if not result:
             return
         
         self.start_loading("Deleting file...")
         
-        def delete_task():
-            try:
-                result = self.supabase.storage.from_(self.bucket_name).remove([file_path])
-                self.root.after(0, lambda: self.delete_complete(file_name))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.delete_error(str(e)))
+        async def delete_task():
+            return await self.backend.remove([file_path, *variants])
         
-        threading.Thread(target=delete_task, daemon=True).start()
+        self.io.submit(
+            delete_task(),
+            on_success=lambda _: self.delete_complete(file_name, file_path, variants),
+            on_error=lambda e: self.delete_error(str(e))
+        )
     
-    def delete_complete(self, file_name):
+    def delete_complete(self, file_name, file_path, variants=()):
         """Handle successful deletion"""
         self.stop_loading()
         self.update_status(f"Deleted: {file_name}")
         messagebox.showinfo("Success", f"File '{file_name}' deleted successfully")
         
         # Clear editor if deleted file was being viewed
+        self.clear_editor()
+        
+        for path in (file_path, *variants):
+            self.store.remove(path)
+        if self.signed_urls is not None:
+            self.signed_urls.forget([file_path, *variants])
+        if self.references is not None:
+            self.references.forget([file_path])
+        self.sync_tree()
+    
+    def clear_editor(self):
+        """Close the file shown in the editor, if any"""
         if self.current_file_path:
+            self.close_paged_view()
             self.current_file_path = None
             self.selected_file_label.config(text="No file selected")
             self.file_editor.delete(1.0, tk.END)
             self.file_info_text.config(state="normal")
             self.file_info_text.delete(1.0, tk.END)
             self.file_info_text.config(state="disabled")
-        
-        self.refresh_file_list()
     
     def delete_error(self, error_msg):
         """Handle deletion error"""
@@ -549,13 +1242,11 @@ class SupabaseMDXManager:
             messagebox.showwarning("No Selection", "Please select a file to rename")
             return
         
-        item = self.files_tree.item(selected[0])
-        old_path = item['values'][1]  # path column
-        old_name = item['values'][0]  # name column
-        
-        if not old_path:  # It's a folder
+        entry = self.store.get(selected[0])
+        if entry is None or entry.is_folder:  # It's a folder
             messagebox.showwarning("Invalid Selection", "Cannot rename folders")
             return
+        old_path, old_name = entry.path, entry.name
         
         # Get new name
         new_name = tk.simpledialog.askstring(
@@ -574,36 +1265,33 @@ class SupabaseMDXManager:
         
         self.start_loading("Renaming file...")
         
-        def rename_task():
-            try:
-                # Download content
-                content = self.supabase.storage.from_(self.bucket_name).download(old_path)
-                
-                # Upload with new name
-                import io
-                file_like = io.BytesIO(content)
-                self.supabase.storage.from_(self.bucket_name).upload(
-                    file=file_like,
-                    path=new_path,
-                    file_options={"content-type": "text/markdown"}
-                )
-                
-                # Delete old file
-                self.supabase.storage.from_(self.bucket_name).remove([old_path])
-                
-                self.root.after(0, lambda: self.rename_complete(old_name, new_name))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.rename_error(str(e)))
-        
-        threading.Thread(target=rename_task, daemon=True).start()
-    
-    def rename_complete(self, old_name, new_name):
+        async def rename_task():
+            import asyncio
+            # Server-side move: one call, no content round trip
+            await self.backend.move(old_path, new_path)
+            if self.revisions is not None:
+                await asyncio.to_thread(self.revisions.move, self.backend.label, old_path, new_path)
+            return (await self.object_urls([new_path])).get(new_path, "")
+        
+        self.io.submit(
+            rename_task(),
+            on_success=lambda public_url: self.rename_complete(old_path, new_path, public_url),
+            on_error=lambda e: self.rename_error(str(e))
+        )
+    
+    def rename_complete(self, old_path, new_path, public_url):
         """Handle successful rename"""
+        old_name = old_path.rpartition('/')[2]
+        new_name = new_path.rpartition('/')[2]
         self.stop_loading()
         self.update_status(f"Renamed: {old_name} → {new_name}")
         messagebox.showinfo("Success", f"File renamed from '{old_name}' to '{new_name}'")
-        self.refresh_file_list()
+        self.store.rename(old_path, new_path, public_url)
+        if self.signed_urls is not None:
+            self.signed_urls.forget([old_path])
+        if self.references is not None:
+            self.references.rename(old_path, new_path)
+        self.sync_tree()
     
     def rename_error(self, error_msg):
         """Handle rename error"""
@@ -612,22 +1300,448 @@ class SupabaseMDXManager:
         messagebox.showerror("Rename Error", f"Failed to rename file: {error_msg}")
     
     def copy_url(self):
-        """Copy public URL to clipboard"""
+        """Copy the selected file's URL to clipboard"""
         selected = self.files_tree.selection()
         if not selected:
             messagebox.showwarning("No Selection", "Please select a file to copy URL")
             return
         
-        item = self.files_tree.item(selected[0])
-        url = item['values'][4]  # url column
-        
-        if url:
-            self.root.clipboard_clear()
-            self.root.clipboard_append(url)
+        entry = self.store.get(selected[0])
+        if entry is None or entry.is_folder:
+            messagebox.showwarning("No URL", "No URL available for this item")
+            return
+        self.copy_links([entry.path])
+    
+    def selected_files(self):
+        """Paths of the selected files and of the files in selected folders, without repeats"""
+        paths = []
+        for item_id in self.files_tree.selection():
+            entry = self.store.get(item_id)
+            if entry is None:
+                continue
+            if entry.is_folder:
+                paths.extend(e.path for e in self.store.walk(entry.path) if not e.is_folder)
+            else:
+                paths.append(entry.path)
+        return list(dict.fromkeys(paths))
+    
+    def copy_links_for_selection(self):
+        """Copy the URLs of every selected file (and of the files in selected folders), one per line"""
+        paths = self.selected_files()
+        if not paths:
+            messagebox.showwarning("No Selection", "Please select files or folders to copy links")
+            return
+        self.copy_links(paths)
+    
+    def copy_links(self, paths):
+        """Copy the URLs of `paths` to clipboard, signing those without a fresh signed URL first"""
+        if self.signed_urls is None:
+            self.links_ready(paths, {path: self.store.get(path).public_url for path in paths if path in self.store})
+            return
+        if not self.signed_urls.stale(paths):
+            self.links_ready(paths, {path: self.signed_urls.get(path) for path in paths})
+            return
+        self.update_status(f"Signing {len(paths)} URL(s)...")
+        workspace = self.workspace
+        self.io.submit(
+            self.signed_urls.fetch(paths, on_batch=lambda urls: self.ui.post(self.show_signed_urls, urls, workspace)),
+            on_success=lambda urls: self.links_ready(paths, urls),
+            on_error=lambda e: self.signed_urls_error(str(e))
+        )
+    
+    def links_ready(self, paths, urls):
+        """Put the URLs found for `paths` on the clipboard"""
+        links = [urls[path] for path in paths if urls.get(path)]
+        kind = "Signed" if self.signed_urls is not None else "Public"
+        if not links:
+            messagebox.showwarning("No URL", f"No {kind.lower()} URL available for the selection")
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append("\n".join(links))
+        missing = f" ({len(paths) - len(links)} without a URL)" if len(links) < len(paths) else ""
+        if len(links) == 1 and not missing:
             self.update_status("URL copied to clipboard")
-            messagebox.showinfo("Success", "Public URL copied to clipboard")
+            messagebox.showinfo("Success", f"{kind} URL copied to clipboard")
         else:
-            messagebox.showwarning("No URL", "No public URL available for this item")
+            self.update_status(f"{len(links)} URLs copied to clipboard{missing}")
+            messagebox.showinfo("Success", f"{len(links)} {kind.lower()} URLs copied to clipboard{missing}")
+    
+    def refresh_signed_urls(self):
+        """Sign listed files whose URL is missing or about to expire, in the background"""
+        if self.url_refresh_job is not None:
+            self.root.after_cancel(self.url_refresh_job)
+            self.url_refresh_job = None
+        if self.signed_urls is None:
+            return
+        paths = self.signed_urls.stale(entry.path for entry in self.store if not entry.is_folder)
+        if not paths:
+            self.schedule_url_refresh()
+            return
+        workspace = self.workspace
+        self.io.submit(
+            # Rows fill in batch by batch while the rest are still being signed
+            self.signed_urls.fetch(paths, on_batch=lambda urls: self.ui.post(self.show_signed_urls, urls, workspace)),
+            on_success=lambda _: self.schedule_url_refresh() if workspace is self.workspace else None,
+            on_error=lambda e: self.signed_urls_error(str(e))
+        )
+    
+    def schedule_url_refresh(self):
+        """Re-sign URLs just before the first cached one goes stale"""
+        delay = self.signed_urls.next_refresh()
+        if delay is not None:
+            self.url_refresh_job = self.root.after(int(delay * 1000) + 1, self.refresh_signed_urls)
+    
+    def show_signed_urls(self, urls, workspace):
+        """Show newly signed URLs of `workspace` in the URL column"""
+        for path, url in urls.items():
+            entry = workspace.store.get(path)
+            if entry is not None:
+                entry.public_url = url
+            # Rows on screen belong to the active workspace only
+            if workspace is self.workspace and self.files_tree.exists(path):
+                self.files_tree.set(path, "url", url)
+    
+    def signed_urls_error(self, error_msg):
+        """Signing failed; URLs are signed again on the next refresh or copy"""
+        self.update_status("Could not sign URLs")
+        messagebox.showerror("URL Error", f"Failed to sign URLs: {error_msg}")
+    
+    def prefetch(self, entries):
+        """Start a prefetch round for `entries`, most likely first, cancelling the previous round"""
+        if self.prefetcher is None or self.io is None:
+            return
+        self.cancel_prefetch()
+        self.prefetch_round = self.io.submit(self.prefetcher.run(self.backend, list(entries)))
+    
+    def cancel_prefetch(self):
+        """The user moved on: drop the files the current round has not started"""
+        if self.prefetch_round is not None:
+            self.prefetch_round.cancel()
+            self.prefetch_round = None
+    
+    def prefetch_around(self, path):
+        """Prefetch a file the user is pointing at or has selected, then its neighbours"""
+        from .prefetch import siblings
+        entry = self.store.get(path)
+        if entry is None or entry.is_folder:
+            return
+        self.prefetch([entry, *siblings(self.store, path, config.PREFETCH_SIBLINGS)])
+    
+    def prefetch_recent(self):
+        """Prefetch the files saved most recently in this bucket, after a listing"""
+        if self.prefetcher is None or self.revisions is None:
+            return
+        import asyncio
+        prefetcher, backend, store = self.prefetcher, self.backend, self.store
+        
+        async def prefetch_recent_task():
+            paths = await asyncio.to_thread(self.revisions.recent, backend.label, config.PREFETCH_RECENT)
+            return await prefetcher.run(backend, [store.get(path) for path in paths])
+        
+        self.cancel_prefetch()
+        self.prefetch_round = self.io.submit(prefetch_recent_task())
+    
+    def on_tree_motion(self, event):
+        """Prefetch the file row the pointer rests on"""
+        item_id = self.files_tree.identify_row(event.y)
+        if item_id == self.hovered_path:
+            return
+        self.hovered_path = item_id
+        if self.prefetch_hover_job is not None:
+            self.root.after_cancel(self.prefetch_hover_job)
+            self.prefetch_hover_job = None
+        if item_id and self.prefetcher is not None and not self.store.is_folder(item_id):
+            self.prefetch_hover_job = self.root.after(config.PREFETCH_HOVER_MS, self.on_tree_hover, item_id)
+    
+    def on_tree_hover(self, item_id):
+        self.prefetch_hover_job = None
+        if item_id == self.hovered_path:
+            self.prefetch_around(item_id)
+    
+    def on_tree_select(self, event=None):
+        """Prefetch a file selected with the keyboard or mouse before it is opened"""
+        selected = self.files_tree.selection()
+        if len(selected) == 1 and selected[0] != self.current_file_path:
+            self.prefetch_around(selected[0])
+    
+    def update_references(self):
+        """Re-parse articles changed since the last reference scan, in the background"""
+        if not config.REFERENCES_ENABLED or self.references is None:
+            return
+        if self.scanning_references():
+            return
+        from .references import scan
+        self.reference_scan = (self.references, self.io.submit(
+            scan(self.backend, self.references, list(self.store), self.content_cache,
+                 config.REFERENCE_SCAN_CONCURRENCY)
+        ))
+    
+    def scanning_references(self):
+        """Whether the background scan of the active workspace is still running"""
+        graph, future = self.reference_scan
+        return graph is self.references and future is not None and not future.done()
+    
+    async def index_references(self, entry, data):
+        """Re-parse the links of a viewed or saved article (runs on the I/O loop)"""
+        import asyncio
+        from .references import is_article, url_prefixes
+        if not config.REFERENCES_ENABLED or self.references is None or not is_article(entry.path):
+            return
+        self.references.update(entry.path, entry.etag, data.decode('utf-8', 'replace'),
+                               await url_prefixes(self.backend, [entry]))
+        try:
+            await asyncio.to_thread(self.references.save)
+        except OSError:
+            # Saved again with the next scan
+            pass
+    
+    def referrers_of(self, paths):
+        """Articles that reference any of `paths`, sorted"""
+        if not config.REFERENCES_ENABLED or self.references is None:
+            return []
+        referrers = set()
+        for path in paths:
+            referrers.update(self.references.referrers(path))
+        return sorted(referrers - set(paths))
+    
+    def check_links(self):
+        """Update the reference graph, then list broken links and unreferenced assets"""
+        if not config.REFERENCES_ENABLED or self.references is None:
+            messagebox.showinfo("Check Links", "Reference checking is turned off (REFERENCES_ENABLED)")
+            return
+        from .references import scan
+        workspace, entries = self.workspace, list(self.store)
+        self.start_loading("Checking links...")
+        self.io.submit(
+            scan(self.backend, self.references, entries, self.content_cache, config.REFERENCE_SCAN_CONCURRENCY,
+                 on_progress=lambda done, total: self.report_progress(done, total, "Reading articles")),
+            on_success=lambda report: self.links_checked(workspace, entries, report),
+            on_error=lambda e: self.links_error(str(e))
+        )
+    
+    def links_checked(self, workspace, entries, report):
+        """Show the results of a reference scan"""
+        from .link_window import LinkCheckWindow
+        self.stop_loading()
+        existing = {entry.path for entry in entries if not entry.is_folder}
+        broken = workspace.references.broken(existing)
+        orphans = workspace.references.orphans(entries)
+        self.update_status(f"Checked links: {len(broken)} broken, {len(orphans)} unreferenced asset(s)"
+                           + (f", {len(report.failed)} article(s) unreadable" if report.failed else ""))
+        window = None
+        
+        def open_article(path):
+            if workspace is self.workspace and self.files_tree.exists(path):
+                self.files_tree.selection_set(path)
+                self.files_tree.see(path)
+                self.view_file()
+        
+        window = LinkCheckWindow(self.root, broken, orphans, open_article,
+                                 lambda paths: self.delete_assets(workspace, paths, window))
+    
+    def links_error(self, error_msg):
+        """Handle a failed reference scan"""
+        self.stop_loading()
+        self.update_status("Link check failed")
+        messagebox.showerror("Check Links", f"Failed to check links: {error_msg}")
+    
+    def delete_assets(self, workspace, paths, window):
+        """Delete unreferenced assets picked in the link check window"""
+        if workspace is not self.workspace:
+            messagebox.showwarning("Check Links", f"Switch back to {workspace.title} to delete its files")
+            return
+        # Something may have started using them since the check
+        referrers = self.referrers_of(paths)
+        message = f"Delete {len(paths)} unreferenced file(s)?\nThis action cannot be undone."
+        if referrers:
+            message = (f"{len(referrers)} article(s) now reference some of these files:\n\n"
+                       + "\n".join(referrers[:10]) + f"\n\nDelete all {len(paths)} file(s) anyway?")
+        if not messagebox.askyesno("Delete Assets", message, icon="warning" if referrers else "question"):
+            return
+        self.start_loading("Deleting files...")
+        self.io.submit(
+            self.backend.remove(paths),
+            on_success=lambda _: self.assets_deleted(paths, window),
+            on_error=lambda e: self.delete_error(str(e))
+        )
+    
+    def assets_deleted(self, paths, window):
+        """Drop deleted assets from the tree and the link check window"""
+        self.stop_loading()
+        if self.current_file_path in paths:
+            self.clear_editor()
+        for path in paths:
+            self.store.remove(path)
+        if self.signed_urls is not None:
+            self.signed_urls.forget(paths)
+        self.sync_tree()
+        window.remove_paths(paths)
+        self.update_status(f"Deleted {len(paths)} unreferenced file(s)")
+    
+    def find_replace(self):
+        """Open find and replace for the selected files and folders (the whole bucket without a selection)"""
+        from .replace_window import ReplaceWindow
+        paths = self.selected_files()
+        scope = f"{len(paths)} selected file(s)" if paths else f"all files in {self.workspace.title}"
+        workspace = self.workspace
+        window = None
+        
+        def preview(find, replace, regex, ignore_case):
+            if paths:
+                entries = [entry for entry in map(workspace.store.get, paths) if entry is not None]
+            else:
+                entries = [entry for entry in workspace.store.walk() if not entry.is_folder]
+            self.preview_replace(window, workspace, entries, find, replace, regex, ignore_case)
+        
+        window = ReplaceWindow(self.root, scope, preview,
+                               lambda plan: self.apply_replace(window, workspace, plan),
+                               lambda: self.undo_replace(window, workspace))
+    
+    def preview_replace(self, window, workspace, entries, find, replace, regex, ignore_case):
+        """Dry run: download the files and diff them with the replacement applied"""
+        from .bulk_replace import Replacement, preview
+        if workspace is not self.workspace:
+            window.show_message(f"Switch back to {workspace.title} first")
+            return
+        try:
+            replacement = Replacement(find, replace, regex, ignore_case)
+        except ValueError as e:
+            window.show_message(str(e))
+            return
+        self.start_loading("Previewing replacement...")
+        self.io.submit(
+            preview(self.backend, entries, replacement,
+                    on_progress=lambda done, total: self.report_progress(done, total, "Previewing replacement")),
+            on_success=lambda plan: self.replace_previewed(window, plan),
+            on_error=lambda e: self.replace_error(window, str(e))
+        )
+    
+    def replace_previewed(self, window, plan):
+        """Show a dry run's diffs"""
+        self.stop_loading()
+        self.update_status(f"Preview: {plan.summary()}")
+        window.set_plan(plan)
+    
+    def editor_digest(self, paths):
+        """MD5 of the editor's text if it shows one of `paths`, else None"""
+        if self.current_file_path not in paths or self.paged_view.active:
+            return None
+        return hash_bytes(self.file_editor.get(1.0, "end-1c").encode('utf-8'))
+    
+    def apply_replace(self, window, workspace, plan):
+        """Write a previewed replacement, keeping the originals in a rollback journal"""
+        from .bulk_replace import ReplaceJournal, apply_changes
+        if workspace is not self.workspace:
+            window.show_message(f"Switch back to {workspace.title} first")
+            return
+        paths = [change.path for change in plan.changes]
+        if not messagebox.askyesno("Find and Replace", f"{plan.summary()}.\n\nWrite the {len(paths)} changed "
+                                   "file(s)? The originals are kept so this can be undone."):
+            return
+        editor_digest = self.editor_digest(paths)
+        self.start_loading("Replacing...")
+        
+        async def replace_task():
+            import asyncio
+            journal = await asyncio.to_thread(ReplaceJournal.create, self.backend.label,
+                                              plan.replacement.describe())
+            report = await apply_changes(
+                self.backend, plan, journal,
+                on_progress=lambda done, total: self.report_progress(done, total, "Replacing")
+            )
+            entries = await self.replaced_entries(report)
+            changes = {change.path: change for change in plan.changes}
+            contents = {}
+            for entry in entries:
+                change = changes[entry.path]
+                contents[entry.path] = (hash_bytes(change.before), change.after)
+                await self.record_revision(entry.path, change.before, "loaded")
+                await self.record_revision(entry.path, change.after, "replaced", entry.etag)
+                await self.index_references(entry, change.after)
+            return report, entries, contents
+        
+        self.io.submit(
+            replace_task(),
+            on_success=lambda result: self.replace_complete(window, *result, editor_digest, "Replaced"),
+            on_error=lambda e: self.replace_error(window, str(e))
+        )
+    
+    def undo_replace(self, window, workspace):
+        """Put back the files of the newest replacement in this bucket that has any left to undo"""
+        from .bulk_replace import ReplaceJournal, rollback
+        if workspace is not self.workspace:
+            window.show_message(f"Switch back to {workspace.title} first")
+            return
+        journal = next((j for j in ReplaceJournal.history(self.backend.label) if j.applied()), None)
+        if journal is None:
+            window.show_message("Nothing to undo")
+            return
+        paths = journal.applied()
+        if not messagebox.askyesno("Undo Replace", f"Undo {journal.description} in {len(paths)} file(s)?\n\n"
+                                   "Files edited since then are left as they are."):
+            return
+        editor_digest = self.editor_digest(paths)
+        self.start_loading("Undoing replacement...")
+        
+        async def undo_task():
+            import asyncio
+            report = await rollback(
+                self.backend, journal,
+                on_progress=lambda done, total: self.report_progress(done, total, "Undoing replacement")
+            )
+            entries = await self.replaced_entries(report)
+            contents = {}
+            for entry in entries:
+                original = await asyncio.to_thread(journal.original, entry.path)
+                contents[entry.path] = (journal.index["files"][entry.path]["after"], original)
+                await self.record_revision(entry.path, original, "restored", entry.etag)
+                await self.index_references(entry, original)
+            return report, entries, contents
+        
+        self.io.submit(
+            undo_task(),
+            on_success=lambda result: self.replace_complete(window, *result, editor_digest, "Undid replacement"),
+            on_error=lambda e: self.replace_error(window, str(e))
+        )
+    
+    async def replaced_entries(self, report):
+        """Store entries for the files a replacement or its undo wrote (runs on the I/O loop)"""
+        urls = await self.object_urls([path for path, *_ in report.entries])
+        return [FileEntry(path, size=size, updated=time.time(), etag=f'"{digest}"', mimetype=content_type,
+                          public_url=urls.get(path, ""), encoding=encoding)
+                for path, size, digest, content_type, encoding in report.entries]
+    
+    def replace_complete(self, window, report, entries, contents, editor_digest, verb):
+        """Update the tree (and the editor, unless it holds edits) after a replacement or its undo.
+        
+        `contents` maps each written path to (MD5 of what it held, the bytes it holds now).
+        """
+        self.stop_loading()
+        for entry in entries:
+            self.store.upsert(entry)
+        self.sync_tree()
+        if self.current_file_path in contents:
+            expected, data = contents[self.current_file_path]
+            if editor_digest == expected:
+                self.file_editor.delete(1.0, tk.END)
+                self.file_editor.insert(1.0, data.decode('utf-8'))
+        summary = f"{verb} in {report.applied} file(s)"
+        self.update_status(summary)
+        window.applied()
+        window.show_message(summary)
+        problems = [f"{path}: {reason}" for path, reason in (report.conflicts + report.failed)[:10]]
+        if problems:
+            messagebox.showwarning(
+                "Find and Replace",
+                f"{summary}. {len(report.conflicts)} left alone, {len(report.failed)} failed:\n\n" + "\n".join(problems)
+            )
+    
+    def replace_error(self, window, error_msg):
+        """Handle a failed preview, replacement or undo"""
+        self.stop_loading()
+        self.update_status("Find and replace failed")
+        window.show_message(f"Failed: {error_msg}")
+        messagebox.showerror("Find and Replace", f"Find and replace failed: {error_msg}")
     
     def create_folder(self):
         """Create a new folder by uploading a placeholder file"""
@@ -644,30 +1758,24 @@ class SupabaseMDXManager:
         
         self.start_loading("Creating folder...")
         
-        def create_folder_task():
-            try:
-                import io
-                placeholder_content = io.BytesIO(b"# This folder was created by MDX Manager")
-                
-                result = self.supabase.storage.from_(self.bucket_name).upload(
-                    file=placeholder_content,
-                    path=placeholder_path,
-                    file_options={"content-type": "text/plain"}
-                )
-                
-                self.root.after(0, lambda: self.folder_create_complete(folder_path))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.folder_create_error(str(e)))
+        async def create_folder_task():
+            data = b"# This folder was created by MDX Manager"
+            await self.backend.upload(placeholder_path, data, content_type="text/plain")
+            return await self.uploaded_entry(placeholder_path, data, "text/plain")
         
-        threading.Thread(target=create_folder_task, daemon=True).start()
+        self.io.submit(
+            create_folder_task(),
+            on_success=lambda entry: self.folder_create_complete(folder_path, entry),
+            on_error=lambda e: self.folder_create_error(str(e))
+        )
     
-    def folder_create_complete(self, folder_path):
+    def folder_create_complete(self, folder_path, placeholder):
         """Handle successful folder creation"""
         self.stop_loading()
         self.update_status(f"Created folder: {folder_path}")
         messagebox.showinfo("Success", f"Folder '{folder_path}' created successfully")
-        self.refresh_file_list()
+        self.store.upsert(placeholder)
+        self.sync_tree()
     
     def folder_create_error(self, error_msg):
         """Handle folder creation error"""
@@ -677,128 +1785,127 @@ class SupabaseMDXManager:
     
     def refresh_file_list(self):
         """Refresh the file list from Supabase"""
+        self.profiler.begin("refresh")
         self.start_loading("Loading files...")
-        
-        def load_files_task():
-            try:
-                files = self.supabase.storage.from_(self.bucket_name).list()
-                self.root.after(0, lambda: self.display_files(files))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.load_files_error(str(e)))
-        
-        threading.Thread(target=load_files_task, daemon=True).start()
+        # The listing belongs to this workspace even if another is shown by the time it arrives
+        workspace = self.workspace
+        backend = self.backend
+        signed_urls = self.signed_urls
+        
+        async def load_files_task():
+            files = []
+            from .storage_backend import walk
+            async for file_info in walk(backend, include_folders=True):
+                if file_info.get('id') is not None:
+                    if signed_urls is not None:
+                        # Signed in batches once the rows are shown (see refresh_signed_urls)
+                        file_info['public_url'] = signed_urls.get(file_info['name']) or ""
+                    else:
+                        file_info['public_url'] = await backend.public_url(file_info['name'])
+                files.append(file_info)
+            return files
+        
+        self.io.submit(
+            load_files_task(),
+            on_success=lambda files: self.display_files(files, workspace),
+            on_error=lambda e: self.load_files_error(str(e))
+        )
     
-    def display_files(self, files):
+    @timed("ui.display_files")
+    def display_files(self, files, workspace=None):
         """Enhanced display files method with better folder handling"""
-        self.stop_loading()
+        workspace = workspace or self.workspace
+        # Index the listing by path; folders missing from it are created implicitly
+        workspace.store.load(files)
+        workspace.listed = True
+        if workspace is not self.workspace:
+            # Switched away meanwhile: the listing waits in its workspace for the switch back
+            return
+        self.show_store(f"Loaded {len(files)} items")
+    
+    def show_store(self, status):
+        """Redraw the tree from the store, then show `status`"""
+        # A newer listing replaces one that is still being inserted
+        if self.display_job is not None:
+            self.display_job.cancel()
+        render_started = time.perf_counter()
         
         # Clear existing items
-        for item in self.files_tree.get_children():
-            self.files_tree.delete(item)
-        
-        # Dictionary to store folder tree items
-        folders_in_tree = {}
-        
-        # First pass: Create all folders
-        all_folder_paths = set()
-        
-        # Extract all folder paths from file paths
-        for file_info in files:
-            full_path = file_info.get('name', '')
-            if not full_path or full_path.endswith('.emptyFolderPlaceholder'):
-                continue
-                
-            # Check if this is a folder object (no 'id' field)
-            is_folder_object = file_info.get('id') is None
-            if is_folder_object:
-                all_folder_paths.add(full_path)
-            elif '/' in full_path:
-                # Extract folder path from file path
-                path_parts = full_path.split('/')[:-1]  # Remove filename
-                for i in range(len(path_parts)):
-                    folder_path = '/'.join(path_parts[:i+1])
-                    all_folder_paths.add(folder_path)
-        
-        # Create folder tree structure
-        sorted_folders = sorted(all_folder_paths, key=lambda x: (x.count('/'), x))
-        
-        for folder_path in sorted_folders:
-            if folder_path in folders_in_tree:
-                continue
-                
-            parts = folder_path.split('/')
-            folder_name = parts[-1]
-            
-            # Determine parent
-            parent_item_id = ""
-            if len(parts) > 1:
-                parent_path = '/'.join(parts[:-1])
-                parent_item_id = folders_in_tree.get(parent_path, "")
-            
+        self.files_tree.delete(*self.files_tree.get_children())
+        self.visible_paths = None
+        
+        # Rows are inserted a frame-sized batch at a time, each folder before its contents
+        entries = list(self.store.walk())
+        
+        def insert_row(entry):
+            self.insert_entry(entry, "end")
+        
+        def insert_done():
+            self.display_job = None
+            # Rows are inserted over several frames, so time the whole render too
+            if self.metrics.enabled:
+                self.metrics.record("ui.display_files.render", time.perf_counter() - render_started)
+            # Re-apply a search typed while rows were still being inserted
+            if self.search_var.get():
+                self.apply_filter()
+            # Back in a workspace, the rows selected when it was left are selected again
+            selection = [path for path in self.workspace.selection if self.files_tree.exists(path)]
+            if selection:
+                self.files_tree.selection_set(*selection)
+                self.files_tree.see(selection[0])
+            self.stop_loading()
+            self.update_status(status)
+            self.finish_profile("refresh")
+            self.startup.finish("first_listing")
+            self.refresh_signed_urls()
+            self.update_references()
+            self.prefetch_recent()
+        
+        self.display_job = self.ui.run_incremental(
+            entries,
+            insert_row,
+            on_progress=lambda done: self.report_progress(done, len(entries), "Displaying files"),
+            on_done=insert_done
+        )
+
+    def insert_entry(self, entry, index):
+        """Insert the tree row for `entry` (its item id is its path)"""
+        if entry.is_folder:
             # Get saved folder state (default to False for collapsed)
-            is_open = self.folder_states.get(folder_path, False)
-            
-            # Choose icon based on state
-            folder_icon = "📂" if is_open else "📁"
-            
-            folder_item_id = self.files_tree.insert(
-                parent_item_id,
-                "end",
-                text=folder_icon,
-                values=(folder_name, folder_path, "", "", ""),
+            is_open = self.folder_states.get(entry.path, False)
+            self.files_tree.insert(
+                entry.parent, index, iid=entry.path,
+                text="📂" if is_open else "📁",
+                values=self.row_values(entry),
                 tags=("folder",),
                 open=is_open
             )
-            folders_in_tree[folder_path] = folder_item_id
-        
-        # Second pass: Add files to their respective folders
-        for file_info in files:
-            full_path = file_info.get('name', '')
-            
-            # Skip folder objects and placeholder files
-            if (not full_path or 
-                full_path.endswith('.emptyFolderPlaceholder') or 
-                file_info.get('id') is None):
-                continue
-            
-            # Determine file name and parent folder
-            if '/' in full_path:
-                parts = full_path.split('/')
-                file_name = parts[-1]
-                parent_path = '/'.join(parts[:-1])
-                parent_item_id = folders_in_tree.get(parent_path, "")
-            else:
-                file_name = full_path
-                parent_item_id = ""
-            
-            # Get file metadata
-            metadata = file_info.get('metadata', {})
-            file_size = metadata.get('size', 0)
-            size = self.format_file_size(file_size)
-            modified = self.format_date(file_info.get('updated_at', ''))
-            
-            # Get public URL
-            try:
-                url_response = self.supabase.storage.from_(self.bucket_name).get_public_url(full_path)
-                public_url = url_response if isinstance(url_response, str) else ""
-            except:
-                public_url = ""
-            
-            # Insert file
+        else:
             self.files_tree.insert(
-                parent_item_id,
-                "end",
+                entry.parent, index, iid=entry.path,
                 text="📄",
-                values=(file_name, full_path, size, modified, public_url),
+                values=self.row_values(entry),
                 tags=("file",)
             )
-        
-        # Configure tag styles
-        self.files_tree.tag_configure("folder", background="#f0f8ff")
-        self.files_tree.tag_configure("file", background="white")
-        
-        self.update_status(f"Loaded {len(files)} items")
+
+    def row_values(self, entry):
+        """Column values for `entry`, formatted for display"""
+        if entry.is_folder:
+            # Folders show the total size and latest change of everything below them
+            return (
+                entry.name,
+                entry.path,
+                self.format_file_size(entry.size),
+                self.format_timestamp(entry.updated),
+                "",
+            )
+        return (
+            entry.name,
+            entry.path,
+            self.format_file_size(entry.size),
+            self.format_timestamp(entry.updated),
+            entry.public_url,
+        )
 
     def setup_tree_events(self):
         """Setup additional tree events for folder handling"""
@@ -808,6 +1915,10 @@ class SupabaseMDXManager:
         
         # Also handle single-click selection for visual feedback
         self.files_tree.bind("<Button-1>", self.on_tree_click)
+        
+        # Files under the pointer or newly selected are prefetched
+        self.files_tree.bind("<Motion>", self.on_tree_motion)
+        self.files_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
     def on_tree_click(self, event):
         """Handle single click to update folder icons"""
@@ -815,8 +1926,7 @@ class SupabaseMDXManager:
         if not item_id:
             return
         
-        item = self.files_tree.item(item_id)
-        if "folder" in item.get('tags', []):
+        if self.store.is_folder(item_id):
             # Check if click was on the triangle (expand/collapse area)
             region = self.files_tree.identify_region(event.x, event.y)
             if region == "tree":
@@ -833,6 +1943,77 @@ class SupabaseMDXManager:
         
         # Setup tree events
         self.setup_tree_events()
+        
+        # Diagnostics window and the hidden diagnostics menu
+        self.root.bind("<F12>", lambda event: self.open_diagnostics())
+        self.root.bind("<Control-Shift-D>", self.show_diagnostics_menu)
+        self.root.bind("<Control-Shift-H>", lambda event: self.find_replace())
+
+    def open_diagnostics(self):
+        """Show timing spans for storage calls and heavy UI work"""
+        from .diagnostics import DiagnosticsWindow
+        window = getattr(self, 'diagnostics_window', None)
+        if window is not None and window.window.winfo_exists():
+            window.window.lift()
+            return
+        governor = self.backend.governor if self.backend is not None else None
+        self.diagnostics_window = DiagnosticsWindow(self.root, self.metrics, governor)
+
+    def show_diagnostics_menu(self, event=None):
+        """Pop up the hidden diagnostics menu at the pointer"""
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(label="Diagnostics Window", accelerator="F12", command=self.open_diagnostics)
+        menu.add_separator()
+        profiling = self.profiler.active is not None
+        for action, label in (("refresh", "Profile Next Refresh"),
+                              ("search", "Profile Search Typing"),
+                              ("upload", "Profile Next Upload")):
+            menu.add_command(label=label, command=lambda a=action: self.arm_profile(a),
+                             state="disabled" if profiling else "normal")
+        menu.add_separator()
+        if profiling:
+            menu.add_command(label=f"Stop Profiling ({self.profiler.active})", command=self.stop_profiling)
+        else:
+            menu.add_command(label="Start Profiling", command=self.start_profiling)
+        menu.post(self.root.winfo_pointerx(), self.root.winfo_pointery())
+
+    def arm_profile(self, action):
+        """Profile the next occurrence of a user action"""
+        self.profiler.arm(action)
+        if action == "refresh":
+            self.refresh_file_list()
+        else:
+            self.update_status(f"Profiling the next {action}...")
+
+    def start_profiling(self):
+        """Profile everything until stopped from the diagnostics menu"""
+        if self.profiler.start():
+            self.update_status("Profiling... stop it from the diagnostics menu (Ctrl+Shift+D)")
+
+    def stop_profiling(self):
+        """Stop a profile started by hand or still waiting for its action to end"""
+        self.report_profile(self.profiler.stop())
+
+    def finish_profile(self, action):
+        """End the profile of `action` if one is running and report where it was written"""
+        self.report_profile(self.profiler.end(action))
+
+    def report_profile(self, paths):
+        if paths:
+            self.update_status(f"Profile written: {', '.join(os.path.basename(p) for p in paths)} in {os.path.dirname(paths[0])}")
+
+    def profile_search_keystroke(self):
+        """Search typing is one action: it ends once keystrokes stop for a moment"""
+        self.profiler.begin("search")
+        if self.profiler.active != "search":
+            return
+        if self.search_profile_timer is not None:
+            self.root.after_cancel(self.search_profile_timer)
+        self.search_profile_timer = self.root.after(config.PROFILE_SEARCH_IDLE_MS, self.end_search_profile)
+
+    def end_search_profile(self):
+        self.search_profile_timer = None
+        self.finish_profile("search")
 
     def toggle_folder(self, item_id):
         """Toggle folder expand/collapse state"""
@@ -841,9 +2022,7 @@ class SupabaseMDXManager:
         self.files_tree.item(item_id, open=new_state)
         
         # Update icon and save state
-        item = self.files_tree.item(item_id)
-        folder_path = item['values'][1]
-        self.folder_states[folder_path] = new_state
+        self.folder_states[item_id] = new_state
         
         if new_state:
             self.files_tree.item(item_id, text="📂")
@@ -865,28 +2044,7 @@ class SupabaseMDXManager:
         remote_path = f"{folder_path}/{filename}"
         
         # Use existing upload logic but with predefined path
-        self.start_loading("Uploading file...")
-        
-        def upload_task():
-            try:
-                with open(file_path, "rb") as f:
-                    result = self.supabase.storage.from_(self.bucket_name).upload(
-                        file=f,
-                        path=remote_path,
-                        file_options={"content-type": "text/markdown"}
-                    )
-                
-                self.root.after(0, lambda: self.upload_complete(result, remote_path))
-                
-            except StorageApiError as e:
-                if "already exists" in str(e):
-                    self.root.after(0, lambda: self.handle_file_exists(file_path, remote_path))
-                else:
-                    self.root.after(0, lambda e=e: self.upload_error(str(e)))
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.upload_error(str(e)))
-        
-        threading.Thread(target=upload_task, daemon=True).start()
+        self.start_upload(file_path, remote_path)
 
     def create_subfolder(self, parent_folder):
         """Create subfolder within existing folder"""
@@ -903,61 +2061,153 @@ class SupabaseMDXManager:
         
         self.start_loading("Creating subfolder...")
         
-        def create_task():
-            try:
-                import io
-                placeholder_content = io.BytesIO(b"# Subfolder created by MDX Manager")
-                
-                result = self.supabase.storage.from_(self.bucket_name).upload(
-                    file=placeholder_content,
-                    path=placeholder_path,
-                    file_options={"content-type": "text/plain"}
-                )
-                
-                self.root.after(0, lambda: self.folder_create_complete(folder_path))
-                
-            except Exception as e:
-                self.root.after(0, lambda e=e: self.folder_create_error(str(e)))
+        async def create_task():
+            data = b"# Subfolder created by MDX Manager"
+            await self.backend.upload(placeholder_path, data, content_type="text/plain")
+            return await self.uploaded_entry(placeholder_path, data, "text/plain")
         
-        threading.Thread(target=create_task, daemon=True).start()
+        self.io.submit(
+            create_task(),
+            on_success=lambda entry: self.folder_create_complete(folder_path, entry),
+            on_error=lambda e: self.folder_create_error(str(e))
+        )
+    
+    def apply_cache_policy(self, folder_path):
+        """Find objects under a folder whose Cache-Control differs from the policy, then fix them"""
+        from .cache_policy import CachePolicy, reapply
+        try:
+            policy = CachePolicy()
+        except ValueError as e:
+            messagebox.showerror("Cache Policy", str(e))
+            return
+        self.start_loading(f"Checking Cache-Control under {folder_path}...")
+        self.io.submit(
+            reapply(self.backend, policy, folder_path, dry_run=True,
+                    on_progress=lambda checked, changed: self.update_status(f"Checked {checked} object(s)...")),
+            on_success=lambda report: self.cache_policy_checked(policy, folder_path, report),
+            on_error=lambda e: self.cache_policy_error(str(e))
+        )
+    
+    def cache_policy_checked(self, policy, folder_path, report):
+        """Confirm re-uploading the objects a dry run found"""
+        from .cache_policy import reapply
+        self.stop_loading()
+        self.update_status(report.summary(dry_run=True))
+        if not report.changed:
+            messagebox.showinfo("Cache Policy", f"Everything under {folder_path} already follows the policy.\n\n"
+                                f"{report.summary(dry_run=True)}")
+            return
+        examples = "\n".join(f"{path}: {old} → {new}" for path, old, new in report.changed[:10])
+        if not messagebox.askyesno("Cache Policy", f"{len(report.changed)} object(s) under {folder_path} have a "
+                                   f"different Cache-Control:\n\n{examples}\n\nUpload them again with the "
+                                   "policy's value? Their content does not change."):
+            return
+        self.start_loading("Applying cache policy...")
+        total = len(report.changed)
+        self.io.submit(
+            reapply(self.backend, policy, folder_path,
+                    on_progress=lambda checked, changed: self.report_progress(changed, total, "Applying cache policy")),
+            on_success=self.cache_policy_applied,
+            on_error=lambda e: self.cache_policy_error(str(e))
+        )
+    
+    def cache_policy_applied(self, report):
+        self.stop_loading()
+        self.update_status(report.summary())
+        if report.failed:
+            failures = "\n".join(f"{path}: {error}" for path, error in report.failed[:10])
+            messagebox.showwarning("Cache Policy", f"{report.summary()}:\n\n{failures}")
+    
+    def cache_policy_error(self, error_msg):
+        self.stop_loading()
+        self.update_status("Applying the cache policy failed")
+        messagebox.showerror("Cache Policy", f"Failed to apply the cache policy: {error_msg}")
     
     def load_files_error(self, error_msg):
         """Handle file loading error"""
         self.stop_loading()
+        self.finish_profile("refresh")
+        self.startup.finish("first_listing")
         self.update_status("Failed to load files")
         messagebox.showerror("Load Error", f"Failed to load files: {error_msg}")
     
+    @timed("ui.filter_files")
     def filter_files(self, *args):
         """Filter files based on search query"""
+        self.profile_search_keystroke()
+        
+        # Rows still being inserted are filtered once the listing is displayed
+        if self.display_job is not None:
+            return
+        self.apply_filter()
+    
+    def apply_filter(self):
+        """Show only rows matching the search query, and the folders leading to them"""
         query = self.search_var.get().lower()
+        if query:
+            # An item stays visible if it matches or anything below it does
+            visible = set()
+            for entry in self.store:
+                if query in entry.search_key and entry.path not in visible:
+                    visible.add(entry.path)
+                    for folder in self.store.ancestors(entry.path):
+                        if folder in visible:
+                            break
+                        visible.add(folder)
+            self.visible_paths = visible
+        else:
+            self.visible_paths = None
         
-        def filter_item(item):
-            values = self.files_tree.item(item, 'values')
-            name = values[0].lower() if values and len(values) > 0 else ""
-            path = values[1].lower() if values and len(values) > 1 else ""
-            
-            # Check if item matches query
-            matches = query == "" or query in name or query in path
-            
-            # Check children
-            children = self.files_tree.get_children(item)
-            children_match = False
-            
-            for child in children:
-                if filter_item(child):
-                    children_match = True
-            
-            # Show/hide item based on match
-            if matches or children_match:
-                self.files_tree.reattach(item, self.files_tree.parent(item), 'end')
-                return True
+        self.arrange_tree()
+    
+    def sort_by(self, column):
+        """Sort the tree by a column; clicking the same heading again reverses the order"""
+        reverse = column == self.store.sort_column and not self.store.sort_reverse
+        self.store.set_sort(column, reverse)
+        for name, title in SORTABLE_COLUMNS.items():
+            arrow = (" ▼" if reverse else " ▲") if name == column else ""
+            self.files_tree.heading(name, text=title + arrow)
+        # A listing still being inserted already follows the new order
+        if self.display_job is None:
+            self.arrange_tree()
+    
+    def sync_tree(self):
+        """Redraw only the rows the store reports as changed"""
+        touched, removed = self.store.take_changes()
+        if self.display_job is not None:
+            # A listing is still being inserted; load a fresh one instead of patching it
+            self.refresh_file_list()
+            return
+        
+        folders = set()
+        for path in removed:
+            if self.files_tree.exists(path):
+                self.files_tree.delete(path)
+            folders.add(path.rpartition('/')[0])
+        # Parents before children so new folders exist before their contents
+        for path in sorted(touched, key=lambda p: p.count('/')):
+            entry = self.store.get(path)
+            if self.files_tree.exists(path):
+                self.files_tree.item(path, values=self.row_values(entry))
             else:
-                self.files_tree.detach(item)
-                return False
+                self.insert_entry(entry, "end")
+            folders.add(entry.parent)
         
-        # Filter all root items
-        for item in self.files_tree.get_children():
-            filter_item(item)
+        if self.visible_paths is not None:
+            self.apply_filter()
+        else:
+            self.arrange_tree([folder for folder in folders if folder == "" or folder in self.store])
+    
+    def arrange_tree(self, folders=None):
+        """Set the visible children of each folder, in display order, with one Tk call per folder"""
+        visible = self.visible_paths
+        for folder in ("", *self.store.folders()) if folders is None else folders:
+            if visible is not None and folder and folder not in visible:
+                continue
+            children = self.store.children(folder)
+            if visible is not None:
+                children = [path for path in children if path in visible]
+            self.files_tree.set_children(folder, *children)
     
     # Event handlers
     
@@ -967,18 +2217,19 @@ class SupabaseMDXManager:
         if not selected:
             return
         
-        item = self.files_tree.item(selected[0])
+        entry = self.store.get(selected[0])
+        if entry is None:
+            return
         
         # Check if it's a folder
-        if "folder" in item.get('tags', []):
+        if entry.is_folder:
             # Toggle folder open/closed state
             current_state = self.files_tree.item(selected[0], 'open')
             new_state = not current_state
             self.files_tree.item(selected[0], open=new_state)
             
             # Save the folder state
-            folder_path = item['values'][1]  # Full path of the folder
-            self.folder_states[folder_path] = new_state
+            self.folder_states[entry.path] = new_state
             
             # Update folder icon based on state
             if new_state:
@@ -987,7 +2238,7 @@ class SupabaseMDXManager:
                 self.files_tree.item(selected[0], text="📁")  # Closed folder
         
         # If it's a file, open it for viewing
-        elif "file" in item.get('tags', []) and item['values'][1]:
+        else:
             self.view_file()
 
     def on_tree_open(self, event):
@@ -997,11 +2248,9 @@ class SupabaseMDXManager:
             return
         
         item_id = selected[0]
-        item = self.files_tree.item(item_id)
         
-        if "folder" in item.get('tags', []):
-            folder_path = item['values'][1]
-            self.folder_states[folder_path] = True
+        if self.store.is_folder(item_id):
+            self.folder_states[item_id] = True
             self.files_tree.item(item_id, text="📂")  # Open folder icon
 
     def on_tree_close(self, event):
@@ -1011,11 +2260,9 @@ class SupabaseMDXManager:
             return
         
         item_id = selected[0]
-        item = self.files_tree.item(item_id)
         
-        if "folder" in item.get('tags', []):
-            folder_path = item['values'][1]
-            self.folder_states[folder_path] = False
+        if self.store.is_folder(item_id):
+            self.folder_states[item_id] = False
             self.files_tree.item(item_id, text="📁")  # Closed folder icon
     
     def show_context_menu(self, event):
@@ -1024,15 +2271,16 @@ class SupabaseMDXManager:
         if not item_id:
             return
             
-        self.files_tree.selection_set(item_id)
-        item = self.files_tree.item(item_id)
+        # Right-clicking inside a multiple selection keeps it for "Copy Links for Selection"
+        if item_id not in self.files_tree.selection():
+            self.files_tree.selection_set(item_id)
         
         # Clear existing menu
         self.context_menu.delete(0, tk.END)
         
-        if "folder" in item.get('tags', []):
+        if self.store.is_folder(item_id):
             # Folder context menu
-            folder_path = item['values'][1]
+            folder_path = item_id
             is_open = self.files_tree.item(item_id, 'open')
             
             if is_open:
@@ -1047,6 +2295,12 @@ class SupabaseMDXManager:
                                         command=lambda: self.upload_file_to_folder(folder_path))
             self.context_menu.add_command(label="📂 Create Subfolder", 
                                         command=lambda: self.create_subfolder(folder_path))
+            self.context_menu.add_command(label="🔗 Copy Links for Selection",
+                                        command=self.copy_links_for_selection)
+            self.context_menu.add_command(label="🔁 Find and Replace in Selection",
+                                        command=self.find_replace)
+            self.context_menu.add_command(label="🕒 Apply Cache Policy",
+                                        command=lambda: self.apply_cache_policy(folder_path))
             self.context_menu.add_separator()
             self.context_menu.add_command(label="🏷️ Rename Folder", 
                                         command=lambda: self.rename_folder(item_id))
@@ -1058,6 +2312,8 @@ class SupabaseMDXManager:
             self.context_menu.add_command(label="📥 Download", command=self.download_file)
             self.context_menu.add_command(label="✏️ Rename", command=self.rename_file)
             self.context_menu.add_command(label="🔗 Copy URL", command=self.copy_url)
+            self.context_menu.add_command(label="🔗 Copy Links for Selection", command=self.copy_links_for_selection)
+            self.context_menu.add_command(label="🔁 Find and Replace in Selection", command=self.find_replace)
             self.context_menu.add_separator()
             self.context_menu.add_command(label="🗑️ Delete", command=self.delete_file)
         
@@ -1074,6 +2330,12 @@ class SupabaseMDXManager:
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
     
+    def format_timestamp(self, timestamp):
+        """Format seconds since the epoch like format_date"""
+        if timestamp is None:
+            return ""
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M")
+    
     def format_date(self, date_string):
         """Format date string"""
         try:
@@ -1086,24 +2348,55 @@ class SupabaseMDXManager:
     def start_loading(self, message="Loading..."):
         """Start loading animation"""
         self.update_status(message)
-        self.progress_bar.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(5, 0))
-        self.progress_bar.start(10)
+        self.ui.coalesce("progress", self._show_busy)
         
         # Disable main buttons during operation
         self.upload_btn.config(state="disabled")
+        self.upload_folder_btn.config(state="disabled")
+        self.sync_btn.config(state="disabled")
         self.refresh_btn.config(state="disabled")
         self.create_folder_btn.config(state="disabled")
+        self.export_btn.config(state="disabled")
+        self.links_btn.config(state="disabled")
+        self.workspace_combo.config(state="disabled")
     
     def stop_loading(self):
         """Stop loading animation"""
-        self.progress_bar.stop()
-        self.progress_bar.grid_remove()
+        self.ui.coalesce("progress", self._hide_progress)
         
         # Re-enable buttons
         self.upload_btn.config(state="normal")
+        self.upload_folder_btn.config(state="normal")
+        self.sync_btn.config(state="normal")
         self.refresh_btn.config(state="normal")
         self.create_folder_btn.config(state="normal")
+        self.export_btn.config(state="normal")
+        self.links_btn.config(state="normal")
+        self.workspace_combo.config(state="readonly")
+    
+    def _hide_progress(self):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='indeterminate')
+        self.progress_bar.grid_remove()
+    
+    def report_progress(self, done, total, message):
+        """Show determinate progress; repeated reports within a frame collapse into one"""
+        self.ui.coalesce("progress", self._show_progress, done, total, message)
+    
+    def _show_progress(self, done, total, message):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate', maximum=max(total, 1))
+        self.progress_var.set(done)
+        self._show_status(f"{message}... {done}/{total}", datetime.now())
+    
+    def _show_busy(self):
+        self.progress_bar.config(mode='indeterminate')
+        self.progress_bar.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        self.progress_bar.start(10)
     
     def update_status(self, message):
-        """Update status bar message"""
-        self.status_bar.config(text=f"{datetime.now().strftime('%H:%M:%S')} - {message}")
\ No newline at end of file
+        """Update status bar message (applied once per frame)"""
+        self.ui.coalesce("status", self._show_status, message, datetime.now())
+    
+    def _show_status(self, message, when):
+        self.status_bar.config(text=f"{when.strftime('%H:%M:%S')} - {message}")
\ No newline at end of file
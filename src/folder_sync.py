@@ -0,0 +1,376 @@
+# Module for two-way sync between a local folder and a bucket prefix
+import asyncio
+import json
+import os
+import time
+
+from . import config
+from .bulk_upload import local_files
+from .compression import decode, encode
+from .content_hash import etag_digest, hash_bytes, hash_file
+from .file_store import PLACEHOLDER_NAMES
+from .image_pipeline import detect_content_type, is_variant, publish_variants
+from .storage_backend import walk
+
+# How conflicting changes are resolved: reported and left alone, or one side wins
+CONFLICT_POLICIES = ("skip", "local", "remote")
+
+
+class SyncState:
+    """What both sides held after the last sync of one folder/bucket/prefix pair.
+
+    `files` maps paths relative to the folder and prefix to the agreed content
+    hash, the local size and mtime and the remote eTag. Local files whose size
+    and mtime still match are not re-hashed, and a remote object whose eTag
+    still matches is known to be unchanged, so a repeat sync costs one listing
+    plus the changed files.
+    """
+
+    def __init__(self, directory, bucket, prefix, path=None):
+        key = hash_bytes(f"{bucket}\n{prefix}\n{os.path.abspath(directory)}".encode("utf-8"))
+        self.path = path or os.path.join(config.CACHE_DIR, f"sync-{key[:16]}.json")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get("files", {})
+        self.last_sync = data.get("last_sync")
+
+    def save(self):
+        """Write the state atomically, via a temp file."""
+        self.last_sync = time.time()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"last_sync": self.last_sync, "files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class SyncPlan:
+    """Transfers that make a folder and a prefix match, as computed by build_plan().
+
+    Paths are relative to both roots. `agreed` holds files that already match
+    but are not yet recorded in the state; `conflicts` holds (path, reason)
+    pairs that were left alone.
+    """
+
+    __slots__ = ("local", "remote", "uploads", "downloads", "delete_remote", "delete_local",
+                 "move_remote", "move_local", "agreed", "conflicts")
+
+    def __init__(self, local, remote):
+        self.local = local
+        self.remote = remote
+        self.uploads = []
+        self.downloads = []
+        self.delete_remote = []
+        self.delete_local = []
+        self.move_remote = []
+        self.move_local = []
+        self.agreed = []
+        self.conflicts = []
+
+    def __len__(self):
+        """Number of transfers, deletes and moves to run."""
+        return (len(self.uploads) + len(self.downloads) + len(self.delete_remote)
+                + len(self.delete_local) + len(self.move_remote) + len(self.move_local))
+
+    def summary(self):
+        counts = [
+            (len(self.uploads), "upload"), (len(self.downloads), "download"),
+            (len(self.delete_remote), "remote delete"), (len(self.delete_local), "local delete"),
+            (len(self.move_remote), "remote move"), (len(self.move_local), "local move"),
+            (len(self.conflicts), "conflict"),
+        ]
+        parts = [f"{count} {label}{'s' if count != 1 else ''}" for count, label in counts if count]
+        return ", ".join(parts) or "already in sync"
+
+    def describe(self, limit=None):
+        """One line per planned action, for dry runs."""
+        lines = ([f"upload   {p}" for p in self.uploads]
+                 + [f"download {p}" for p in self.downloads]
+                 + [f"delete   {p} (remote)" for p in self.delete_remote]
+                 + [f"delete   {p} (local)" for p in self.delete_local]
+                 + [f"move     {a} -> {b} (remote)" for a, b in self.move_remote]
+                 + [f"move     {a} -> {b} (local)" for a, b in self.move_local]
+                 + [f"conflict {p}: {reason}" for p, reason in self.conflicts])
+        if limit is not None and len(lines) > limit:
+            lines = lines[:limit] + [f"... and {len(lines) - limit} more"]
+        return lines
+
+
+class SyncReport:
+    """What apply_plan() did."""
+
+    __slots__ = ("applied", "failed", "bytes_sent", "bytes_received")
+
+    def __init__(self):
+        self.applied = 0
+        self.failed = []
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def remote_path(prefix, relative):
+    return f"{prefix}/{relative}" if prefix else relative
+
+
+def scan_local(directory, state):
+    """Relative path -> {"md5", "size", "mtime"} for the files below `directory`.
+
+    Only files whose size or mtime differ from the last sync are hashed.
+    Image variants are generated from their originals and never synced.
+    """
+    files = {}
+    for local_path, relative in local_files(directory):
+        if is_variant(relative):
+            continue
+        stat = os.stat(local_path)
+        base = state.files.get(relative)
+        if base is not None and base.get("size") == stat.st_size and base.get("mtime") == stat.st_mtime:
+            md5 = base["md5"]
+        else:
+            md5 = hash_file(local_path)
+        files[relative] = {"md5": md5, "size": stat.st_size, "mtime": stat.st_mtime}
+    return files
+
+
+async def scan_remote(backend, prefix):
+    """Relative path -> {"etag", "size", "updated_at", "encoding"} for the objects under `prefix`."""
+    prefix = prefix.strip("/")
+    start = len(prefix) + 1 if prefix else 0
+    files = {}
+    async for item in walk(backend, prefix):
+        if item["name"].rpartition("/")[2] in PLACEHOLDER_NAMES or is_variant(item["name"]):
+            continue
+        metadata = item.get("metadata") or {}
+        files[item["name"][start:]] = {
+            "etag": metadata.get("eTag"),
+            "size": metadata.get("size") or 0,
+            "updated_at": item.get("updated_at"),
+            "encoding": metadata.get("contentEncoding"),
+        }
+    return files
+
+
+def _compare(local, remote, base):
+    """Action for one path: "same", "unchanged", "upload", "download", the deletes,
+    "verify" (remote content unknown) or a conflict reason."""
+    local_changed = base is None or (local is not None and local["md5"] != base["md5"])
+    remote_changed = base is None or (remote is not None and remote["etag"] != base["etag"])
+    if local is not None and remote is not None:
+        if base is not None and not local_changed and not remote_changed:
+            return "unchanged"
+        if etag_digest(remote["etag"]) == local["md5"]:
+            return "same"
+        if base is not None and not remote_changed:
+            return "upload"
+        if base is not None and not local_changed:
+            return "download"
+        # The eTag may hash other bytes (compressed, or not an MD5): compare the content
+        return "verify"
+    if local is not None:
+        if base is None:
+            return "upload"
+        return "changed locally, deleted remotely" if local_changed else "delete_local"
+    if base is None:
+        return "download"
+    return "changed remotely, deleted locally" if remote_changed else "delete_remote"
+
+
+def _resolve(plan, relative, reason, conflicts):
+    if conflicts == "local":
+        (plan.uploads if relative in plan.local else plan.delete_remote).append(relative)
+    elif conflicts == "remote":
+        (plan.downloads if relative in plan.remote else plan.delete_local).append(relative)
+    else:
+        plan.conflicts.append((relative, reason))
+
+
+def _find_moves(plan, state):
+    """Turn a delete plus a transfer of the same content into a move on the other side."""
+    uploads = {plan.local[p]["md5"]: p for p in plan.uploads if p not in plan.remote}
+    for relative in list(plan.delete_remote):
+        base = state.files[relative]
+        if plan.remote[relative]["etag"] != base["etag"]:
+            continue
+        target = uploads.pop(base["md5"], None)
+        if target is not None:
+            plan.delete_remote.remove(relative)
+            plan.uploads.remove(target)
+            plan.move_remote.append((relative, target))
+    downloads = {}
+    for relative in plan.downloads:
+        digest = etag_digest(plan.remote[relative]["etag"])
+        if digest is not None and relative not in plan.local:
+            downloads[digest] = relative
+    for relative in list(plan.delete_local):
+        base = state.files[relative]
+        if plan.local[relative]["md5"] != base["md5"]:
+            continue
+        target = downloads.pop(base["md5"], None)
+        if target is not None:
+            plan.delete_local.remove(relative)
+            plan.downloads.remove(target)
+            plan.move_local.append((relative, target))
+
+
+async def build_plan(backend, directory, prefix, state, conflicts="skip", concurrency=4):
+    """Compare both sides with the last sync and return a SyncPlan; nothing is changed.
+
+    Objects that changed on both sides, or exist on both without a previous
+    sync, are downloaded once unless the eTag already shows they match.
+    """
+    if conflicts not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy: {conflicts!r}")
+    prefix = prefix.strip("/")
+    local = await asyncio.to_thread(scan_local, directory, state)
+    remote = await scan_remote(backend, prefix)
+    plan = SyncPlan(local, remote)
+    to_verify = []
+    for relative in sorted(local.keys() | remote.keys()):
+        action = _compare(local.get(relative), remote.get(relative), state.files.get(relative))
+        if action == "unchanged":
+            continue
+        if action == "same":
+            plan.agreed.append(relative)
+        elif action == "verify":
+            to_verify.append(relative)
+        elif action in ("upload", "download", "delete_local", "delete_remote"):
+            getattr(plan, action if action.startswith("delete") else f"{action}s").append(relative)
+        else:
+            _resolve(plan, relative, action, conflicts)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(relative):
+        async with semaphore:
+            response = await backend.download(remote_path(prefix, relative))
+        data = await decode(response, remote[relative].get("encoding"))
+        if hash_bytes(data) == local[relative]["md5"]:
+            plan.agreed.append(relative)
+        else:
+            reason = "changed on both sides" if relative in state.files else "differs on both sides"
+            _resolve(plan, relative, reason, conflicts)
+
+    await asyncio.gather(*(verify(relative) for relative in to_verify))
+    _find_moves(plan, state)
+    return plan
+
+
+async def apply_plan(backend, plan, directory, prefix, state, concurrency=4, on_progress=None,
+                     variant_cache=None):
+    """Run a plan with at most `concurrency` operations at a time and save the new state.
+
+    Each operation updates the state only when it succeeds, so a failed or
+    interrupted sync is picked up where it stopped next time.
+    `on_progress(done, total)` is called from the event loop. Returns a SyncReport.
+    """
+    prefix = prefix.strip("/")
+    report = SyncReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(plan)
+    done = 0
+
+    def local_path(relative):
+        return os.path.join(directory, *relative.split("/"))
+
+    def record(relative, md5, etag):
+        stat = os.stat(local_path(relative))
+        state.files[relative] = {"md5": md5, "size": stat.st_size, "mtime": stat.st_mtime, "etag": etag}
+
+    def write_local(relative, data):
+        path = local_path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def prune(relative):
+        # Drop folders a delete or move left empty, up to the sync root
+        parent = os.path.dirname(local_path(relative))
+        while os.path.normpath(parent) != os.path.normpath(directory) and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+    def remove_local(relative):
+        os.remove(local_path(relative))
+        prune(relative)
+
+    def move_local(source, target):
+        os.makedirs(os.path.dirname(local_path(target)), exist_ok=True)
+        os.replace(local_path(source), local_path(target))
+        prune(source)
+
+    async def upload(relative):
+        path = remote_path(prefix, relative)
+        data = await asyncio.to_thread(_read, local_path(relative))
+        content_type = detect_content_type(data, path)
+        payload, encoding = await encode(data, content_type)
+        write = backend.update if relative in plan.remote else backend.upload
+        await write(path, payload, content_type, content_encoding=encoding)
+        report.bytes_sent += len(payload)
+        for _, variant, _ in await publish_variants(backend, path, data, content_type, variant_cache):
+            report.bytes_sent += len(variant)
+        # The new eTag is filled in from a listing once everything has run
+        record(relative, hash_bytes(data), None)
+
+    async def download(relative):
+        response = await backend.download(remote_path(prefix, relative))
+        report.bytes_received += len(response)
+        data = await decode(response, plan.remote[relative].get("encoding"))
+        await asyncio.to_thread(write_local, relative, data)
+        record(relative, hash_bytes(data), plan.remote[relative]["etag"])
+
+    async def delete_remote(relative):
+        await backend.remove([remote_path(prefix, relative)])
+        state.files.pop(relative, None)
+
+    async def delete_local(relative):
+        await asyncio.to_thread(remove_local, relative)
+        state.files.pop(relative, None)
+
+    async def move_remote(source, target):
+        await backend.move(remote_path(prefix, source), remote_path(prefix, target))
+        record(target, state.files.pop(source)["md5"], None)
+
+    async def move_local_file(source, target):
+        await asyncio.to_thread(move_local, source, target)
+        state.files.pop(source, None)
+        record(target, plan.local[source]["md5"], plan.remote[target]["etag"])
+
+    async def run(operation, *paths):
+        nonlocal done
+        async with semaphore:
+            try:
+                await operation(*paths)
+                report.applied += 1
+            except Exception as e:
+                report.failed.append((" -> ".join(paths), str(e)))
+            finally:
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, total)
+
+    for relative in plan.agreed:
+        record(relative, plan.local[relative]["md5"], plan.remote[relative]["etag"])
+    await asyncio.gather(
+        *(run(upload, p) for p in plan.uploads),
+        *(run(download, p) for p in plan.downloads),
+        *(run(delete_remote, p) for p in plan.delete_remote),
+        *(run(delete_local, p) for p in plan.delete_local),
+        *(run(move_remote, a, b) for a, b in plan.move_remote),
+        *(run(move_local_file, a, b) for a, b in plan.move_local),
+    )
+
+    if any(entry["etag"] is None for entry in state.files.values()):
+        remote = await scan_remote(backend, prefix)
+        for relative, entry in state.files.items():
+            if entry["etag"] is None and relative in remote:
+                entry["etag"] = remote[relative]["etag"]
+    await asyncio.to_thread(state.save)
+    return report
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
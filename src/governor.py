@@ -0,0 +1,227 @@
+# Module for pacing storage requests: adaptive concurrency, rate limits and retries
+import asyncio
+import random
+import time
+from collections import deque
+
+from . import config
+from .metrics import REGISTRY
+
+# Statuses that mean "slow down": the request was rejected or the server is overloaded
+THROTTLE_STATUSES = (429, 503)
+# Statuses worth retrying; only 429 is safe for calls that are not idempotent
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# Calls that can be repeated without changing the outcome
+IDEMPOTENT_OPERATIONS = ("list", "download", "download_to", "update", "remove", "sign")
+
+
+class _Ticket:
+    __slots__ = ("epoch", "started")
+
+    def __init__(self, epoch, started):
+        self.epoch = epoch
+        self.started = started
+
+
+class RequestGovernor:
+    """Shared limit on in-flight storage requests, adjusted AIMD-style.
+
+    The limit grows by one after a limit's worth of healthy responses (about
+    once per round trip) and is cut multiplicatively when a response is
+    throttled (429/503), fails, or takes much longer than the fastest recent
+    one for that operation. Only requests started after the previous cut can
+    cut it again, so one burst of failures counts once. A Retry-After holds
+    back every new request until it has passed.
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None, backoff=None,
+                 latency_tolerance=None, clock=time.monotonic):
+        self.minimum = minimum or config.GOVERNOR_MIN_LIMIT
+        self.maximum = maximum or config.GOVERNOR_MAX_LIMIT
+        self.limit = float(min(self.maximum, max(self.minimum, initial or config.GOVERNOR_INITIAL_LIMIT)))
+        self.backoff = backoff or config.GOVERNOR_BACKOFF
+        self.latency_tolerance = latency_tolerance or config.GOVERNOR_LATENCY_TOLERANCE
+        self.clock = clock
+        self.in_flight = 0
+        self.epoch = 0
+        self.throttled = 0
+        self.retries = 0
+        self._resume_at = 0.0
+        # operation -> recent normalised latencies; the minimum is the baseline
+        self._latencies = {}
+        self._condition = None
+        self._loop = None
+
+    def _cond(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def snapshot(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "paused_s": max(0.0, self._resume_at - self.clock()),
+        }
+
+    async def acquire(self):
+        """Wait for a request slot (and for any Retry-After pause); returns a ticket for release()."""
+        condition = self._cond()
+        while True:
+            async with condition:
+                pause = self._resume_at - self.clock()
+                if pause <= 0:
+                    if self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        return _Ticket(self.epoch, self.clock())
+                    await condition.wait()
+                    continue
+            await asyncio.sleep(pause)
+
+    async def release(self, ticket, operation, nbytes=0, throttled=False, failed=False, retry_after=None,
+                      cancelled=False):
+        """Give the slot back and adapt the limit to how the request went (not at all if `cancelled`)."""
+        elapsed = self.clock() - ticket.started
+        if retry_after:
+            self._resume_at = max(self._resume_at, self.clock() + retry_after)
+        if throttled:
+            self.throttled += 1
+        if not cancelled:
+            if throttled or failed or self._slow(operation, elapsed, nbytes):
+                self._decrease(ticket)
+            elif self.in_flight >= int(self.limit) - 1:
+                # Only grow while the limit is actually being used
+                self.limit = min(self.maximum, self.limit + 1.0 / int(self.limit))
+        condition = self._cond()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def _slow(self, operation, elapsed, nbytes):
+        # Transfers are compared per 64 KiB so large files do not look like congestion
+        cost = elapsed / (1 + nbytes / 65536)
+        recent = self._latencies.setdefault(operation, deque(maxlen=config.GOVERNOR_LATENCY_WINDOW))
+        baseline = min(recent) if len(recent) >= 5 else None
+        recent.append(cost)
+        return baseline is not None and cost > max(baseline * self.latency_tolerance, config.GOVERNOR_LATENCY_FLOOR)
+
+    def _decrease(self, ticket):
+        if ticket.epoch != self.epoch:
+            return
+        self.epoch += 1
+        self.limit = max(float(self.minimum), int(self.limit) * self.backoff)
+
+    def retry_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based): Retry-After, else full jitter."""
+        if retry_after is not None:
+            return retry_after
+        ceiling = min(config.STORAGE_RETRY_MAX_DELAY, config.STORAGE_RETRY_BASE_DELAY * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+
+class GovernedBackend:
+    """StorageBackend wrapper sending every call through a RequestGovernor.
+
+    A 429 is retried whatever the operation, since the server did not act on
+    the request. A 503 (which also cuts the limit) and other transient failures
+    are retried only for idempotent operations, as the server may have acted on
+    them. Retries wait for Retry-After or a jittered exponential delay. Any
+    other exception counts as a failure for the limit and is raised as it is.
+    """
+
+    def __init__(self, backend, governor=None, retries=None, metrics=None):
+        self.backend = backend
+        self.governor = governor or RequestGovernor()
+        self.retries = config.STORAGE_CALL_RETRIES if retries is None else retries
+        self.metrics = metrics or REGISTRY
+
+    @property
+    def label(self):
+        return self.backend.label
+
+    def __getattr__(self, name):
+        # Backend-specific extras pass straight through, ungoverned
+        return getattr(self.backend, name)
+
+    async def _call(self, operation, call, nbytes=0, before_retry=None):
+        from .storage_backend import StorageError
+        attempt = 0
+        while True:
+            waited = self.governor.clock()
+            ticket = await self.governor.acquire()
+            queued = ticket.started - waited
+            try:
+                result = await call()
+            except StorageError as e:
+                throttled = e.status in THROTTLE_STATUSES
+                transient = e.network or e.status in RETRY_STATUSES
+                await self.governor.release(ticket, operation, throttled=throttled,
+                                            failed=transient, retry_after=e.retry_after)
+                retryable = e.status == 429 or (transient and operation in IDEMPOTENT_OPERATIONS)
+                if not retryable or attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.governor.retries += 1
+                if self.metrics.enabled:
+                    self.metrics.record(f"storage.retry.{operation}", 0.0)
+                await asyncio.sleep(self.governor.retry_delay(attempt, e.retry_after))
+                if before_retry is not None:
+                    before_retry()
+                continue
+            except Exception:
+                await self.governor.release(ticket, operation, failed=True)
+                raise
+            except BaseException:
+                # Cancelled by the caller: says nothing about the server
+                await self.governor.release(ticket, operation, cancelled=True)
+                raise
+            await self.governor.release(ticket, operation, nbytes(result) if callable(nbytes) else nbytes)
+            if self.metrics.enabled:
+                self.metrics.record("storage.queue", queued)
+            return result
+
+    async def list(self, *args, **kwargs):
+        return await self._call("list", lambda: self.backend.list(*args, **kwargs))
+
+    async def download(self, path):
+        return await self._call("download", lambda: self.backend.download(path), len)
+
+    async def download_to(self, path, dest):
+        start = dest.tell() if dest.seekable() else None
+
+        def rewind():
+            # Drop the partial copy of the failed attempt
+            dest.seek(start)
+            dest.truncate()
+
+        if start is None:
+            return await self.backend.download_to(path, dest)
+        return await self._call("download_to", lambda: self.backend.download_to(path, dest), int, rewind)
+
+    async def upload(self, path, data, *args, **kwargs):
+        return await self._call("upload", lambda: self.backend.upload(path, data, *args, **kwargs), len(data))
+
+    async def update(self, path, data, *args, **kwargs):
+        return await self._call("update", lambda: self.backend.update(path, data, *args, **kwargs), len(data))
+
+    async def remove(self, paths):
+        paths = list(paths)
+        return await self._call("remove", lambda: self.backend.remove(paths))
+
+    async def move(self, from_path, to_path):
+        return await self._call("move", lambda: self.backend.move(from_path, to_path))
+
+    async def copy(self, from_path, to_path):
+        return await self._call("copy", lambda: self.backend.copy(from_path, to_path))
+
+    async def public_url(self, path):
+        return await self.backend.public_url(path)
+
+    async def signed_urls(self, paths, expires_in):
+        paths = list(paths)
+        return await self._call("sign", lambda: self.backend.signed_urls(paths, expires_in))
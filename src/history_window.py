@@ -0,0 +1,124 @@
+# Module for the revision history window of one file
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, scrolledtext
+
+from .diagnostics import format_bytes
+
+COLUMNS = (
+    ("time", "Recorded", 150),
+    ("source", "Source", 80),
+    ("size", "Size", 80),
+    ("md5", "MD5", 90),
+)
+
+
+def diff_view(parent, height=20):
+    """Read-only text box for unified diffs, with added and removed lines colored."""
+    text = scrolledtext.ScrolledText(parent, height=height, wrap="none", font=("Courier", 10))
+    text.tag_configure("added", foreground="#1a7f37")
+    text.tag_configure("removed", foreground="#cf222e")
+    text.tag_configure("hunk", foreground="#6f42c1")
+    return text
+
+
+def show_diff(widget, text):
+    """Replace the contents of a diff_view with `text`."""
+    widget.config(state="normal")
+    widget.delete(1.0, tk.END)
+    for line in (text or "No differences.").splitlines(keepends=True):
+        tag = ()
+        if line.startswith("@@"):
+            tag = ("hunk",)
+        elif line.startswith("+") and not line.startswith("+++"):
+            tag = ("added",)
+        elif line.startswith("-") and not line.startswith("---"):
+            tag = ("removed",)
+        widget.insert(tk.END, line, tag)
+    widget.config(state="disabled")
+
+
+class HistoryWindow:
+    """Toplevel listing a file's recorded revisions, with diffs and restore.
+
+    Diffs and restores are handed to `on_diff(old_id, new_id)` (a `new_id`
+    of None means the editor's content) and `on_restore(revision_id)`; the
+    caller shows the result with show_diff.
+    """
+
+    def __init__(self, root, path, revisions, on_diff, on_restore):
+        self.on_diff = on_diff
+        self.on_restore = on_restore
+        self.window = tk.Toplevel(root)
+        self.window.title(f"History - {path}")
+        self.window.geometry("760x560")
+
+        self.tree = ttk.Treeview(self.window, columns=[c[0] for c in COLUMNS], show="tree headings", height=8)
+        self.tree.heading("#0", text="Revision")
+        self.tree.column("#0", width=70)
+        for key, title, width in COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width)
+        # Newest first; item ids are revision ids
+        for revision in reversed(revisions):
+            self.tree.insert("", "end", iid=str(revision["id"]), text=f"#{revision['id']}", values=(
+                datetime.fromtimestamp(revision["time"]).strftime("%Y-%m-%d %H:%M:%S"),
+                revision["source"],
+                format_bytes(revision["size"]),
+                revision["md5"][:8],
+            ))
+
+        buttons = ttk.Frame(self.window, padding=5)
+        ttk.Button(buttons, text="Diff with Editor", command=self.diff_with_editor).grid(row=0, column=0, padx=(0, 5))
+        ttk.Button(buttons, text="Diff with Previous", command=self.diff_with_previous).grid(row=0, column=1, padx=(0, 5))
+        ttk.Button(buttons, text="Diff Selected Two", command=self.diff_selected).grid(row=0, column=2, padx=(0, 20))
+        ttk.Button(buttons, text="Restore", command=self.restore).grid(row=0, column=3)
+
+        self.diff_text = diff_view(self.window)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        buttons.grid(row=1, column=0, sticky="ew")
+        self.diff_text.grid(row=2, column=0, sticky="nsew")
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(2, weight=1)
+
+        children = self.tree.get_children()
+        if children:
+            self.tree.selection_set(children[0])
+
+    def selected_ids(self):
+        """Selected revision ids, oldest first."""
+        return sorted(int(iid) for iid in self.tree.selection())
+
+    def diff_with_editor(self):
+        selected = self.selected_ids()
+        if selected:
+            self.on_diff(selected[0], None)
+
+    def diff_with_previous(self):
+        selected = self.selected_ids()
+        if not selected:
+            return
+        ids = [int(iid) for iid in reversed(self.tree.get_children())]
+        position = ids.index(selected[-1])
+        if position == 0:
+            self.show_diff("This is the oldest recorded revision.")
+            return
+        self.on_diff(ids[position - 1], selected[-1])
+
+    def diff_selected(self):
+        selected = self.selected_ids()
+        if len(selected) != 2:
+            self.show_diff("Select two revisions to compare.")
+            return
+        self.on_diff(selected[0], selected[1])
+
+    def restore(self):
+        selected = self.selected_ids()
+        if len(selected) == 1:
+            self.on_restore(selected[0])
+
+    def show_diff(self, text):
+        if not self.window.winfo_exists():
+            return
+        show_diff(self.diff_text, text)
@@ -0,0 +1,200 @@
+# Module for detecting uploaded images and publishing resized WebP variants
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+
+from . import config
+from .compression import DiskBudget
+from .content_hash import hash_bytes
+from .metrics import REGISTRY
+from .storage_backend import StorageError, guess_content_type
+
+# Leading bytes of the image formats we recognise, with their content types
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# Formats variants are made from; GIFs may be animated and WebP originals are already small
+VARIANT_SOURCE_TYPES = ("image/png", "image/jpeg")
+
+# Object names of generated variants: <name>.w<width>.webp
+VARIANT_NAME = re.compile(r"\.w\d+\.webp$")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def detect_content_type(data, path):
+    """Content type of an upload: sniffed for images, otherwise from the file extension."""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return guess_content_type(path)
+
+
+def pillow_available():
+    return find_spec("PIL") is not None
+
+
+def is_variant(path):
+    return VARIANT_NAME.search(path) is not None
+
+
+def variant_path(path, width):
+    """Object name of the `width` pixel WebP variant of `path`."""
+    stem = path.rsplit(".", 1)[0] if "." in path.rpartition("/")[2] else path
+    return f"{stem}.w{width}.webp"
+
+
+def variants_of(path, candidates):
+    """Paths among `candidates` that are WebP variants of image `path`."""
+    if guess_content_type(path) not in VARIANT_SOURCE_TYPES:
+        return []
+    stem = variant_path(path, 0)[:-len(".w0.webp")]
+    pattern = re.compile(re.escape(stem) + r"\.w\d+\.webp")
+    return [candidate for candidate in candidates if candidate != path and pattern.fullmatch(candidate)]
+
+
+def render_variants(data, widths, quality):
+    """[(width, WebP bytes)] for each width below the image's own plus the full width.
+
+    Runs in a worker process; Pillow is imported there.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        full_width, full_height = image.size
+        variants = []
+        for width in sorted({w for w in widths if w < full_width} | {full_width}):
+            if width == full_width:
+                resized = image
+            else:
+                resized = image.resize((width, max(1, round(full_height * width / full_width))), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "WEBP", quality=quality, method=4)
+            variants.append((width, buffer.getvalue()))
+    return variants
+
+
+def worker_pool():
+    """Process pool for encoding; spawned so it never forks the Tk and I/O threads."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(config.IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+class VariantCache:
+    """Encoded variants on disk, keyed by the original's content and the encoding settings.
+
+    Re-uploading an unchanged image (under any name) reuses them instead of
+    decoding and re-encoding it.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.path.join(config.CACHE_DIR, "images")
+        self.max_bytes = config.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.budget = DiskBudget(self.directory, self.max_bytes)
+
+    def key(self, data, widths, quality):
+        settings = ",".join(str(w) for w in sorted(widths))
+        return hashlib.sha1(f"{hash_bytes(data)}|{settings}|q{quality}".encode("ascii")).hexdigest()
+
+    def get(self, key):
+        path = os.path.join(self.directory, key[:2], key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        # One file per image: (width, length) headers, each followed by the WebP bytes
+        variants, offset = [], 0
+        while offset < len(blob):
+            width, length = struct.unpack_from(">II", blob, offset)
+            offset += 8
+            variants.append((width, blob[offset:offset + length]))
+            offset += length
+        return variants
+
+    def put(self, key, variants):
+        path = os.path.join(self.directory, key[:2], key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for width, data in variants:
+                f.write(struct.pack(">II", width, len(data)))
+                f.write(data)
+                size += 8 + len(data)
+        self.budget.replace(tmp_path, path, size)
+
+
+async def make_variants(data, content_type, cache=None):
+    """[(width, WebP bytes)] for an uploaded image, or [] when none are made.
+
+    Encoding runs in the process pool unless `cache` already holds the result.
+    An image that cannot be encoded only loses its variants; the failure is
+    counted under the "image.variants" span.
+    """
+    if (not config.IMAGE_VARIANTS_ENABLED or content_type not in VARIANT_SOURCE_TYPES
+            or not pillow_available()):
+        return []
+    widths, quality = config.IMAGE_VARIANT_WIDTHS, config.IMAGE_WEBP_QUALITY
+    key = None
+    if cache is not None:
+        key = cache.key(data, widths, quality)
+        variants = await asyncio.to_thread(cache.get, key)
+        if variants is not None:
+            return variants
+    global _pool
+    loop = asyncio.get_running_loop()
+    try:
+        with REGISTRY.span("image.variants") as span:
+            variants = await loop.run_in_executor(worker_pool(), render_variants, data, widths, quality)
+            span.bytes = sum(len(variant) for _, variant in variants)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next image
+        with _pool_lock:
+            _pool = None
+        return []
+    except Exception:
+        return []
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, variants)
+    return variants
+
+
+async def publish_variants(backend, path, data, content_type, cache=None):
+    """Upload the WebP variants of image `path` next to it, replacing older ones.
+
+    Returns [(variant path, WebP bytes, md5)] for the variants written.
+    """
+    written = []
+    for width, variant in await make_variants(data, content_type, cache):
+        target = variant_path(path, width)
+        try:
+            await backend.upload(target, variant, "image/webp")
+        except StorageError as e:
+            if not e.already_exists:
+                raise
+            await backend.update(target, variant, "image/webp")
+        written.append((target, variant, hash_bytes(variant)))
+    return written
@@ -0,0 +1,80 @@
+# Module for the window listing broken links and unreferenced assets
+import tkinter as tk
+from tkinter import ttk
+
+from .diagnostics import format_bytes
+
+BROKEN = "broken"
+ORPHANS = "orphans"
+
+
+class LinkCheckWindow:
+    """Toplevel with the results of a reference scan.
+
+    Broken links are grouped by article; `on_open(path)` shows the article.
+    Unreferenced assets can be selected and passed to `on_delete(paths)`,
+    which calls remove_paths once they are gone.
+    """
+
+    def __init__(self, root, broken, orphans, on_open, on_delete):
+        self.on_open = on_open
+        self.on_delete = on_delete
+        self.window = tk.Toplevel(root)
+        self.window.title("Check Links")
+        self.window.geometry("760x520")
+
+        self.tree = ttk.Treeview(self.window, columns=("detail",), show="tree headings")
+        self.tree.heading("#0", text="Path")
+        self.tree.heading("detail", text="Detail")
+        self.tree.column("#0", width=520)
+        self.tree.column("detail", width=200)
+        self.tree.insert("", "end", iid=BROKEN, text=f"Broken links ({len(broken)})", open=True)
+        articles = {}
+        for source, target in broken:
+            if source not in articles:
+                articles[source] = self.tree.insert(BROKEN, "end", text=source, values=("",), open=True,
+                                                    tags=("article",))
+            self.tree.insert(articles[source], "end", text=target, values=("missing",))
+        self.orphans = {}
+        self.tree.insert("", "end", iid=ORPHANS, text="", open=True)
+        for entry in orphans:
+            self.orphans[entry.path] = self.tree.insert(ORPHANS, "end", text=entry.path,
+                                                        values=(format_bytes(entry.size),))
+        self.update_orphans_heading()
+
+        buttons = ttk.Frame(self.window, padding=5)
+        ttk.Button(buttons, text="Open Article", command=self.open_article).grid(row=0, column=0, padx=(0, 20))
+        ttk.Button(buttons, text="Delete Selected Assets", command=self.delete_selected).grid(row=0, column=1)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        buttons.grid(row=1, column=0, sticky="ew")
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(0, weight=1)
+
+    def update_orphans_heading(self):
+        self.tree.item(ORPHANS, text=f"Unreferenced assets ({len(self.orphans)})")
+
+    def open_article(self):
+        for item_id in self.tree.selection():
+            # A missing target row opens the article it is listed under
+            if self.tree.parent(item_id) not in ("", BROKEN, ORPHANS):
+                item_id = self.tree.parent(item_id)
+            if self.tree.parent(item_id) == BROKEN:
+                self.on_open(self.tree.item(item_id, "text"))
+                return
+
+    def delete_selected(self):
+        selected = set(self.tree.selection())
+        paths = [path for path, item_id in self.orphans.items() if item_id in selected or ORPHANS in selected]
+        if paths:
+            self.on_delete(paths)
+
+    def remove_paths(self, paths):
+        """Drop deleted assets from the list."""
+        if not self.window.winfo_exists():
+            return
+        for path in paths:
+            item_id = self.orphans.pop(path, None)
+            if item_id is not None:
+                self.tree.delete(item_id)
+        self.update_orphans_heading()
@@ -1,11 +1,173 @@
-from firestore_module import SupabaseMDXManager
-import tkinter as tk
+import time
+
+# Taken before anything else is imported, for startup metrics
+STARTED = time.perf_counter()
+
+import argparse
+import os
+import sys
+
+if __package__ in (None, ""):
+    # Running as `python src/main.py`: make the `src` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config
 
 # Entry point for BlogDesktopApp
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Supabase MDX file manager")
+    parser.add_argument(
+        "--backend",
+        choices=["supabase", "local", "memory"],
+        help="storage backend to use (default: STORAGE_BACKEND in config/settings.py)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=config.PROFILE_DIR,
+        metavar="DIR",
+        help="profile every refresh, search and upload, writing reports to DIR (default: PROFILE_DIR)",
+    )
+    parser.add_argument(
+        "--startup-metrics",
+        action="store_true",
+        help="print startup phase timings and the slowest imports once the first listing is shown",
+    )
+    sync = parser.add_argument_group("folder sync, export and cache policy (run without the window)")
+    sync.add_argument("--sync", metavar="DIR", help="two-way sync DIR with the bucket folder given by --prefix")
+    sync.add_argument(
+        "--prefix",
+        help="bucket folder to sync with (default: posts), or to export or apply the cache policy to "
+             "(default: the whole bucket)",
+    )
+    sync.add_argument("--dry-run", action="store_true",
+                      help="only print what --sync or --apply-cache-policy would change")
+    sync.add_argument(
+        "--conflicts",
+        choices=["skip", "local", "remote"],
+        default="skip",
+        help="files changed on both sides: leave them (default) or let one side win",
+    )
+    sync.add_argument(
+        "--export",
+        metavar="FILE",
+        help="write a manifest of every object under --prefix to FILE (.csv, otherwise JSON Lines)",
+    )
+    sync.add_argument("--resume", action="store_true", help="continue an interrupted --export to the same FILE")
+    sync.add_argument(
+        "--apply-cache-policy",
+        action="store_true",
+        help="set the Cache-Control of every object under --prefix to CACHE_CONTROL_POLICIES "
+             "(with --dry-run, only list the objects that differ)",
+    )
+    return parser.parse_args(argv)
+
+def run_sync(args):
+    """Headless folder sync; returns the process exit status."""
+    import asyncio
+    from src.cache_policy import CachePolicyBackend
+    from src.folder_sync import SyncState, apply_plan, build_plan
+    from src.governor import GovernedBackend
+    from src.image_pipeline import VariantCache
+    from src.storage_backend import open_backend
+    
+    async def sync():
+        backend = GovernedBackend(CachePolicyBackend(await open_backend()))
+        prefix = (args.prefix or "posts").strip("/")
+        state = SyncState(args.sync, backend.label, prefix)
+        plan = await build_plan(backend, args.sync, prefix, state, args.conflicts, config.BULK_UPLOAD_CONCURRENCY)
+        for line in plan.describe():
+            print(line)
+        print(plan.summary())
+        if args.dry_run:
+            return 0
+        report = await apply_plan(backend, plan, args.sync, prefix, state, config.BULK_UPLOAD_CONCURRENCY,
+                                  variant_cache=VariantCache())
+        for path, error in report.failed:
+            print(f"failed   {path}: {error}", file=sys.stderr)
+        print(f"{report.applied} applied, {len(report.failed)} failed, "
+              f"{report.bytes_sent} bytes sent, {report.bytes_received} bytes received")
+        return 1 if report.failed or plan.conflicts else 0
+    
+    return asyncio.run(sync())
+
+def run_export(args):
+    """Headless manifest export; returns the process exit status."""
+    import asyncio
+    from src.governor import GovernedBackend
+    from src.manifest import export_manifest
+    from src.storage_backend import open_backend
+    
+    async def export():
+        backend = GovernedBackend(await open_backend())
+        report = await export_manifest(
+            backend, args.export, args.prefix or "", resume=args.resume, signed=config.SIGNED_URLS,
+            on_progress=lambda rows: print(f"{rows} object(s)", file=sys.stderr),
+        )
+        print(f"{report.rows} object(s), {report.bytes} bytes written to {args.export}")
+        return 0
+    
+    try:
+        return asyncio.run(export())
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+def run_cache_policy(args):
+    """Headless re-application of the Cache-Control policy; returns the process exit status."""
+    import asyncio
+    from src.cache_policy import CachePolicy, reapply
+    from src.governor import GovernedBackend
+    from src.storage_backend import open_backend
+    
+    async def apply_policy():
+        backend = GovernedBackend(await open_backend())
+        report = await reapply(
+            backend, CachePolicy(), args.prefix or "", dry_run=args.dry_run,
+            on_progress=lambda checked, changed: print(f"{checked} checked, {changed} changed", file=sys.stderr),
+        )
+        for path, old, new in report.changed:
+            print(f"{path}: {old} -> {new}")
+        for path, error in report.failed:
+            print(f"failed   {path}: {error}", file=sys.stderr)
+        print(report.summary(args.dry_run))
+        return 1 if report.failed else 0
+    
+    try:
+        return asyncio.run(apply_policy())
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend:
+        config.STORAGE_BACKEND = args.backend
+    if args.sync:
+        sys.exit(run_sync(args))
+    if args.export:
+        sys.exit(run_export(args))
+    if args.apply_cache_policy:
+        sys.exit(run_cache_policy(args))
+    
+    # GUI modules are imported after parsing so --startup-metrics can time them
+    from src.startup import ImportTimer, StartupMetrics
+    import_timer = ImportTimer().install() if args.startup_metrics else None
+    import tkinter as tk
+    from src.firestore_module import SupabaseMDXManager
+    from src.metrics import REGISTRY
+    
+    startup = StartupMetrics(
+        STARTED,
+        import_timer=import_timer,
+        metrics=REGISTRY,
+        stream=sys.stderr if args.startup_metrics else None,
+    )
+    startup.mark("imports")
     root = tk.Tk()
-    app = SupabaseMDXManager(root)
+    app = SupabaseMDXManager(root, profile_dir=args.profile, startup=startup)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+# Module for exporting a bucket inventory as JSON Lines or CSV, streamed from the listing
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+
+from . import config
+from .storage_backend import LIST_PAGE_SIZE
+
+MANIFEST_FIELDS = ("path", "size", "updated_at", "mimetype", "etag", "url")
+
+
+def encode_cursor(position):
+    """Opaque resume token for a position: [[offset, name], ...] from the prefix down."""
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise ValueError(f"Invalid export cursor: {cursor!r}") from None
+    return [(int(offset), str(name)) for offset, name in position]
+
+
+async def _locate(backend, prefix, offset, name, page_size):
+    """Index of `name` in the folder listing, looked for at `offset` first.
+
+    If objects were added or removed since the position was recorded the
+    folder is scanned for it; a name that is gone resumes at the first one
+    sorting after it.
+    """
+    page = await backend.list(prefix, limit=1, offset=offset)
+    if page and page[0]["name"] == name:
+        return offset, True
+    start = 0
+    while True:
+        page = await backend.list(prefix, limit=page_size, offset=start)
+        for index, entry in enumerate(page):
+            if entry["name"] == name:
+                return start + index, True
+        if len(page) < page_size:
+            break
+        start += page_size
+    start = 0
+    while True:
+        page = await backend.list(prefix, limit=page_size, offset=start)
+        for index, entry in enumerate(page):
+            if entry["name"] > name:
+                return start + index, False
+        if len(page) < page_size:
+            return start + len(page), False
+        start += page_size
+
+
+async def walk_positions(backend, prefix="", resume=None, page_size=LIST_PAGE_SIZE, _position=()):
+    """Yield (object, position) for every object under `prefix`, depth first in listing order.
+
+    `position` locates the object as [(offset, name), ...] per folder level,
+    so a walk can continue after it (`resume`) without listing the folders
+    already finished. Like storage_backend.walk, only one page is held at a time.
+    """
+    prefix = prefix.strip("/")
+    offset = 0
+    resume_name = resume_rest = None
+    if resume:
+        (recorded, resume_name), resume_rest = resume[0], resume[1:]
+        offset, found = await _locate(backend, prefix, recorded, resume_name, page_size)
+        if not found:
+            resume_name = None
+    while True:
+        page = await backend.list(prefix, limit=page_size, offset=offset)
+        for index, entry in enumerate(page):
+            full_path = f"{prefix}/{entry['name']}" if prefix else entry["name"]
+            position = (*_position, (offset + index, entry["name"]))
+            if resume_name is not None:
+                # The object the cursor points at: a folder is continued, a file was already written
+                resume_name = None
+                if entry.get("id") is None:
+                    async for item in walk_positions(backend, full_path, resume_rest, page_size, position):
+                        yield item
+                continue
+            if entry.get("id") is None:
+                async for item in walk_positions(backend, full_path, None, page_size, position):
+                    yield item
+            else:
+                yield dict(entry, name=full_path), list(position)
+        if len(page) < page_size:
+            return
+        offset += len(page)
+
+
+def manifest_row(entry, url):
+    metadata = entry.get("metadata") or {}
+    return {
+        "path": entry["name"],
+        "size": metadata.get("size", 0),
+        "updated_at": entry.get("updated_at"),
+        "mimetype": metadata.get("mimetype"),
+        "etag": (metadata.get("eTag") or "").strip('"') or None,
+        "url": url,
+    }
+
+
+def format_of(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def checkpoint_path(path):
+    return f"{path}.cursor"
+
+
+class ManifestReport:
+    __slots__ = ("rows", "bytes", "cursor", "resumed")
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.cursor = None
+        self.resumed = False
+
+
+async def export_manifest(backend, path, prefix="", resume=False, signed=False, on_progress=None,
+                          batch_size=None):
+    """Stream every object under `prefix` into `path` (.csv, else JSON Lines).
+
+    Rows are written a batch at a time; after each batch the cursor and the
+    file length are saved next to the output (`<path>.cursor`), so with
+    `resume=True` an interrupted export continues where it stopped. URLs are
+    public, or signed in one request per batch with `signed=True`. Memory use
+    depends on the batch size, not on the number of objects.
+    """
+    fmt = format_of(path)
+    prefix = prefix.strip("/")
+    batch_size = batch_size or config.MANIFEST_BATCH_SIZE
+    report = ManifestReport()
+    position = None
+    mode = "w"
+    if resume:
+        state = await asyncio.to_thread(_read_checkpoint, path)
+        if state["format"] != fmt or state["prefix"] != prefix:
+            raise ValueError(f"{path} was exported as {state['format']} of '{state['prefix']}', not {fmt} of '{prefix}'")
+        position = decode_cursor(state["cursor"])
+        report.rows, report.cursor, report.resumed = state["rows"], state["cursor"], True
+        # Rows written after the last checkpoint are written again
+        await asyncio.to_thread(os.truncate, path, state["bytes"])
+        mode = "a"
+    out = await asyncio.to_thread(open, path, mode, encoding="utf-8", newline="")
+    try:
+        if fmt == "csv" and mode == "w":
+            out.write(",".join(MANIFEST_FIELDS) + "\r\n")
+        batch = []
+        async for entry, entry_position in walk_positions(backend, prefix, position):
+            batch.append((entry, entry_position))
+            if len(batch) >= batch_size:
+                await _write_batch(backend, out, fmt, prefix, batch, signed, report)
+                batch = []
+                if on_progress is not None:
+                    on_progress(report.rows)
+        if batch:
+            await _write_batch(backend, out, fmt, prefix, batch, signed, report)
+            if on_progress is not None:
+                on_progress(report.rows)
+        report.bytes = out.tell()
+    finally:
+        out.close()
+    # Finished: nothing left to resume
+    try:
+        os.remove(checkpoint_path(path))
+    except OSError:
+        pass
+    return report
+
+
+async def _write_batch(backend, out, fmt, prefix, batch, signed, report):
+    paths = [entry["name"] for entry, _ in batch]
+    if signed:
+        urls = await backend.signed_urls(paths, config.SIGNED_URL_EXPIRES)
+    else:
+        urls = {path: await backend.public_url(path) for path in paths}
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, MANIFEST_FIELDS) if fmt == "csv" else None
+    for entry, _ in batch:
+        row = manifest_row(entry, urls.get(entry["name"]))
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+    report.rows += len(batch)
+    report.cursor = encode_cursor(batch[-1][1])
+    state = {"format": fmt, "prefix": prefix, "rows": report.rows, "cursor": report.cursor}
+    await asyncio.to_thread(_write_and_checkpoint, out, buffer.getvalue(), state)
+
+
+def _write_and_checkpoint(out, text, state):
+    out.write(text)
+    out.flush()
+    state["bytes"] = out.tell()
+    tmp_path = checkpoint_path(out.name) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, checkpoint_path(out.name))
+
+
+def _read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"No interrupted export of {path} to resume") from None
+
+
+def has_checkpoint(path):
+    return os.path.exists(checkpoint_path(path))
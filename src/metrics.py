@@ -0,0 +1,236 @@
+# Module for lightweight timing spans, histograms and their export
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from . import config
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKET_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Durations, bytes and errors recorded for one span name.
+
+    Percentiles come from a window of recent samples; the bucket counts cover
+    every sample ever recorded and are what the Prometheus export uses.
+    """
+
+    __slots__ = ("count", "errors", "total", "bytes", "samples", "buckets")
+
+    def __init__(self, window):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.bytes = 0
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds, nbytes=0, error=False):
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+        if error:
+            self.errors += 1
+        self.samples.append(seconds)
+        for i, bound in enumerate(BUCKET_BOUNDS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q):
+        """Nearest-rank percentile of the recent samples, or None when empty."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1
+        return ordered[rank]
+
+    def summary(self):
+        result = {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_s": round(self.total, 6),
+            "bytes": self.bytes,
+        }
+        for q in PERCENTILES:
+            value = self.percentile(q)
+            result[f"p{q}_s"] = None if value is None else round(value, 6)
+        return result
+
+
+class Span:
+    """Times one operation; use as a context manager. Exceptions count as errors."""
+
+    __slots__ = ("metrics", "name", "bytes", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.bytes = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.start, self.bytes, exc_type is not None)
+        return False
+
+
+class _NullSpan:
+    """Span used while metrics are off: no clock reads, no locking."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Thread-safe registry of span histograms."""
+
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Context manager timing the enclosed block under `name`; set `.bytes` to count transfer size."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name, seconds, nbytes=0, error=False):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.window)
+            histogram.add(seconds, nbytes, error)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def snapshot(self):
+        """{span name: summary dict}, sorted by name."""
+        with self._lock:
+            return {name: self._histograms[name].summary() for name in sorted(self._histograms)}
+
+    def to_json(self):
+        return json.dumps({"enabled": self.enabled, "spans": self.snapshot()}, indent=2)
+
+    def to_prometheus(self, prefix="mdx_manager"):
+        """Prometheus text exposition of every span."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines = [
+            f"# HELP {prefix}_span_seconds Duration of instrumented operations.",
+            f"# TYPE {prefix}_span_seconds histogram",
+        ]
+        for name, histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS + ("+Inf",), histogram.buckets):
+                cumulative += count
+                lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {histogram.total}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {histogram.count}')
+        for metric, attribute, help_text in (
+            ("span_errors_total", "errors", "Instrumented operations that raised."),
+            ("span_bytes_total", "bytes", "Bytes transferred by instrumented operations."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, histogram in histograms:
+                lines.append(f'{prefix}_{metric}{{span="{name}"}} {getattr(histogram, attribute)}')
+        return "\n".join(lines) + "\n"
+
+
+# Registry shared by the whole application
+REGISTRY = Metrics(config.METRICS_ENABLED, config.METRICS_SAMPLE_WINDOW)
+
+
+def timed(name, registry=None):
+    """Decorator recording every call of the wrapped function as span `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = registry or REGISTRY
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with Span(metrics, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class InstrumentedBackend:
+    """StorageBackend wrapper recording a `storage.<operation>` span per call."""
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics or REGISTRY
+
+    @property
+    def label(self):
+        return self.backend.label
+
+    def __getattr__(self, name):
+        # Backend-specific extras pass straight through, untimed
+        return getattr(self.backend, name)
+
+    async def _timed(self, operation, coro, size=None):
+        """Await `coro`; `size(result)` gives the bytes moved when not known up front."""
+        if not self.metrics.enabled:
+            return await coro
+        with Span(self.metrics, f"storage.{operation}") as span:
+            result = await coro
+            if size is not None:
+                span.bytes = size(result)
+        return result
+
+    async def list(self, *args, **kwargs):
+        return await self._timed("list", self.backend.list(*args, **kwargs))
+
+    async def download(self, path):
+        return await self._timed("download", self.backend.download(path), len)
+
+    async def download_to(self, path, dest):
+        return await self._timed("download", self.backend.download_to(path, dest), int)
+
+    async def upload(self, path, data, *args, **kwargs):
+        return await self._timed("upload", self.backend.upload(path, data, *args, **kwargs), lambda _: len(data))
+
+    async def update(self, path, data, *args, **kwargs):
+        return await self._timed("update", self.backend.update(path, data, *args, **kwargs), lambda _: len(data))
+
+    async def remove(self, paths):
+        return await self._timed("remove", self.backend.remove(paths))
+
+    async def move(self, from_path, to_path):
+        return await self._timed("move", self.backend.move(from_path, to_path))
+
+    async def copy(self, from_path, to_path):
+        return await self._timed("copy", self.backend.copy(from_path, to_path))
+
+    async def public_url(self, path):
+        return await self._timed("public_url", self.backend.public_url(path))
+
+    async def signed_urls(self, paths, expires_in):
+        return await self._timed("sign", self.backend.signed_urls(paths, expires_in))
@@ -0,0 +1,172 @@
+# Module for viewing very large bucket objects without loading them into memory
+import mmap
+import os
+from array import array
+
+# Objects at or above this size are streamed to disk and shown read-only in pages
+LARGE_FILE_THRESHOLD = 1024 * 1024
+# Number of lines kept in the Text widget at any one time
+WINDOW_LINES = 2000
+# Fraction of the scroll range that triggers loading the next/previous page
+EDGE_FRACTION = 0.1
+
+
+def is_large_file(size_bytes):
+    """Return True if an object of this size should use the paged viewer."""
+    return bool(size_bytes) and size_bytes >= LARGE_FILE_THRESHOLD
+
+
+class PagedDocument:
+    """Memory-mapped text file that hands out decoded windows of lines."""
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Byte offset of the start of every line indexed so far
+        self._offsets = array("q", [0])
+        self._complete = self.size == 0
+
+    def _index_until(self, line):
+        """Extend the line index until `line` is known or the end of file is reached."""
+        while not self._complete and len(self._offsets) <= line:
+            pos = self._map.find(b"\n", self._offsets[-1])
+            if pos == -1 or pos + 1 == self.size:
+                self._complete = True
+            if pos != -1:
+                self._offsets.append(pos + 1)
+
+    def _indexed_lines(self):
+        """Number of complete lines currently known to the index."""
+        count = len(self._offsets)
+        if self._offsets[-1] == self.size:
+            count -= 1
+        return count
+
+    def has_line(self, line):
+        """Return True if the document contains the zero-based `line`."""
+        self._index_until(line + 1)
+        return line < self._indexed_lines()
+
+    @property
+    def line_count(self):
+        """Total number of lines (indexes the whole file on first use)."""
+        while not self._complete:
+            self._index_until(len(self._offsets))
+        return self._indexed_lines()
+
+    def read_lines(self, start, count):
+        """Return (text, lines_read) for up to `count` lines starting at `start`."""
+        self._index_until(start + count)
+        available = self._indexed_lines()
+        if start >= available:
+            return "", 0
+        end_line = min(start + count, available)
+        begin = self._offsets[start]
+        end = self._offsets[end_line] if end_line < len(self._offsets) else self.size
+        text = self._map[begin:end].decode(self.encoding, errors="replace")
+        return text, end_line - start
+
+    def close(self):
+        """Release the memory map and the underlying file handle."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class PagedTextView:
+    """Keeps a sliding window of a PagedDocument inside a Tk Text widget."""
+
+    def __init__(self, text, scrollbar, window_lines=WINDOW_LINES):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.window_lines = window_lines
+        self.document = None
+        self.first_line = 0
+        self.last_line = 0
+        self._pending = None
+
+    @property
+    def active(self):
+        return self.document is not None
+
+    def attach(self, document):
+        """Show the first window of `document` in the Text widget (read-only)."""
+        self.document = document
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        content, read = document.read_lines(0, self.window_lines)
+        self.text.insert("1.0", content)
+        self.first_line = 0
+        self.last_line = read
+        self.text.config(state="disabled", yscrollcommand=self._on_yscroll)
+        self.text.yview_moveto(0)
+
+    def detach(self):
+        """Stop paging and hand the widget back for normal editing."""
+        if self._pending is not None:
+            self.text.after_cancel(self._pending)
+            self._pending = None
+        document, self.document = self.document, None
+        self.text.config(state="normal", yscrollcommand=self.scrollbar.set)
+        return document
+
+    def describe(self):
+        """Human readable description of the visible window."""
+        return f"lines {self.first_line + 1}-{self.last_line}"
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.document is None or self._pending is not None:
+            return
+        if float(last) > 1 - EDGE_FRACTION and self.document.has_line(self.last_line):
+            self._pending = self.text.after_idle(self.page_forward)
+        elif float(first) < EDGE_FRACTION and self.first_line > 0:
+            self._pending = self.text.after_idle(self.page_backward)
+
+    def _top_line(self):
+        return int(self.text.index("@0,0").split(".")[0])
+
+    def page_forward(self):
+        """Append the next half window and drop the same amount from the top."""
+        self._pending = None
+        if self.document is None:
+            return
+        content, read = self.document.read_lines(self.last_line, self.window_lines // 2)
+        if not read:
+            return
+        top = self._top_line()
+        self.text.config(state="normal")
+        self.text.insert("end-1c", content)
+        self.last_line += read
+        excess = (self.last_line - self.first_line) - self.window_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.first_line += excess
+            top = max(1, top - excess)
+        self.text.config(state="disabled")
+        self.text.yview(f"{top}.0")
+
+    def page_backward(self):
+        """Prepend the previous half window and drop the same amount from the bottom."""
+        self._pending = None
+        if self.document is None or self.first_line == 0:
+            return
+        start = max(0, self.first_line - self.window_lines // 2)
+        content, read = self.document.read_lines(start, self.first_line - start)
+        top = self._top_line()
+        self.text.config(state="normal")
+        self.text.insert("1.0", content)
+        self.first_line = start
+        excess = (self.last_line - self.first_line) - self.window_lines
+        if excess > 0:
+            keep = self.last_line - self.first_line - excess
+            self.text.delete(f"{keep + 1}.0", "end-1c")
+            self.last_line -= excess
+        self.text.config(state="disabled")
+        self.text.yview(f"{top + read}.0")
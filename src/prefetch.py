@@ -0,0 +1,137 @@
+# Module for downloading the files a user is likely to open next into the content cache
+import asyncio
+import time
+
+from . import config
+from .metrics import REGISTRY
+from .paged_viewer import is_large_file
+from .storage_backend import StorageError
+
+
+def siblings(store, path, limit):
+    """Files next to `path` in its folder: the ones listed after it first, then those before."""
+    entry = store.get(path)
+    if entry is None:
+        return []
+    files = [child for child in map(store.get, store.children(entry.parent)) if not child.is_folder]
+    paths = [child.path for child in files]
+    position = paths.index(path) if path in paths else -1
+    after, before = files[position + 1:], files[:max(position, 0)]
+    return (after + before[::-1])[:limit]
+
+
+class Prefetcher:
+    """Pulls likely-next files into a ContentCache while the user reads the current one.
+
+    Each call to `run` is one round with its own byte budget; the caller
+    cancels a round once the user moves on, which drops the files it has not
+    started yet. Downloads only start while the request governor has slots to
+    spare, so opening a file is never queued behind a prefetch.
+    """
+
+    def __init__(self, content_cache, max_bytes=None, concurrency=None, reserved_slots=None, metrics=None):
+        self.content_cache = content_cache
+        self.max_bytes = config.PREFETCH_MAX_BYTES if max_bytes is None else max_bytes
+        self.concurrency = concurrency or config.PREFETCH_CONCURRENCY
+        self.reserved_slots = config.PREFETCH_RESERVED_SLOTS if reserved_slots is None else reserved_slots
+        self.metrics = metrics or REGISTRY
+        # (label, path) -> download task on the I/O loop, and prefetches under way
+        self._downloads = {}
+        self._active = 0
+
+    def plan(self, label, entries):
+        """The entries worth fetching, in order, within the byte budget (runs in a worker thread)."""
+        planned, budget, seen = [], self.max_bytes, set()
+        for entry in entries:
+            if entry is None or entry.is_folder or entry.path in seen or not entry.etag:
+                continue
+            seen.add(entry.path)
+            if is_large_file(entry.size) or entry.size > budget:
+                continue
+            if self.content_cache.has(label, entry.path, entry.etag):
+                continue
+            planned.append(entry)
+            budget -= entry.size
+        return planned
+
+    async def _idle(self, backend):
+        """Wait until the governor has more free slots than the ones kept for the user."""
+        governor = getattr(backend, "governor", None)
+        if governor is None:
+            return
+        while True:
+            # Prefetches that passed here but have no slot yet are not in_flight
+            busy = max(governor.in_flight, self._active)
+            if not busy or busy < governor.limit - self.reserved_slots:
+                return
+            await asyncio.sleep(config.PREFETCH_IDLE_POLL)
+
+    async def wait(self, label, path):
+        """Let a prefetch of `path` that is under way finish, so opening it reads the cache.
+
+        A prefetch that fails or is cancelled leaves the file uncached, and
+        opening it downloads it as usual.
+        """
+        task = self._downloads.get((label, path))
+        if task is None:
+            return
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+        except Exception:
+            pass
+
+    async def fetch(self, backend, entry):
+        """Download one entry into the cache; a download already under way is joined."""
+        key = (backend.label, entry.path)
+        task = self._downloads.get(key)
+        if task is None:
+            task = self._downloads[key] = asyncio.ensure_future(self._download(backend, entry))
+            task.add_done_callback(lambda _: self._downloads.pop(key, None))
+        # A cancelled round stops waiting, but downloads it started still fill the cache
+        return await asyncio.shield(task)
+
+    async def _download(self, backend, entry):
+        from .compression import decode, worker_pool
+        started = time.perf_counter()
+        try:
+            data = await decode(await backend.download(entry.path), entry.encoding)
+            await asyncio.get_running_loop().run_in_executor(
+                worker_pool(), self.content_cache.put, backend.label, entry.path, entry.etag, data
+            )
+        except StorageError:
+            # Deleted or unreachable: opening it will say so
+            return False
+        except Exception:
+            # Undecodable or not cacheable (disk full, broken pool): opening it reports the real error
+            if self.metrics.enabled:
+                self.metrics.record("prefetch.download", time.perf_counter() - started, error=True)
+            return False
+        if self.metrics.enabled:
+            self.metrics.record("prefetch.download", time.perf_counter() - started, len(data))
+        return True
+
+    async def run(self, backend, entries):
+        """Fetch `entries` (most likely first) that are not cached yet; returns the number fetched."""
+        planned = await asyncio.to_thread(self.plan, backend.label, entries)
+        queue = asyncio.Queue()
+        for entry in planned:
+            queue.put_nowait(entry)
+        fetched = 0
+
+        async def worker():
+            nonlocal fetched
+            while not queue.empty():
+                entry = queue.get_nowait()
+                await self._idle(backend)
+                self._active += 1
+                try:
+                    if await self.fetch(backend, entry):
+                        fetched += 1
+                finally:
+                    self._active -= 1
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(planned)))))
+        return fetched
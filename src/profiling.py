@@ -0,0 +1,129 @@
+# Module for on-demand cProfile and tracemalloc reports around user actions
+import os
+from datetime import datetime
+
+from . import config
+
+# User actions that can be profiled
+ACTIONS = ("refresh", "search", "upload")
+
+
+class ProfileSession:
+    """cProfile on the Tk thread (and optionally the I/O loop thread) plus a tracemalloc baseline."""
+
+    def __init__(self, action, loop=None):
+        import cProfile
+        import tracemalloc
+
+        self.action = action
+        self.loop = loop
+        self.started = datetime.now()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+        self.ui_profile = cProfile.Profile()
+        self.io_profile = cProfile.Profile() if loop is not None else None
+        # cProfile only sees the thread it is enabled on
+        if self.io_profile is not None:
+            self._on_loop(self.io_profile.enable)
+        self.ui_profile.enable()
+
+    def _on_loop(self, func):
+        import asyncio
+
+        async def call():
+            func()
+        asyncio.run_coroutine_threadsafe(call(), self.loop).result(5)
+
+    def finish(self, output_dir, top=None):
+        """Stop profiling and write the reports; returns their paths."""
+        import tracemalloc
+
+        self.ui_profile.disable()
+        if self.io_profile is not None:
+            self._on_loop(self.io_profile.disable)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(output_dir, exist_ok=True)
+        stem = os.path.join(output_dir, f"{self.started:%Y%m%d-%H%M%S}-{self.action}")
+        paths = [f"{stem}-ui.pstats"]
+        self.ui_profile.dump_stats(paths[0])
+        if self.io_profile is not None:
+            paths.append(f"{stem}-io.pstats")
+            self.io_profile.dump_stats(paths[1])
+        paths.append(f"{stem}-alloc.txt")
+        self._write_allocation_diff(paths[-1], snapshot, current, peak, top or config.PROFILE_TOP_ALLOCATIONS)
+        return paths
+
+    def _write_allocation_diff(self, path, snapshot, current, peak, top):
+        import tracemalloc
+
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        differences = snapshot.filter_traces(ignore).compare_to(self._baseline.filter_traces(ignore), "lineno")
+        elapsed = (datetime.now() - self.started).total_seconds()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Action: {self.action}\n")
+            f.write(f"Started: {self.started:%Y-%m-%d %H:%M:%S}, lasted {elapsed:.2f} s\n")
+            f.write(f"Traced memory: {current / 1024:.1f} KiB now, {peak / 1024:.1f} KiB peak\n\n")
+            f.write(f"Top {top} allocation changes by line:\n")
+            for stat in differences[:top]:
+                f.write(f"{stat}\n")
+
+
+class ActionProfiler:
+    """Profiles user actions one at a time.
+
+    Call `begin(action)` when an action starts and `end(action)` when it
+    finishes. Nothing is recorded unless the action was armed with `arm()`,
+    profiling was started by hand, or the profiler runs in `auto` mode (every
+    action is profiled, as with the --profile command line flag).
+    """
+
+    def __init__(self, output_dir=None, auto=False, loop=None):
+        self.output_dir = output_dir or config.PROFILE_DIR
+        self.auto = auto
+        self.loop = loop
+        self.armed = set()
+        self.session = None
+
+    @property
+    def active(self):
+        """Action being profiled, or None."""
+        return self.session.action if self.session is not None else None
+
+    def arm(self, action):
+        """Profile the next occurrence of `action`."""
+        self.armed.add(action)
+
+    def begin(self, action):
+        if self.session is not None:
+            return False
+        if not (self.auto or action in self.armed):
+            return False
+        self.armed.discard(action)
+        self.session = ProfileSession(action, self.loop)
+        return True
+
+    def end(self, action):
+        """Finish the session if it belongs to `action`; returns the report paths (or [])."""
+        if self.session is None or self.session.action != action:
+            return []
+        session, self.session = self.session, None
+        return session.finish(self.output_dir)
+
+    def start(self, label="manual"):
+        """Start a session by hand (e.g. around a bulk upload); returns False if one is running."""
+        if self.session is not None:
+            return False
+        self.session = ProfileSession(label, self.loop)
+        return True
+
+    def stop(self):
+        """Finish whatever session is running; returns the report paths (or [])."""
+        if self.session is None:
+            return []
+        return self.end(self.session.action)
@@ -0,0 +1,274 @@
+# Module for the graph of which articles link to, embed or import which objects
+import asyncio
+import json
+import os
+import posixpath
+import re
+import threading
+from urllib.parse import unquote, urlsplit
+
+from . import config
+from .file_store import PLACEHOLDER_NAMES
+from .image_pipeline import VARIANT_NAME, VARIANT_SOURCE_TYPES, variant_path
+from .storage_backend import StorageError, guess_content_type
+
+# Code is not content: links inside fenced blocks and inline code are ignored
+FENCED_CODE = re.compile(r"^(```|~~~).*?^\1[^\n]*$", re.MULTILINE | re.DOTALL)
+INLINE_CODE = re.compile(r"`[^`\n]+`")
+# [text](target "title") and ![alt](target)
+MARKDOWN_LINK = re.compile(r"!?\[[^\]\n]*\]\(\s*(<[^>\n]*>|[^)\s]+)[^)\n]*\)")
+# [label]: target
+LINK_DEFINITION = re.compile(r"^\s{0,3}\[[^\]\n]+\]:\s*(<[^>\n]*>|\S+)", re.MULTILINE)
+# src="..." in HTML, src={"..."} in JSX, and the like
+ATTRIBUTE = re.compile(r"\b(?:src|href|poster|srcSet|srcset)\s*=\s*\{?\s*[\"'`]([^\"'`\n]+)[\"'`]")
+# import X from "./x.js" and import "./x.css"
+IMPORT = re.compile(r"^\s*import\s+(?:[^\"';]*?\s+from\s+)?[\"']([^\"'\n]+)[\"']", re.MULTILINE)
+SCHEME = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+def is_article(path):
+    return path.lower().endswith(tuple(config.REFERENCE_SOURCE_EXTENSIONS))
+
+
+def resolve(target, source, url_prefixes=()):
+    """Bucket path a link in `source` points at, or None for external and non-file targets.
+
+    Relative targets are resolved against the article's folder and targets
+    starting with "/" against the bucket root. Absolute URLs only count when
+    they start with one of `url_prefixes` (the bucket's public URL). Targets
+    without a file extension (site routes, package imports) are not objects.
+    """
+    target = target.strip().strip("<>")
+    for prefix in url_prefixes:
+        if prefix and target.startswith(prefix):
+            target = "/" + target[len(prefix):]
+            break
+    else:
+        if not target or target.startswith(("#", "//")) or SCHEME.match(target):
+            return None
+    path = unquote(urlsplit(target).path)
+    if not path:
+        return None
+    if path.startswith(("@", "~")):
+        # Import aliases of the site's build, not bucket paths
+        return None
+    if path.startswith("/"):
+        path = path.lstrip("/")
+    else:
+        path = posixpath.join(posixpath.dirname(source), path)
+    path = posixpath.normpath(path)
+    if path.startswith("../") or path in (".", "..") or "." not in path.rpartition("/")[2]:
+        return None
+    return path
+
+
+def extract_references(text, source, url_prefixes=()):
+    """Sorted bucket paths that the article `source` links to, embeds or imports."""
+    text = INLINE_CODE.sub("", FENCED_CODE.sub("", text))
+    targets = []
+    for pattern in (MARKDOWN_LINK, LINK_DEFINITION, IMPORT):
+        targets.extend(pattern.findall(text))
+    for value in ATTRIBUTE.findall(text):
+        # A srcset lists "url width" candidates separated by commas
+        targets.extend(candidate.split()[0] for candidate in value.split(",") if candidate.strip())
+    paths = {resolve(target, source, url_prefixes) for target in targets}
+    paths.discard(None)
+    paths.discard(source)
+    return sorted(paths)
+
+
+class ReferenceGraph:
+    """Edges from articles to the objects they reference, kept up to date incrementally.
+
+    Each article's references are stored with the eTag they were parsed from,
+    so a scan only downloads articles that changed since the last one. The
+    graph is saved as JSON at `path` (None keeps it in memory only). Updates
+    happen on the I/O loop while the Tk thread reads, hence the lock.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # article path -> (eTag, referenced paths) and the reverse index
+        self._sources = {}
+        self._referrers = {}
+        self._loaded = path is None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the saved graph once; a missing or damaged file starts empty."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                return
+            for source, (etag, targets) in saved.get("sources", {}).items():
+                if source not in self._sources:
+                    self._set(source, etag, targets)
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            saved = {"sources": {source: [etag, list(targets)] for source, (etag, targets) in self._sources.items()}}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.path)
+
+    def _set(self, source, etag, targets):
+        self._unset(source)
+        self._sources[source] = (etag, tuple(targets))
+        for target in targets:
+            self._referrers.setdefault(target, set()).add(source)
+
+    def _unset(self, source):
+        _, targets = self._sources.pop(source, (None, ()))
+        for target in targets:
+            referrers = self._referrers.get(target)
+            if referrers is not None:
+                referrers.discard(source)
+                if not referrers:
+                    del self._referrers[target]
+
+    def update(self, source, etag, text, url_prefixes=()):
+        """Re-parse one article; returns the paths it references."""
+        targets = extract_references(text, source, url_prefixes)
+        with self._lock:
+            self._set(source, etag, targets)
+        return targets
+
+    def forget(self, paths):
+        with self._lock:
+            for path in paths:
+                self._unset(path)
+
+    def rename(self, old_path, new_path):
+        """An article moved: its links move with it (links to it are not rewritten)."""
+        with self._lock:
+            if old_path in self._sources:
+                etag, targets = self._sources[old_path]
+                self._unset(old_path)
+                self._set(new_path, etag, targets)
+
+    def stale(self, entries):
+        """Listed articles whose references are missing or out of date.
+
+        Articles that are no longer listed are dropped from the graph.
+        """
+        articles = {entry.path: entry for entry in entries if not entry.is_folder and is_article(entry.path)}
+        with self._lock:
+            for source in [source for source in self._sources if source not in articles]:
+                self._unset(source)
+            return [entry for path, entry in articles.items()
+                    if path not in self._sources or self._sources[path][0] != entry.etag or not entry.etag]
+
+    def referrers(self, path):
+        """Sorted articles that reference `path`."""
+        with self._lock:
+            return sorted(self._referrers.get(path, ()))
+
+    def references(self, source):
+        with self._lock:
+            return list(self._sources.get(source, (None, ()))[1])
+
+    def broken(self, existing):
+        """(article, target) for every reference to a path not in `existing`."""
+        with self._lock:
+            return sorted((source, target) for target, sources in self._referrers.items()
+                          if target not in existing for source in sources)
+
+    def orphans(self, entries):
+        """Listed files that no article references, articles and folder placeholders aside.
+
+        An image counts as referenced when any of its WebP variants is, and the
+        variants when the image is.
+        """
+        files = [entry for entry in entries if not entry.is_folder]
+        with self._lock:
+            referenced = set(self._referrers)
+        # An image and its variants share a stem: the path without extension or ".w<width>.webp"
+        stems = {}
+        for entry in files:
+            stem = _variant_stem(entry.path)
+            if stem is not None:
+                stems.setdefault(stem, []).append(entry.path)
+        used = set(referenced)
+        for path in referenced:
+            stem = _variant_stem(path)
+            if stem is not None:
+                used.update(stems.get(stem, ()))
+        return [entry for entry in files if entry.path not in used and not is_article(entry.path)
+                and entry.name not in PLACEHOLDER_NAMES and entry.name != ".gitkeep"]
+
+
+def _variant_stem(path):
+    if VARIANT_NAME.search(path):
+        return VARIANT_NAME.sub("", path)
+    if guess_content_type(path) in VARIANT_SOURCE_TYPES:
+        return variant_path(path, 0)[:-len(".w0.webp")]
+    return None
+
+
+class ScanReport:
+    """What a reference scan did: articles parsed, and those that could not be read."""
+
+    __slots__ = ("scanned", "failed")
+
+    def __init__(self):
+        self.scanned = 0
+        self.failed = []
+
+
+async def url_prefixes(backend, entries):
+    """The bucket's public URL base, as absolute links to its objects start with it."""
+    for entry in entries:
+        if not entry.is_folder:
+            url = await backend.public_url(entry.path)
+            if url and url.endswith(entry.path):
+                return (url[:-len(entry.path)],)
+            break
+    return ()
+
+
+async def scan(backend, graph, entries, content_cache=None, concurrency=4, on_progress=None):
+    """Bring `graph` up to date with the listed `entries`, downloading only changed articles.
+
+    Contents are taken from `content_cache` (a ContentCache keyed by the
+    backend's label) when it has them. Returns a ScanReport.
+    """
+    from .compression import decode
+    from .paged_viewer import is_large_file
+    await asyncio.to_thread(graph.load)
+    entries = list(entries)
+    stale = [entry for entry in graph.stale(entries) if not is_large_file(entry.size)]
+    report = ScanReport()
+    if not stale:
+        return report
+    prefixes = await url_prefixes(backend, entries)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan_one(entry):
+        async with semaphore:
+            try:
+                data = None
+                if content_cache is not None:
+                    data = await asyncio.to_thread(content_cache.get, backend.label, entry.path, entry.etag)
+                if data is None:
+                    data = await decode(await backend.download(entry.path), entry.encoding)
+                graph.update(entry.path, entry.etag, data.decode("utf-8", "replace"), prefixes)
+                report.scanned += 1
+            except StorageError as e:
+                # Deleted since the listing; the next scan drops it
+                if not e.not_found:
+                    report.failed.append((entry.path, str(e)))
+            if on_progress is not None:
+                on_progress(report.scanned + len(report.failed), len(stale))
+
+    await asyncio.gather(*(scan_one(entry) for entry in stale))
+    await asyncio.to_thread(graph.save)
+    return report
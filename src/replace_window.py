@@ -0,0 +1,107 @@
+# Module for the find-and-replace window: options, per-file diff preview, apply and undo
+import tkinter as tk
+from tkinter import ttk
+
+from .history_window import diff_view, show_diff
+
+
+class ReplaceWindow:
+    """Toplevel for one find-and-replace over `scope` (a description of the files).
+
+    `on_preview(find, replace, regex, ignore_case)` runs a dry run and hands
+    the TransformPlan to set_plan; `on_apply(plan)` writes it and
+    `on_undo()` rolls back the last replacement in this bucket.
+    """
+
+    def __init__(self, root, scope, on_preview, on_apply, on_undo):
+        self.on_preview = on_preview
+        self.on_apply = on_apply
+        self.on_undo = on_undo
+        self.plan = None
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Find and Replace - {scope}")
+        self.window.geometry("900x620")
+
+        options = ttk.Frame(self.window, padding=5)
+        self.find_var = tk.StringVar()
+        self.replace_var = tk.StringVar()
+        self.regex_var = tk.BooleanVar(value=False)
+        self.ignore_case_var = tk.BooleanVar(value=False)
+        ttk.Label(options, text="Find:").grid(row=0, column=0, sticky="w", padx=(0, 5))
+        ttk.Entry(options, textvariable=self.find_var, width=50).grid(row=0, column=1, sticky="ew")
+        ttk.Label(options, text="Replace:").grid(row=1, column=0, sticky="w", padx=(0, 5))
+        ttk.Entry(options, textvariable=self.replace_var, width=50).grid(row=1, column=1, sticky="ew")
+        ttk.Checkbutton(options, text="Regular expression", variable=self.regex_var).grid(row=0, column=2, padx=(10, 0))
+        ttk.Checkbutton(options, text="Ignore case", variable=self.ignore_case_var).grid(row=1, column=2, padx=(10, 0))
+        options.grid_columnconfigure(1, weight=1)
+
+        buttons = ttk.Frame(self.window, padding=5)
+        ttk.Button(buttons, text="Preview", command=self.preview).grid(row=0, column=0, padx=(0, 5))
+        self.apply_btn = ttk.Button(buttons, text="Apply", command=self.apply, state="disabled")
+        self.apply_btn.grid(row=0, column=1, padx=(0, 20))
+        ttk.Button(buttons, text="Undo Last Replace", command=self.on_undo).grid(row=0, column=2)
+        self.summary_label = ttk.Label(buttons, text="Preview to see which files change")
+        self.summary_label.grid(row=0, column=3, padx=(20, 0), sticky="w")
+
+        self.tree = ttk.Treeview(self.window, columns=("count",), show="tree headings", height=8)
+        self.tree.heading("#0", text="File")
+        self.tree.heading("count", text="Replacements")
+        self.tree.column("#0", width=700)
+        self.tree.column("count", width=120)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.diff_text = diff_view(self.window)
+
+        options.grid(row=0, column=0, sticky="ew")
+        buttons.grid(row=1, column=0, sticky="ew")
+        self.tree.grid(row=2, column=0, sticky="nsew")
+        self.diff_text.grid(row=3, column=0, sticky="nsew")
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(3, weight=1)
+
+    def preview(self):
+        self.set_plan(None)
+        self.on_preview(self.find_var.get(), self.replace_var.get(), self.regex_var.get(), self.ignore_case_var.get())
+
+    def apply(self):
+        if self.plan is not None and len(self.plan):
+            self.on_apply(self.plan)
+
+    def set_plan(self, plan):
+        """Show a dry run's changed files; None clears it."""
+        if not self.window.winfo_exists():
+            return
+        self.plan = plan
+        self.tree.delete(*self.tree.get_children())
+        show_diff(self.diff_text, "")
+        if plan is None:
+            self.apply_btn.config(state="disabled")
+            return
+        for change in plan.changes:
+            self.tree.insert("", "end", iid=change.path, text=change.path, values=(change.count,))
+        self.show_message(plan.summary())
+        self.apply_btn.config(state="normal" if len(plan) else "disabled")
+        children = self.tree.get_children()
+        if children:
+            self.tree.selection_set(children[0])
+            self.on_select()
+        else:
+            # Nothing to diff: say why files were left out instead
+            problems = [f"{path}: {reason}" for path, reason in plan.skipped + plan.failed]
+            show_diff(self.diff_text, "\n".join(problems) or "No file contains the text to find.")
+
+    def on_select(self, event=None):
+        selected = self.tree.selection()
+        if self.plan is None or not selected:
+            return
+        for change in self.plan.changes:
+            if change.path == selected[0]:
+                show_diff(self.diff_text, change.diff())
+                return
+
+    def show_message(self, text):
+        if self.window.winfo_exists():
+            self.summary_label.config(text=text)
+
+    def applied(self):
+        """The plan was written; a new preview is needed before applying again."""
+        self.set_plan(None)
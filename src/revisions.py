@@ -0,0 +1,257 @@
+# Module for the local revision history of viewed and saved files
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from . import config
+from .compression import TRIM_TARGET
+from .content_hash import hash_bytes
+
+
+def _lines(data):
+    # surrogateescape round-trips bytes that are not UTF-8
+    return data.decode("utf-8", "surrogateescape").splitlines(keepends=True)
+
+
+def _join(lines):
+    return "".join(lines).encode("utf-8", "surrogateescape")
+
+
+def make_delta(old, new):
+    """Line-based delta turning `old` into `new`: [start, end] copies old lines, strings are inserted."""
+    old_lines, new_lines = _lines(old), _lines(new)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(old, ops):
+    old_lines = _lines(old)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_lines[op[0]:op[1]])
+    return _join(parts)
+
+
+def diff_text(old, new, old_label, new_label, context=3):
+    """Unified diff of two versions of a file, as text."""
+    return "".join(difflib.unified_diff(_lines(old), _lines(new), old_label, new_label, n=context))
+
+
+class RevisionStore:
+    """Versions of files as they were viewed, saved or restored, kept under CACHE_DIR/revisions.
+
+    Each file's history is a directory with an index and one gzip blob per
+    revision. Every REVISIONS_KEYFRAME_INTERVAL-th revision (and any whose
+    delta would not be smaller) is stored whole; the rest as line deltas from
+    the revision before, so reading one never replays more than a few deltas.
+    A file keeps at most `max_revisions`, and whole histories are dropped,
+    least recently changed first, once all of them exceed `max_bytes`. Their
+    size is kept as a running total, so only a trim walks the histories.
+    """
+
+    def __init__(self, directory=None, max_revisions=None, max_bytes=None, keyframe_interval=None):
+        self.directory = directory or os.path.join(config.CACHE_DIR, "revisions")
+        self.max_revisions = max_revisions or config.REVISIONS_PER_FILE
+        self.max_bytes = config.REVISIONS_MAX_BYTES if max_bytes is None else max_bytes
+        self.keyframe_interval = keyframe_interval or config.REVISIONS_KEYFRAME_INTERVAL
+        self._lock = threading.Lock()
+        # Bytes of all histories, read from disk on the first record
+        self._total = None
+
+    def _dir(self, bucket, path):
+        return os.path.join(self.directory, hashlib.sha1(f"{bucket}\n{path}".encode("utf-8")).hexdigest()[:20])
+
+    def _load_index(self, bucket, path):
+        try:
+            with open(os.path.join(self._dir(bucket, path), "index.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"bucket": bucket, "path": path, "next": 1, "revisions": []}
+
+    def _save_index(self, bucket, path, index):
+        directory = self._dir(bucket, path)
+        tmp_path = os.path.join(directory, "index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, os.path.join(directory, "index.json"))
+
+    def _read_blob(self, directory, revision):
+        with open(os.path.join(directory, f"{revision['id']}.gz"), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def _write_blob(self, directory, revision, raw):
+        blob = gzip.compress(raw, mtime=0)
+        with open(os.path.join(directory, f"{revision['id']}.gz"), "wb") as f:
+            f.write(blob)
+        revision["stored"] = len(blob)
+
+    @staticmethod
+    def _size(directory, revisions):
+        """Bytes a history takes: its blobs as the index records them, plus the index."""
+        try:
+            index_size = os.stat(os.path.join(directory, "index.json")).st_size
+        except OSError:
+            index_size = 0
+        return index_size + sum(revision["stored"] for revision in revisions)
+
+    def _content(self, directory, revisions, position):
+        """Bytes of revisions[position]: its keyframe with the deltas after it applied."""
+        start = position
+        while revisions[start]["kind"] != "full":
+            start -= 1
+        data = self._read_blob(directory, revisions[start])
+        for revision in revisions[start + 1:position + 1]:
+            data = apply_delta(data, json.loads(self._read_blob(directory, revision)))
+        return data
+
+    def history(self, bucket, path):
+        """Revisions of `path`, oldest first: dicts with id, time, source, size, md5 and etag."""
+        with self._lock:
+            return [dict(revision) for revision in self._load_index(bucket, path)["revisions"]]
+
+    def content(self, bucket, path, revision_id):
+        with self._lock:
+            revisions = self._load_index(bucket, path)["revisions"]
+            for position, revision in enumerate(revisions):
+                if revision["id"] == revision_id:
+                    return self._content(self._dir(bucket, path), revisions, position)
+        raise KeyError(f"No revision {revision_id} of {path}")
+
+    def record(self, bucket, path, data, source, etag=None):
+        """Add `data` as the newest revision unless it already is; returns that revision."""
+        digest = hash_bytes(data)
+        with self._lock:
+            directory = self._dir(bucket, path)
+            index = self._load_index(bucket, path)
+            revisions = index["revisions"]
+            if revisions and revisions[-1]["md5"] == digest:
+                return dict(revisions[-1])
+            size_before = self._size(directory, revisions)
+            os.makedirs(directory, exist_ok=True)
+            revision = {"id": index["next"], "time": time.time(), "source": source,
+                        "size": len(data), "md5": digest, "etag": etag}
+            index["next"] += 1
+            since_keyframe = 0
+            for previous in reversed(revisions):
+                if previous["kind"] == "full":
+                    break
+                since_keyframe += 1
+            raw = data
+            revision["kind"] = "full"
+            if revisions and since_keyframe + 1 < self.keyframe_interval:
+                delta = json.dumps(make_delta(self._content(directory, revisions, len(revisions) - 1), data))
+                delta = delta.encode("utf-8")
+                if len(delta) < len(data):
+                    raw, revision["kind"] = delta, "delta"
+            self._write_blob(directory, revision, raw)
+            revisions.append(revision)
+            self._prune(directory, revisions)
+            self._save_index(bucket, path, index)
+            if self._total is None:
+                self._total = self._measure()[0]
+            else:
+                self._total += self._size(directory, revisions) - size_before
+            if self._total > self.max_bytes:
+                self._total = self._trim(keep=directory)
+            return dict(revision)
+
+    def recent(self, bucket, limit, sources=("saved", "restored")):
+        """Paths of `bucket` most recently recorded from one of `sources`, newest first."""
+        with self._lock:
+            try:
+                directories = sorted(os.scandir(self.directory), key=lambda entry: entry.stat().st_mtime,
+                                     reverse=True)
+            except OSError:
+                return []
+            paths = []
+            for directory in directories:
+                if len(paths) >= limit:
+                    break
+                try:
+                    with open(os.path.join(directory.path, "index.json"), "r", encoding="utf-8") as f:
+                        index = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if index["bucket"] == bucket and any(r["source"] in sources for r in index["revisions"]):
+                    paths.append(index["path"])
+            return paths
+
+    def move(self, bucket, old_path, new_path):
+        """Carry the history of a renamed file over to its new path."""
+        with self._lock:
+            old_dir, new_dir = self._dir(bucket, old_path), self._dir(bucket, new_path)
+            if not os.path.isdir(old_dir):
+                return
+            if os.path.isdir(new_dir):
+                shutil.rmtree(new_dir, ignore_errors=True)
+                # The replaced history's bytes are gone; count again on the next record
+                self._total = None
+            os.replace(old_dir, new_dir)
+            index = self._load_index(bucket, new_path)
+            index["path"] = new_path
+            self._save_index(bucket, new_path, index)
+
+    def _prune(self, directory, revisions):
+        excess = len(revisions) - self.max_revisions
+        if excess <= 0:
+            return
+        # The new oldest revision must stand on its own before the ones it builds on go
+        first = revisions[excess]
+        if first["kind"] != "full":
+            self._write_blob(directory, first, self._content(directory, revisions, excess))
+            first["kind"] = "full"
+        for revision in revisions[:excess]:
+            try:
+                os.remove(os.path.join(directory, f"{revision['id']}.gz"))
+            except OSError:
+                pass
+        del revisions[:excess]
+
+    def _measure(self):
+        """(total bytes, [(last change, bytes, directory)]) of every history on disk."""
+        histories = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            size, changed = 0, 0.0
+            for blob in os.scandir(entry.path):
+                stat = blob.stat()
+                size += stat.st_size
+                changed = max(changed, stat.st_mtime)
+            histories.append((changed, size, entry.path))
+            total += size
+        return total, histories
+
+    def _trim(self, keep):
+        """Drop the least recently changed histories but `keep` down to TRIM_TARGET of the limit; returns the total."""
+        total, histories = self._measure()
+        for _, size, directory in sorted(histories):
+            if total <= self.max_bytes * TRIM_TARGET:
+                break
+            if directory != keep:
+                shutil.rmtree(directory, ignore_errors=True)
+                total -= size
+        return total
+
+    def diff(self, bucket, path, old_id, new_id=None, current=None):
+        """Unified diff from revision `old_id` to revision `new_id` (or to `current` bytes)."""
+        old = self.content(bucket, path, old_id)
+        if new_id is None:
+            return diff_text(old, current, f"{path} (revision {old_id})", f"{path} (editor)")
+        return diff_text(old, self.content(bucket, path, new_id), f"{path} (revision {old_id})",
+                         f"{path} (revision {new_id})")
@@ -0,0 +1,79 @@
+# Module for signing object URLs of a private bucket in batches, with an expiry-aware cache
+import asyncio
+import threading
+import time
+
+from . import config
+
+
+class SignedUrlCache:
+    """Signed URLs by path, reused until shortly before they expire.
+
+    `fetch` signs only the paths without a fresh URL, many per request, so a
+    listing costs a handful of calls instead of one per row. URLs within
+    `margin` seconds of expiry count as stale; `next_refresh` tells the caller
+    when the first one will, so it can re-sign them in the background.
+    Read from the Tk thread and filled on the I/O loop.
+    """
+
+    def __init__(self, backend, expires_in=None, margin=None, batch_size=None, clock=time.monotonic):
+        self.backend = backend
+        self.expires_in = expires_in or config.SIGNED_URL_EXPIRES
+        self.margin = config.SIGNED_URL_REFRESH_MARGIN if margin is None else margin
+        self.batch_size = batch_size or config.SIGNED_URL_BATCH_SIZE
+        self.clock = clock
+        # path -> (URL, clock time it expires)
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """The cached URL for `path` while it is fresh, else None."""
+        cached = self._urls.get(path)
+        if cached is None or cached[1] - self.margin <= self.clock():
+            return None
+        return cached[0]
+
+    def stale(self, paths):
+        """Paths among `paths` that need signing."""
+        return [path for path in paths if self.get(path) is None]
+
+    def forget(self, paths):
+        with self._lock:
+            for path in paths:
+                self._urls.pop(path, None)
+
+    def next_refresh(self):
+        """Seconds until the first cached URL goes stale, or None when nothing is cached."""
+        with self._lock:
+            if not self._urls:
+                return None
+            soonest = min(expires for _, expires in self._urls.values())
+        return max(0.0, soonest - self.margin - self.clock())
+
+    async def fetch(self, paths, on_batch=None):
+        """{path: URL} for `paths`, signing stale ones in batches (runs on the I/O loop).
+
+        `on_batch(urls)` is called with each batch's new URLs as it arrives;
+        paths the backend cannot sign (e.g. deleted objects) are left out.
+        """
+        paths = list(dict.fromkeys(paths))
+        todo = self.stale(paths)
+
+        async def sign(batch):
+            started = self.clock()
+            signed = await self.backend.signed_urls(batch, self.expires_in)
+            # Counted from before the request, so the URL never outlives its cache entry
+            expires = started + self.expires_in
+            with self._lock:
+                for path, url in signed.items():
+                    self._urls[path] = (url, expires)
+            if on_batch is not None and signed:
+                on_batch(signed)
+
+        await asyncio.gather(*(sign(todo[i:i + self.batch_size]) for i in range(0, len(todo), self.batch_size)))
+        urls = {}
+        for path in paths:
+            cached = self._urls.get(path)
+            if cached is not None:
+                urls[path] = cached[0]
+        return urls
@@ -0,0 +1,128 @@
+# Module for measuring cold start: phase timings and per-module import times
+import sys
+import threading
+import time
+
+# Imports listed in the startup report, slowest first
+REPORT_TOP_IMPORTS = 25
+
+
+class _TimedLoader:
+    """Wraps a module loader for one import so its exec_module can be timed."""
+
+    def __init__(self, loader, timer, name):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the real loader back to the module so nothing keeps this wrapper
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._timer._exec(self._name, self._loader, module)
+
+
+class ImportTimer:
+    """Meta path hook recording self and cumulative import time per module, like `-X importtime`."""
+
+    def __init__(self):
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, name)
+        return spec
+
+    def _exec(self, name, loader, module):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            with self._lock:
+                self.records.append((name, cumulative - children, cumulative, len(stack)))
+
+    def report(self, top=REPORT_TOP_IMPORTS):
+        """The slowest imports as `-X importtime` style lines (microseconds)."""
+        with self._lock:
+            records = sorted(self.records, key=lambda r: r[2], reverse=True)[:top]
+        lines = ["import time: self [us] | cumulative | imported package"]
+        for name, own, cumulative, depth in records:
+            lines.append(f"import time: {own * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{name}")
+        return "\n".join(lines)
+
+
+class StartupMetrics:
+    """Milestones of a cold start, in seconds since `started` (process start when known).
+
+    Each milestone is also recorded in the metrics registry as `startup.<phase>`
+    so it shows up in the diagnostics window and exports.
+    """
+
+    def __init__(self, started=None, import_timer=None, metrics=None, stream=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.import_timer = import_timer
+        self.metrics = metrics
+        self.stream = stream
+        self.phases = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            self.phases.append((phase, elapsed))
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.record(f"startup.{phase}", elapsed)
+        return elapsed
+
+    def finish(self, phase):
+        """Record the last milestone and, if a stream was given, write the report to it."""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark(phase)
+        if self.import_timer is not None:
+            self.import_timer.uninstall()
+        if self.stream is not None:
+            self.stream.write(self.report() + "\n")
+            self.stream.flush()
+
+    def report(self):
+        with self._lock:
+            phases = list(self.phases)
+        lines = ["Startup:"]
+        lines.extend(f"  {phase:<16} {elapsed * 1000:8.1f} ms" for phase, elapsed in phases)
+        if self.import_timer is not None:
+            lines.append(self.import_timer.report())
+        return "\n".join(lines)
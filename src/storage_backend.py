@@ -0,0 +1,636 @@
+# Module for storage backends: the protocol the app talks to and its implementations
+import asyncio
+import hashlib
+import mimetypes
+import os
+import random
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Protocol, runtime_checkable
+
+from . import config
+
+DEFAULT_CONTENT_TYPE = "text/markdown"
+# What Supabase serves objects uploaded without a Cache-Control value with
+DEFAULT_CACHE_CONTROL = "max-age=3600"
+# Entries requested per listing call when walking a bucket
+LIST_PAGE_SIZE = 1000
+# What compressed objects are stored as, so their URLs never serve them as text
+ENCODED_CONTENT_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+
+class StorageError(Exception):
+    """A storage operation failed.
+
+    `status` is the HTTP-style status code when one is known (404, 409, 429,
+    503, ...) and `retry_after` the back-off in seconds the server asked for.
+    `network` is set when the request never got a response.
+    """
+
+    def __init__(self, message, status=None, retry_after=None, network=False):
+        super().__init__(message)
+        self.message = message
+        self.status = int(status) if status is not None and str(status).isdigit() else None
+        self.retry_after = retry_after
+        self.network = network
+
+    @property
+    def already_exists(self):
+        return self.status == 409 or "already exists" in self.message.lower()
+
+    @property
+    def not_found(self):
+        return self.status == 404 or "not found" in self.message.lower()
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Operations the app needs from a bucket; paths are relative to the bucket root.
+
+    `list` returns one folder level in the Supabase listing format: dicts with
+    `name` (relative to `prefix`), `id` (None for folders), `created_at`,
+    `updated_at` and `metadata` (`size`, `mimetype`, `eTag`, `cacheControl`,
+    `contentEncoding`; `cacheControl` is None from backends that do not keep one).
+    `content_encoding` names the compression applied to uploaded data. Such
+    objects are stored as ENCODED_CONTENT_TYPES[encoding], not `content_type`,
+    and listed with that `contentEncoding`; downloads return the stored bytes,
+    which only objects listed with an encoding need decompressed. Backends that
+    cannot record the encoding store the data decompressed. `cache_control` is the
+    Cache-Control header the object is served with, always starting with
+    `max-age=`; None leaves the backend's default. `signed_urls` signs many paths
+    in one call and returns {path: URL}, leaving out paths it could not sign.
+    Failures raise StorageError.
+    """
+
+    label: str
+
+    async def list(self, prefix="", limit=LIST_PAGE_SIZE, offset=0): ...
+
+    async def download(self, path): ...
+
+    async def download_to(self, path, dest): ...
+
+    async def upload(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None): ...
+
+    async def update(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None): ...
+
+    async def remove(self, paths): ...
+
+    async def move(self, from_path, to_path): ...
+
+    async def copy(self, from_path, to_path): ...
+
+    async def public_url(self, path): ...
+
+    async def signed_urls(self, paths, expires_in): ...
+
+
+async def walk(backend, prefix="", include_folders=False, page_size=LIST_PAGE_SIZE):
+    """Yield every object under `prefix` with `name` set to its full path.
+
+    Folders are visited depth first in name order, one listing page at a time,
+    so memory use does not grow with the size of the bucket.
+    """
+    prefix = prefix.strip("/")
+    offset = 0
+    while True:
+        page = await backend.list(prefix, limit=page_size, offset=offset)
+        for entry in page:
+            full_path = f"{prefix}/{entry['name']}" if prefix else entry["name"]
+            item = dict(entry, name=full_path)
+            if entry.get("id") is None:
+                if include_folders:
+                    yield item
+                async for child in walk(backend, full_path, include_folders, page_size):
+                    yield child
+            else:
+                yield item
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def guess_content_type(path, default=DEFAULT_CONTENT_TYPE):
+    """Content type for `path` based on its extension."""
+    if path.endswith((".mdx", ".md")):
+        return "text/markdown"
+    return mimetypes.guess_type(path)[0] or default
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _folder_entry(name):
+    return {"name": name, "id": None, "created_at": None, "updated_at": None, "metadata": None}
+
+
+def _file_entry(name, object_id, size, mimetype, etag, created, updated, cache_control=DEFAULT_CACHE_CONTROL,
+                content_encoding=None):
+    return {
+        "name": name,
+        "id": object_id,
+        "created_at": _timestamp(created),
+        "updated_at": _timestamp(updated),
+        "metadata": {
+            "size": size,
+            "mimetype": mimetype,
+            "eTag": etag,
+            "cacheControl": cache_control,
+            "contentEncoding": content_encoding,
+        },
+    }
+
+
+def _check_path(path):
+    if not path or path.startswith("/") or "" in path.split("/") or ".." in path.split("/"):
+        raise StorageError(f"Invalid object path: {path!r}", status=400)
+    return path
+
+
+class SimulatedConditions:
+    """Latency and failure injection for the offline backends."""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            latency=config.SIMULATED_LATENCY,
+            jitter=config.SIMULATED_JITTER,
+            failure_rate=config.SIMULATED_FAILURE_RATE,
+            seed=config.SIMULATED_SEED,
+        )
+
+    async def apply(self, operation):
+        """Sleep for the simulated round trip and maybe fail `operation`."""
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise StorageError(f"Simulated failure during {operation}", status=self.failure_status)
+
+
+class _MemoryObject:
+    __slots__ = ("id", "data", "content_type", "content_encoding", "cache_control", "etag", "created", "updated")
+
+    def __init__(self, data, content_type, cache_control=None, created=None, content_encoding=None):
+        now = datetime.now(timezone.utc).timestamp()
+        self.id = str(uuid.uuid4())
+        self.data = bytes(data)
+        self.content_type = ENCODED_CONTENT_TYPES[content_encoding] if content_encoding else content_type
+        self.content_encoding = content_encoding
+        self.cache_control = cache_control or DEFAULT_CACHE_CONTROL
+        self.etag = f'"{hashlib.md5(self.data).hexdigest()}"'
+        self.created = created if created is not None else now
+        self.updated = now
+
+
+class MemoryStorageBackend:
+    """Bucket held in memory, for tests, benchmarks and offline work."""
+
+    def __init__(self, objects=None, conditions=None, label="memory", base_url="memory://mdx-files"):
+        self.label = label
+        self.base_url = base_url
+        self.conditions = conditions or SimulatedConditions()
+        self._objects = {}
+        # folder path -> names of its direct children ("" is the bucket root)
+        self._children = {"": set()}
+        self._sorted = {}
+        for path, data in (objects or {}).items():
+            self._put(path, data, guess_content_type(path))
+
+    def _put(self, path, data, content_type, cache_control=None, content_encoding=None):
+        previous = self._objects.get(path)
+        self._objects[path] = _MemoryObject(data, content_type, cache_control, previous.created if previous else None,
+                                            content_encoding)
+        parent, _, name = path.rpartition("/")
+        while True:
+            self._children.setdefault(parent, set()).add(name)
+            self._sorted.pop(parent, None)
+            if not parent:
+                break
+            parent, _, name = parent.rpartition("/")
+
+    def _unlink(self, path):
+        del self._objects[path]
+        parent, _, name = path.rpartition("/")
+        while True:
+            siblings = self._children[parent]
+            siblings.discard(name)
+            self._sorted.pop(parent, None)
+            if siblings or not parent:
+                break
+            del self._children[parent]
+            parent, _, name = parent.rpartition("/")
+
+    def _get(self, path):
+        obj = self._objects.get(path)
+        if obj is None:
+            raise StorageError(f"Object not found: {path}", status=404)
+        return obj
+
+    async def list(self, prefix="", limit=LIST_PAGE_SIZE, offset=0):
+        await self.conditions.apply("list")
+        prefix = prefix.strip("/")
+        names = self._sorted.get(prefix)
+        if names is None:
+            names = self._sorted[prefix] = sorted(self._children.get(prefix, ()))
+        entries = []
+        for name in names[offset:offset + limit]:
+            full_path = f"{prefix}/{name}" if prefix else name
+            obj = self._objects.get(full_path)
+            if obj is None:
+                entries.append(_folder_entry(name))
+            else:
+                entries.append(_file_entry(name, obj.id, len(obj.data), obj.content_type, obj.etag,
+                                           obj.created, obj.updated, obj.cache_control, obj.content_encoding))
+        return entries
+
+    async def download(self, path):
+        await self.conditions.apply("download")
+        return self._get(path).data
+
+    async def download_to(self, path, dest):
+        data = await self.download(path)
+        dest.write(data)
+        return len(data)
+
+    async def upload(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        await self.conditions.apply("upload")
+        if _check_path(path) in self._objects:
+            raise StorageError("The resource already exists", status=409)
+        self._put(path, data, content_type, cache_control, content_encoding)
+
+    async def update(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        await self.conditions.apply("update")
+        self._get(path)
+        self._put(path, data, content_type, cache_control, content_encoding)
+
+    async def remove(self, paths):
+        await self.conditions.apply("remove")
+        removed = []
+        for path in paths:
+            if path in self._objects:
+                self._unlink(path)
+                removed.append({"name": path})
+        return removed
+
+    async def move(self, from_path, to_path):
+        await self.conditions.apply("move")
+        obj = self._get(from_path)
+        if _check_path(to_path) in self._objects:
+            raise StorageError("The resource already exists", status=409)
+        self._unlink(from_path)
+        self._put(to_path, obj.data, obj.content_type, obj.cache_control, obj.content_encoding)
+
+    async def copy(self, from_path, to_path):
+        await self.conditions.apply("copy")
+        obj = self._get(from_path)
+        if _check_path(to_path) in self._objects:
+            raise StorageError("The resource already exists", status=409)
+        self._put(to_path, obj.data, obj.content_type, obj.cache_control, obj.content_encoding)
+
+    async def public_url(self, path):
+        return f"{self.base_url}/object/public/{path}"
+
+    async def signed_urls(self, paths, expires_in):
+        await self.conditions.apply("sign")
+        expires = int(time.time()) + int(expires_in)
+        urls = {}
+        for path in paths:
+            if _check_path(path) in self._objects:
+                token = hashlib.sha256(f"{path}\n{expires}".encode("utf-8")).hexdigest()[:32]
+                urls[path] = f"{self.base_url}/object/sign/{path}?token={token}&expires={expires}"
+        return urls
+
+
+class LocalFilesystemBackend:
+    """Bucket stored as plain files under a local directory."""
+
+    def __init__(self, root, conditions=None, label=None):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.label = label or f"local:{self.root}"
+        self.conditions = conditions or SimulatedConditions()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _resolve(self, path):
+        if not path:
+            return self.root
+        return os.path.join(self.root, *_check_path(path).split("/"))
+
+    def _entry(self, dir_entry):
+        if dir_entry.is_dir():
+            return _folder_entry(dir_entry.name)
+        stat = dir_entry.stat()
+        return _file_entry(
+            dir_entry.name,
+            f"{stat.st_dev:x}-{stat.st_ino:x}",
+            stat.st_size,
+            guess_content_type(dir_entry.name),
+            f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            stat.st_ctime,
+            stat.st_mtime,
+            cache_control=None,
+        )
+
+    def _list(self, prefix, limit, offset):
+        directory = self._resolve(prefix.strip("/"))
+        if not os.path.isdir(directory):
+            return []
+        with os.scandir(directory) as entries:
+            names = sorted(entries, key=lambda entry: entry.name)
+        return [self._entry(entry) for entry in names[offset:offset + limit]]
+
+    def _read(self, path):
+        try:
+            with open(self._resolve(path), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            raise StorageError(f"Object not found: {path}", status=404) from None
+
+    def _write(self, path, data, must_exist, content_encoding=None):
+        from .compression import decompress
+        target = self._resolve(path)
+        exists = os.path.isfile(target)
+        if must_exist and not exists:
+            raise StorageError(f"Object not found: {path}", status=404)
+        if not must_exist and exists:
+            raise StorageError("The resource already exists", status=409)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(decompress(data, content_encoding))
+        os.replace(temp_path, target)
+
+    def _prune(self, directory):
+        """Remove empty folders left behind, like object storage does implicitly."""
+        while directory != self.root and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def _remove(self, paths):
+        removed = []
+        for path in paths:
+            target = self._resolve(path)
+            if os.path.isfile(target):
+                os.remove(target)
+                self._prune(os.path.dirname(target))
+                removed.append({"name": path})
+        return removed
+
+    def _transfer(self, from_path, to_path, keep_source):
+        source = self._resolve(from_path)
+        target = self._resolve(to_path)
+        if not os.path.isfile(source):
+            raise StorageError(f"Object not found: {from_path}", status=404)
+        if os.path.exists(target):
+            raise StorageError("The resource already exists", status=409)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if keep_source:
+            shutil.copyfile(source, target)
+        else:
+            os.replace(source, target)
+            self._prune(os.path.dirname(source))
+
+    async def list(self, prefix="", limit=LIST_PAGE_SIZE, offset=0):
+        await self.conditions.apply("list")
+        return await asyncio.to_thread(self._list, prefix, limit, offset)
+
+    async def download(self, path):
+        await self.conditions.apply("download")
+        return await asyncio.to_thread(self._read, path)
+
+    async def download_to(self, path, dest):
+        data = await self.download(path)
+        dest.write(data)
+        return len(data)
+
+    # Plain files keep neither the content encoding nor a Cache-Control value,
+    # so compressed uploads are written out decompressed
+    async def upload(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        await self.conditions.apply("upload")
+        await asyncio.to_thread(self._write, path, bytes(data), False, content_encoding)
+
+    async def update(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        await self.conditions.apply("update")
+        await asyncio.to_thread(self._write, path, bytes(data), True, content_encoding)
+
+    async def remove(self, paths):
+        await self.conditions.apply("remove")
+        return await asyncio.to_thread(self._remove, list(paths))
+
+    async def move(self, from_path, to_path):
+        await self.conditions.apply("move")
+        await asyncio.to_thread(self._transfer, from_path, to_path, False)
+
+    async def copy(self, from_path, to_path):
+        await self.conditions.apply("copy")
+        await asyncio.to_thread(self._transfer, from_path, to_path, True)
+
+    async def public_url(self, path):
+        return Path(self._resolve(path)).as_uri()
+
+    async def signed_urls(self, paths, expires_in):
+        # Local files need no signature; existing ones get their file URL
+        await self.conditions.apply("sign")
+        return {path: Path(self._resolve(path)).as_uri() for path in paths
+                if os.path.isfile(self._resolve(path))}
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, or None."""
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _translate_error(error):
+    """Turn storage3/httpx exceptions into StorageError (others pass through)."""
+    import httpx
+    from storage3.exceptions import StorageApiError
+
+    if isinstance(error, StorageApiError):
+        cause = error.__cause__ or error.__context__
+        response = getattr(cause, "response", None)
+        return StorageError(error.message, error.status, _retry_after(response))
+    if isinstance(error, httpx.HTTPStatusError):
+        return StorageError(str(error), error.response.status_code, _retry_after(error.response))
+    if isinstance(error, httpx.TransportError):
+        return StorageError(f"Network error: {error}", network=True)
+    return error
+
+
+async def stream_download(client, url, headers, dest, max_resumes=3):
+    """Stream `url` into the binary file `dest` and return the number of bytes written.
+
+    If the connection drops part way and the server accepts byte ranges, the
+    download resumes from the last written byte instead of starting over.
+    """
+    import httpx
+
+    written = 0
+    resumes = 0
+    accepts_ranges = False
+    request_headers = dict(headers)
+
+    while True:
+        try:
+            async with client.stream("GET", url, headers=request_headers) as response:
+                response.raise_for_status()
+                if written and response.status_code != 206:
+                    # Server ignored the range request, start again from scratch
+                    dest.seek(0)
+                    dest.truncate()
+                    written = 0
+                accepts_ranges = (
+                    response.status_code == 206
+                    or response.headers.get("accept-ranges", "").lower() == "bytes"
+                )
+                # Write chunks as they arrive so a dropped connection loses nothing
+                async for chunk in response.aiter_bytes():
+                    dest.write(chunk)
+                    written += len(chunk)
+            return written
+        except httpx.TransportError:
+            if not accepts_ranges or resumes >= max_resumes:
+                raise
+            resumes += 1
+            request_headers = {**headers, "Range": f"bytes={written}-"}
+
+
+class SupabaseStorageBackend:
+    """Backend for a Supabase Storage bucket, wrapping a storage3 async bucket proxy."""
+
+    def __init__(self, bucket, label=None):
+        self.bucket = bucket
+        self.label = label or bucket.id
+
+    async def _call(self, coro):
+        try:
+            return await coro
+        except Exception as e:
+            translated = _translate_error(e)
+            if translated is e:
+                raise
+            raise translated from e
+
+    @staticmethod
+    def _with_encoding(entry):
+        """`entry` with `contentEncoding` in its metadata, from the object's user metadata.
+
+        Listings without user metadata fall back to the stored content type,
+        which only compressed uploads set to an ENCODED_CONTENT_TYPES value.
+        """
+        metadata = entry.get("metadata")
+        if metadata is None:
+            return entry
+        if "user_metadata" in entry:
+            encoding = (entry["user_metadata"] or {}).get("contentEncoding")
+        else:
+            encoding = next((name for name, content_type in ENCODED_CONTENT_TYPES.items()
+                             if metadata.get("mimetype") == content_type), None)
+        return dict(entry, metadata=dict(metadata, contentEncoding=encoding))
+
+    async def list(self, prefix="", limit=LIST_PAGE_SIZE, offset=0):
+        options = {"limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+        entries = await self._call(self.bucket.list(prefix.strip("/") or None, options))
+        return [self._with_encoding(entry) for entry in entries]
+
+    async def download(self, path):
+        return await self._call(self.bucket.download(path))
+
+    async def download_to(self, path, dest):
+        url = self.bucket._base_url.joinpath("object", self.bucket.id, *path.split("/"))
+        return await self._call(stream_download(self.bucket._client, str(url), dict(self.bucket._headers), dest))
+
+    @staticmethod
+    def _file_options(content_type, content_encoding, cache_control):
+        options = {"content-type": content_type}
+        if cache_control:
+            # The server stores "max-age=" followed by the value sent
+            options["cache-control"] = cache_control[len("max-age="):]
+        if content_encoding:
+            # Storage serves objects without a Content-Encoding whatever the upload
+            # sent, so compressed bytes are labelled as what they are and the
+            # original type is kept in the object's user metadata
+            options["content-type"] = ENCODED_CONTENT_TYPES[content_encoding]
+            options["metadata"] = {"contentEncoding": content_encoding, "contentType": content_type}
+        return options
+
+    async def upload(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        options = self._file_options(content_type, content_encoding, cache_control)
+        await self._call(self.bucket.upload(path, bytes(data), options))
+
+    async def update(self, path, data, content_type=DEFAULT_CONTENT_TYPE, content_encoding=None,
+                     cache_control=None):
+        options = self._file_options(content_type, content_encoding, cache_control)
+        await self._call(self.bucket.update(path, bytes(data), options))
+
+    async def remove(self, paths):
+        return await self._call(self.bucket.remove(list(paths)))
+
+    async def move(self, from_path, to_path):
+        await self._call(self.bucket.move(from_path, to_path))
+
+    async def copy(self, from_path, to_path):
+        await self._call(self.bucket.copy(from_path, to_path))
+
+    async def public_url(self, path):
+        return await self.bucket.get_public_url(path)
+
+    async def signed_urls(self, paths, expires_in):
+        signed = await self._call(self.bucket.create_signed_urls(list(paths), int(expires_in)))
+        return {item["path"]: item["signedURL"] for item in signed if not item.get("error") and item.get("path")}
+
+
+async def open_backend(kind=None, bucket=None):
+    """Create the backend selected by `kind` (defaults to settings.STORAGE_BACKEND) for `bucket`.
+
+    Offline backends keep the default bucket where they always have; a local
+    bucket named otherwise lives next to it, in LOCAL_STORAGE_ROOT-<bucket>.
+    """
+    kind = kind or config.STORAGE_BACKEND
+    bucket = bucket or config.STORAGE_BUCKET
+    if kind == "supabase":
+        from .supabase_module import create_async_supabase_client, load_secrets
+
+        secrets = load_secrets()
+        client = await create_async_supabase_client(secrets.get("supabase_url"), secrets.get("firestore_key"))
+        return SupabaseStorageBackend(client.storage.from_(bucket))
+    if kind == "local":
+        root = config.LOCAL_STORAGE_ROOT
+        if bucket != config.STORAGE_BUCKET:
+            root = f"{root.rstrip('/')}-{bucket}"
+        return LocalFilesystemBackend(root, SimulatedConditions.from_settings())
+    if kind == "memory":
+        label = "memory" if bucket == config.STORAGE_BUCKET else f"memory:{bucket}"
+        return MemoryStorageBackend(label=label, conditions=SimulatedConditions.from_settings())
+    raise ValueError(f"Unknown storage backend: {kind!r}")
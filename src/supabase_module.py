@@ -1,6 +1,56 @@
 # Module for Supabase-related tasks
 # ...existing code...
+import importlib.util
+import json
+import os
+
+from . import config
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'secrets.json')
 
 def is_supabase_url(url):
     """Check if a URL is a valid Supabase URL (very basic check)."""
     return url.startswith("https://") and "supabase.co" in url
+
+def load_secrets(path=SECRETS_PATH):
+    """Load API credentials from config/secrets.json."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def http2_available():
+    """Return True if HTTP/2 can be negotiated (the optional h2 package is installed)."""
+    return importlib.util.find_spec("h2") is not None
+
+def create_http_client(asynchronous=False):
+    """Create the pooled keep-alive HTTP client shared by all storage calls.
+
+    With `asynchronous=True` an httpx.AsyncClient with the same pool settings is
+    returned; it must only be used from the event loop that runs storage I/O.
+    """
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=config.STORAGE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=config.STORAGE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=config.STORAGE_KEEPALIVE_EXPIRY,
+    )
+    transport_class = httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport
+    client_class = httpx.AsyncClient if asynchronous else httpx.Client
+    transport = transport_class(
+        http2=config.STORAGE_HTTP2 and http2_available(),
+        limits=limits,
+        retries=config.STORAGE_RETRIES,
+    )
+    timeout = httpx.Timeout(config.STORAGE_READ_TIMEOUT, connect=config.STORAGE_CONNECT_TIMEOUT)
+    return client_class(transport=transport, timeout=timeout, follow_redirects=True)
+
+async def create_async_supabase_client(url, key, http_client=None):
+    """Create a Supabase client whose sub-clients all reuse one pooled HTTP client.
+
+    Call it on the storage I/O loop; `http_client` must be an async client
+    (see create_http_client) owned by that loop.
+    """
+    from supabase import AsyncClientOptions, acreate_client
+
+    options = AsyncClientOptions(httpx_client=http_client or create_http_client(asynchronous=True))
+    return await acreate_client(url, key, options=options)
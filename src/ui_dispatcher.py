@@ -0,0 +1,141 @@
+# Module for batching UI updates coming from background work onto the Tk thread
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+# Target interval between drains, roughly one display frame
+FRAME_INTERVAL_MS = 16
+# Time a single drain may spend running callbacks before yielding to Tk input
+FRAME_BUDGET_MS = 8
+
+
+class IncrementalJob:
+    """A long UI job (e.g. inserting thousands of tree rows) spread across frames."""
+
+    __slots__ = ("items", "callback", "on_progress", "on_done", "processed", "cancelled")
+
+    def __init__(self, items, callback, on_progress=None, on_done=None):
+        self.items = iter(items)
+        self.callback = callback
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.processed = 0
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop processing; remaining items are dropped and on_done is not called."""
+        self.cancelled = True
+
+
+class UIDispatcher:
+    """Collects updates from worker threads and applies them in per-frame batches.
+
+    - `post` queues a callback; callbacks run in order.
+    - `coalesce` keeps only the latest callback per key (status text, progress),
+      so a burst of updates costs one repaint per frame.
+    - `run_incremental` feeds an iterable through a callback a slice at a time.
+
+    Each drain stops once its time budget is used so input events stay responsive;
+    leftover work continues on the next frame. A callback that raises is reported
+    through Tk's `report_callback_exception` and the rest of the work still runs.
+    """
+
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, clock=time.perf_counter):
+        self.budget = budget_ms / 1000.0
+        self.clock = clock
+        self._queue = deque()
+        self._coalesced = {}
+        self._lock = threading.Lock()
+        self._jobs = deque()
+        self._root = None
+
+    def post(self, callback, *args):
+        """Queue `callback(*args)` to run on the Tk thread (safe from any thread)."""
+        self._queue.append((callback, args))
+
+    def coalesce(self, key, callback, *args):
+        """Queue `callback(*args)`, replacing any not-yet-run update with the same key."""
+        with self._lock:
+            self._coalesced[key] = (callback, args)
+
+    def run_incremental(self, items, callback, on_progress=None, on_done=None):
+        """Call `callback(item)` for every item across as many frames as needed.
+
+        Must be called on the Tk thread. `on_progress(processed)` runs once per
+        frame slice and `on_done()` after the last item.
+        """
+        job = IncrementalJob(items, callback, on_progress, on_done)
+        self._jobs.append(job)
+        return job
+
+    def _run(self, callback, *args):
+        """Call `callback(*args)`, reporting instead of raising what it throws."""
+        try:
+            callback(*args)
+        except Exception:
+            if self._root is not None:
+                self._root.report_callback_exception(*sys.exc_info())
+            else:
+                traceback.print_exc()
+
+    @property
+    def pending(self):
+        return bool(self._queue or self._coalesced or self._jobs)
+
+    def tick(self):
+        """Drain queued work until the frame budget is spent; returns True if work remains."""
+        deadline = self.clock() + self.budget
+
+        while self._queue and self.clock() < deadline:
+            callback, args = self._queue.popleft()
+            self._run(callback, *args)
+
+        with self._lock:
+            coalesced, self._coalesced = self._coalesced, {}
+        for callback, args in coalesced.values():
+            self._run(callback, *args)
+
+        while self._jobs and self.clock() < deadline:
+            job = self._jobs[0]
+            if job.cancelled:
+                self._jobs.popleft()
+                continue
+            if self._run_job_slice(job, deadline):
+                self._jobs.popleft()
+                if job.on_done is not None and not job.cancelled:
+                    self._run(job.on_done)
+
+        return self.pending
+
+    def _run_job_slice(self, job, deadline):
+        """Advance `job` until the deadline; returns True once it is exhausted."""
+        finished = False
+        while self.clock() < deadline:
+            try:
+                item = next(job.items)
+            except StopIteration:
+                finished = True
+                break
+            self._run(job.callback, item)
+            job.processed += 1
+            if job.cancelled:
+                return True
+        if job.on_progress is not None and not job.cancelled:
+            self._run(job.on_progress, job.processed)
+        return finished
+
+    def attach(self, root, interval_ms=FRAME_INTERVAL_MS):
+        """Start draining on the event loop of `root`."""
+        self._root = root
+        self._interval_ms = interval_ms
+        self._on_frame()
+
+    def _on_frame(self):
+        backlog = True
+        try:
+            backlog = self.tick()
+        finally:
+            # With a backlog, come back as soon as Tk has handled pending input
+            self._root.after(1 if backlog else self._interval_ms, self._on_frame)
@@ -0,0 +1,144 @@
+# Module for workspaces: buckets of several projects open at once, each with its own state
+import os
+import re
+from urllib.parse import urlsplit
+
+from . import config
+from .compression import ContentCache
+from .file_store import FileStore
+from .references import ReferenceGraph
+
+# Project name used for the credentials at the top level of secrets.json
+DEFAULT_PROJECT = "default"
+
+
+def project_settings(secrets):
+    """{project: {"supabase_url", "firestore_key", "buckets"}} from the secrets file.
+
+    Projects are listed under "projects"; the single project of older files
+    (`supabase_url`/`firestore_key` at the top level) is called "default".
+    Projects without "buckets" open STORAGE_BUCKETS.
+    """
+    projects = {}
+    if secrets.get("supabase_url"):
+        projects[DEFAULT_PROJECT] = {
+            "supabase_url": secrets["supabase_url"],
+            "firestore_key": secrets.get("firestore_key"),
+        }
+    projects.update(secrets.get("projects") or {})
+    for settings in projects.values():
+        settings["buckets"] = list(settings.get("buckets") or config.STORAGE_BUCKETS)
+    return projects
+
+
+class Workspace:
+    """One bucket of one project: its backend (once opened) and everything cached about it.
+
+    The listing, folder state, content cache and reference graph stay with
+    the workspace while another one is shown, so switching back needs no new
+    listing.
+    """
+
+    def __init__(self, project, bucket, backend=None):
+        self.project = project
+        self.bucket = bucket
+        self.backend = backend
+        self.store = FileStore()
+        self.folder_states = {}
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{project}-{bucket}")
+        self.content_cache = ContentCache(os.path.join(config.CACHE_DIR, "content", slug))
+        self.references = ReferenceGraph(os.path.join(config.CACHE_DIR, "references", f"{slug}.json"))
+        self.signed_urls = None
+        # Whether the backend is open and `store` holds a listing, and the tree selection to restore
+        self.opened = False
+        self.listed = False
+        self.selection = ()
+
+    @property
+    def title(self):
+        return f"{self.project} / {self.bucket}"
+
+
+class Workspaces:
+    """The workspaces of this session and the connections they share.
+
+    Backends are opened on first use. Buckets on the same host share one
+    pooled HTTP client and one request governor, so switching buckets reuses
+    warm connections and rate limits are tracked per project.
+    """
+
+    def __init__(self, items, kind=None, projects=None):
+        self.items = list(items)
+        self.kind = kind or config.STORAGE_BACKEND
+        self.projects = projects or {}
+        # host -> shared httpx client / RequestGovernor; (host, key) -> Supabase client
+        self._http_clients = {}
+        self._governors = {}
+        self._clients = {}
+
+    @classmethod
+    def configured(cls, kind=None, secrets=None):
+        """Workspaces for every project and bucket of the configured backend."""
+        kind = kind or config.STORAGE_BACKEND
+        if kind != "supabase":
+            return cls([Workspace(kind, bucket) for bucket in config.STORAGE_BUCKETS], kind)
+        if secrets is None:
+            from .supabase_module import load_secrets
+            secrets = load_secrets()
+        projects = project_settings(secrets)
+        items = [Workspace(project, bucket) for project, settings in projects.items()
+                 for bucket in settings["buckets"]]
+        if not items:
+            raise ValueError("secrets.json lists no Supabase project")
+        return cls(items, kind, projects)
+
+    @classmethod
+    def single(cls, backend):
+        """One workspace around an already open backend (tests, benchmarks)."""
+        return cls([Workspace(DEFAULT_PROJECT, backend.label, backend)], kind="custom")
+
+    def _host(self, workspace):
+        if self.kind != "supabase":
+            return self.kind
+        return urlsplit(self.projects[workspace.project]["supabase_url"]).netloc
+
+    def governor(self, workspace):
+        from .governor import RequestGovernor
+        host = self._host(workspace)
+        if host not in self._governors:
+            self._governors[host] = RequestGovernor()
+        return self._governors[host]
+
+    async def open(self, workspace, metrics=None):
+        """The workspace's backend, timed and governed, opening it if needed (runs on the I/O loop)."""
+        from .cache_policy import CachePolicyBackend
+        from .governor import GovernedBackend
+        from .metrics import InstrumentedBackend
+        if workspace.opened:
+            return workspace.backend
+        backend = CachePolicyBackend(workspace.backend or await self._open_backend(workspace))
+        workspace.backend = GovernedBackend(InstrumentedBackend(backend, metrics), self.governor(workspace), metrics=metrics)
+        if config.SIGNED_URLS:
+            from .signed_urls import SignedUrlCache
+            workspace.signed_urls = SignedUrlCache(workspace.backend)
+        workspace.opened = True
+        return workspace.backend
+
+    async def _open_backend(self, workspace):
+        from .storage_backend import SupabaseStorageBackend, open_backend
+        if self.kind != "supabase":
+            return await open_backend(self.kind, workspace.bucket)
+        settings = self.projects[workspace.project]
+        host = self._host(workspace)
+        client_key = (host, settings.get("firestore_key"))
+        if client_key not in self._clients:
+            from .supabase_module import create_async_supabase_client, create_http_client
+            if host not in self._http_clients:
+                self._http_clients[host] = create_http_client(asynchronous=True)
+            self._clients[client_key] = await create_async_supabase_client(
+                settings["supabase_url"], settings.get("firestore_key"), self._http_clients[host]
+            )
+        bucket = self._clients[client_key].storage.from_(workspace.bucket)
+        # The default project keeps the plain bucket name, which caches and sync state are keyed by
+        label = None if workspace.project == DEFAULT_PROJECT else f"{workspace.project}:{workspace.bucket}"
+        return SupabaseStorageBackend(bucket, label)
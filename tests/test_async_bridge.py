@@ -0,0 +1,83 @@
+# Tests for async_bridge
+
+import asyncio
+import threading
+import time
+
+import pytest
+from src.async_bridge import AsyncBridge
+
+@pytest.fixture
+def bridge():
+    bridge = AsyncBridge()
+    yield bridge
+    bridge.close()
+
+def wait_for_callbacks(bridge, expected, timeout=5):
+    ran = 0
+    deadline = time.monotonic() + timeout
+    while ran < expected and time.monotonic() < deadline:
+        ran += bridge.pump()
+        time.sleep(0.005)
+    return ran
+
+def test_callbacks_run_on_pumping_thread(bridge):
+    results = []
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return threading.current_thread().name
+
+    bridge.submit(work(), on_success=lambda name: results.append((name, threading.current_thread())))
+    assert wait_for_callbacks(bridge, 1) == 1
+    loop_thread, callback_thread = results[0]
+    assert loop_thread == "storage-io"
+    assert callback_thread is threading.current_thread()
+
+def test_errors_are_delivered(bridge):
+    errors = []
+
+    async def fail():
+        raise ValueError("boom")
+
+    bridge.submit(fail(), on_success=lambda _: errors.append("unexpected"), on_error=errors.append)
+    wait_for_callbacks(bridge, 1)
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+
+def test_many_operations_share_one_thread(bridge):
+    threads = set()
+    done = []
+
+    async def work(i):
+        threads.add(threading.get_ident())
+        await asyncio.sleep(0.05)
+        return i
+
+    start = time.monotonic()
+    for i in range(200):
+        bridge.submit(work(i), on_success=done.append)
+    wait_for_callbacks(bridge, 200)
+    assert sorted(done) == list(range(200))
+    assert len(threads) == 1
+    # All sleeps overlap on the loop instead of running back to back
+    assert time.monotonic() - start < 2
+
+def test_run_blocks_for_result(bridge):
+    async def work():
+        return 42
+    assert bridge.run(work(), timeout=5) == 42
+
+def test_failing_callback_does_not_stop_the_others(bridge):
+    done = []
+
+    async def work(i):
+        return i
+
+    def fail(_):
+        raise RuntimeError("boom")
+
+    bridge.submit(work(0), on_success=fail)
+    wait_for_callbacks(bridge, 1)
+    bridge.submit(work(1), on_success=done.append)
+    wait_for_callbacks(bridge, 1)
+    assert done == [1]
@@ -0,0 +1,71 @@
+# Tests for the benchmark harness and stand-in storage server
+
+import asyncio
+import io
+import pytest
+from benchmarks.harness import TkCallCounter, compare, unrecorded
+from benchmarks.stand_in_server import StandInStorageServer
+from benchmarks.synthetic import synthetic_backend, synthetic_paths
+from src.storage_backend import StorageError, walk
+
+def test_synthetic_paths_are_deterministic():
+    assert synthetic_paths(50) == synthetic_paths(50)
+    assert len(set(synthetic_paths(500))) == 500
+
+def test_stand_in_server_round_trip():
+    with StandInStorageServer(synthetic_backend(30)) as server:
+        backend = server.create_backend()
+
+        async def scenario():
+            try:
+                names = [entry['name'] async for entry in walk(backend, page_size=7)]
+                await backend.upload("new/file.mdx", b"# hello", "text/markdown")
+                with pytest.raises(StorageError) as exists:
+                    await backend.upload("new/file.mdx", b"again")
+                await backend.update("new/file.mdx", b"# updated")
+                sink = io.BytesIO()
+                await backend.download_to("new/file.mdx", sink)
+                await backend.move("new/file.mdx", "new/moved.mdx")
+                with pytest.raises(StorageError) as missing:
+                    await backend.download("new/file.mdx")
+                await backend.remove(["new/moved.mdx"])
+                return names, exists.value, sink.getvalue(), missing.value
+            finally:
+                await backend.bucket._client.aclose()
+
+        names, exists, body, missing = asyncio.run(scenario())
+
+    assert names == sorted(synthetic_paths(30))
+    assert exists.already_exists
+    assert body == b"# updated"
+    assert missing.not_found
+    assert "new/moved.mdx" not in server.backend._objects
+
+def test_compare_flags_only_metrics_past_tolerance():
+    baseline = {"listing[10]": {"wall_s": 1.0, "requests": 4, "entries": 10}}
+    tolerances = {"wall_s": (0.5, 0.0), "requests": (0.0, 0)}
+    assert compare({"listing[10]": {"wall_s": 1.4, "requests": 4, "entries": 99}}, baseline, tolerances) == []
+    assert compare({"listing[10]": {"wall_s": 1.6, "requests": 5}}, baseline, tolerances) == [
+        ("listing[10]", "requests", 4, 5),
+        ("listing[10]", "wall_s", 1.0, 1.6),
+    ]
+    assert compare({"listing[10]": {"wall_s": 1.6}}, baseline, tolerances, scale=2.0) == []
+    assert compare({"render[10]": {"wall_s": 9.0}}, baseline, tolerances) == []
+    # ...but a benchmark without a baseline is reported as such
+    assert unrecorded({"render[10]": {"wall_s": 9.0}, "listing[10]": {}}, baseline) == ["render[10]"]
+
+def test_tk_call_counter_delegates():
+    class FakeTkApp:
+        def call(self, *args):
+            return args
+        def getboolean(self, value):
+            return bool(value)
+
+    class FakeRoot:
+        tk = FakeTkApp()
+
+    root = FakeRoot()
+    counter = TkCallCounter.install(root)
+    assert root.tk.call("wm", "title", ".") == ("wm", "title", ".")
+    assert root.tk.getboolean(1) is True
+    assert counter.calls == 1
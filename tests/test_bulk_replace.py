@@ -0,0 +1,71 @@
+# Tests for bulk_replace
+
+import asyncio
+import pytest
+from src.bulk_replace import ReplaceJournal, Replacement, apply_changes, preview, rollback
+from src.file_store import FileEntry
+from src.storage_backend import MemoryStorageBackend
+
+def entries(backend):
+    return [FileEntry(path, size=len(obj.data), etag=obj.etag) for path, obj in sorted(backend._objects.items())]
+
+def test_literal_and_regex_replacement():
+    assert Replacement("a.b", r"\1").apply("a.b axb") == (r"\1 axb", 1)
+    assert Replacement(r"(\w+)@old\.dev", r"\1@new.dev", regex=True).apply("me@old.dev") == ("me@new.dev", 1)
+    assert Replacement("hello", "bye", ignore_case=True).apply("Hello HELLO") == ("bye bye", 2)
+    with pytest.raises(ValueError):
+        Replacement("(", "x", regex=True)
+    with pytest.raises(ValueError):
+        Replacement("", "x")
+
+def test_preview_diffs_text_files_and_skips_the_rest():
+    backend = MemoryStorageBackend({
+        "posts/a.mdx": b"old link\nold again\n",
+        "posts/b.mdx": b"nothing here\n",
+        "images/c.png": b"old",
+    })
+    plan = asyncio.run(preview(backend, entries(backend), Replacement("old", "new")))
+    assert [(c.path, c.count, c.after) for c in plan.changes] == [("posts/a.mdx", 2, b"new link\nnew again\n")]
+    assert plan.unchanged == 1
+    assert plan.skipped == [("images/c.png", "not a text file")]
+    assert "+new link" in plan.changes[0].diff()
+    assert backend._objects["posts/a.mdx"].data == b"old link\nold again\n"
+
+def test_apply_skips_files_changed_since_the_preview_and_rolls_back(tmp_path):
+    backend = MemoryStorageBackend({"posts/a.mdx": b"old a", "posts/b.mdx": b"old b", "posts/c.mdx": b"old c"})
+    plan = asyncio.run(preview(backend, entries(backend), Replacement("old", "new")))
+    asyncio.run(backend.update("posts/b.mdx", b"old b, edited", "text/plain"))
+    journal = ReplaceJournal.create(backend.label, plan.replacement.describe(), root=str(tmp_path))
+    report = asyncio.run(apply_changes(backend, plan, journal))
+    assert report.applied == 2
+    assert [path for path, _ in report.conflicts] == ["posts/b.mdx"]
+    assert backend._objects["posts/a.mdx"].data == b"new a"
+    assert backend._objects["posts/b.mdx"].data == b"old b, edited"
+
+    # Edited after the replacement: left as it is by the rollback
+    asyncio.run(backend.update("posts/c.mdx", b"new c, edited", "text/plain"))
+    journal = ReplaceJournal.history(backend.label, root=str(tmp_path))[0]
+    assert journal.applied() == ["posts/a.mdx", "posts/c.mdx"]
+    report = asyncio.run(rollback(backend, journal))
+    assert report.applied == 1
+    assert [path for path, _ in report.conflicts] == ["posts/c.mdx"]
+    assert backend._objects["posts/a.mdx"].data == b"old a"
+    assert journal.applied() == ["posts/c.mdx"]
+
+def test_files_whose_original_cannot_be_journaled_are_not_written(tmp_path, monkeypatch):
+    backend = MemoryStorageBackend({"posts/a.mdx": b"old a", "posts/b.mdx": b"old b"})
+    plan = asyncio.run(preview(backend, entries(backend), Replacement("old", "new")))
+    journal = ReplaceJournal.create(backend.label, plan.replacement.describe(), root=str(tmp_path))
+    record = journal.record
+
+    def full_disk(path, before, after):
+        if path == "posts/b.mdx":
+            raise OSError(28, "No space left on device")
+        record(path, before, after)
+    monkeypatch.setattr(journal, "record", full_disk)
+    report = asyncio.run(apply_changes(backend, plan, journal))
+    assert report.applied == 1
+    assert [path for path, _ in report.failed] == ["posts/b.mdx"]
+    assert backend._objects["posts/a.mdx"].data == b"new a"
+    assert backend._objects["posts/b.mdx"].data == b"old b"
+    assert journal.applied() == ["posts/a.mdx"]
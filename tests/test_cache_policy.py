@@ -0,0 +1,63 @@
+# Tests for cache_policy
+
+import asyncio
+import pytest
+from src.cache_policy import CachePolicy, CachePolicyBackend, reapply
+from src.compression import encode
+from src.storage_backend import LocalFilesystemBackend, MemoryStorageBackend
+
+POLICY = CachePolicy([("assets/", "max-age=31536000,Immutable"), ("posts/", "max-age=300"),
+                      ("posts/drafts/", "max-age=0")], default="max-age=3600")
+
+async def listed(backend, folder):
+    return {e["name"]: e["metadata"]["cacheControl"] for e in await backend.list(folder)}
+
+def test_longest_prefix_wins_and_values_are_checked():
+    assert POLICY.for_path("assets/app.3f9a.js") == "max-age=31536000, immutable"
+    assert POLICY.for_path("posts/drafts/a.mdx") == "max-age=0"
+    assert POLICY.for_path("posts/a.mdx") == "max-age=300"
+    assert POLICY.for_path("about.mdx") == "max-age=3600"
+    with pytest.raises(ValueError):
+        CachePolicy([("posts/", "no-cache")])
+
+def test_uploads_and_updates_get_the_policy():
+    raw = MemoryStorageBackend()
+    backend = CachePolicyBackend(raw, POLICY)
+
+    async def scenario():
+        await backend.upload("posts/a.mdx", b"a", "text/markdown")
+        await backend.upload("posts/b.mdx", b"b", "text/markdown", cache_control="max-age=60")
+        await backend.update("posts/b.mdx", b"b2", "text/markdown")
+        await backend.upload("assets/app.js", b"x", "application/javascript")
+        return await listed(raw, "posts"), await listed(raw, "assets")
+
+    posts, assets = asyncio.run(scenario())
+    assert posts == {"a.mdx": "max-age=300", "b.mdx": "max-age=300"}
+    assert assets == {"app.js": "max-age=31536000, immutable"}
+
+def test_reapply_reuploads_only_objects_that_differ():
+    raw = MemoryStorageBackend({"posts/a.mdx": b"a", "about.mdx": b"about"})
+    article = b"# Post\n" * 200
+
+    async def scenario():
+        payload, encoding = await encode(article, "text/markdown")
+        await raw.upload("posts/b.mdx", payload, "text/markdown", content_encoding=encoding)
+        etag = raw._objects["posts/b.mdx"].etag
+        preview = await reapply(raw, POLICY, dry_run=True)
+        assert await listed(raw, "posts") == {"a.mdx": "max-age=3600", "b.mdx": "max-age=3600"}
+        report = await reapply(raw, POLICY, concurrency=1)
+        assert raw._objects["posts/b.mdx"].etag == etag
+        assert (await reapply(raw, POLICY)).changed == []
+        return preview, report
+
+    preview, report = asyncio.run(scenario())
+    assert [path for path, _, _ in preview.changed] == ["posts/a.mdx", "posts/b.mdx"]
+    assert report.checked == 3
+    assert report.changed == [("posts/a.mdx", "max-age=3600", "max-age=300"),
+                              ("posts/b.mdx", "max-age=3600", "max-age=300")]
+
+def test_reapply_skips_backends_without_cache_control(tmp_path):
+    backend = LocalFilesystemBackend(str(tmp_path))
+    asyncio.run(backend.upload("posts/a.mdx", b"a", "text/markdown", cache_control="max-age=300"))
+    report = asyncio.run(reapply(backend, POLICY))
+    assert (report.checked, report.changed, report.unsupported) == (1, [], 1)
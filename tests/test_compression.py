@@ -0,0 +1,105 @@
+# Tests for compression
+
+import asyncio
+import gzip
+import os
+
+import pytest
+from src import config
+from src.bulk_upload import upload_files
+from src.compression import (
+    ContentCache, compress, decode, decompress, decompress_file, encode, encoding_of,
+)
+from src.file_store import FileEntry
+from src.storage_backend import LocalFilesystemBackend, MemoryStorageBackend
+
+TEXT = b"# Heading\n\n" + b"Some markdown that repeats. " * 200
+
+def test_compress_round_trip_is_deterministic():
+    payload = compress(TEXT, "gzip")
+    assert payload == compress(TEXT, "gzip")
+    assert encoding_of(payload) == "gzip"
+    assert decompress(payload, "gzip") == TEXT
+    # Only the listed encoding counts: compressed files uploaded as they are stay compressed
+    assert decompress(payload, None) == payload
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    payload = compress(TEXT, "zstd")
+    assert encoding_of(payload) == "zstd"
+    assert decompress(payload, "zstd") == TEXT
+
+def test_encode_skips_small_and_binary_content(monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_COMPRESSION", "gzip")
+    payload, encoding = asyncio.run(encode(TEXT, "text/markdown"))
+    assert encoding == "gzip" and len(payload) < len(TEXT)
+    assert asyncio.run(decode(payload, encoding)) == TEXT
+    assert asyncio.run(encode(b"tiny", "text/markdown")) == (b"tiny", None)
+    assert asyncio.run(encode(TEXT, "image/png")) == (TEXT, None)
+    monkeypatch.setattr(config, "UPLOAD_COMPRESSION", None)
+    assert asyncio.run(encode(TEXT, "text/markdown")) == (TEXT, None)
+
+def test_decompress_file_in_place(tmp_path):
+    path = tmp_path / "big.mdx"
+    path.write_bytes(gzip.compress(TEXT))
+    assert decompress_file(str(path), "gzip", chunk_size=100)
+    assert path.read_bytes() == TEXT
+    assert not decompress_file(str(path), None)
+
+def test_content_cache_is_keyed_by_etag_and_bounded(tmp_path):
+    cache = ContentCache(str(tmp_path / "content"), max_bytes=10_000, encoding="gzip")
+    cache.put("bucket", "posts/a.mdx", '"e1"', TEXT)
+    assert cache.get("bucket", "posts/a.mdx", '"e1"') == TEXT
+    assert cache.get("bucket", "posts/a.mdx", '"e2"') is None
+    assert cache.get("bucket", "posts/a.mdx", None) is None
+    stored = sum(p.stat().st_size for p in (tmp_path / "content").rglob("*") if p.is_file())
+    assert stored < len(TEXT)
+
+    noise = os.urandom(12_000)  # incompressible, bigger than the limit
+    cache.put("bucket", "posts/b.bin", '"e3"', noise)
+    assert cache.get("bucket", "posts/a.mdx", '"e1"') is None
+
+def test_content_cache_walks_the_directory_only_to_trim(tmp_path, monkeypatch):
+    import src.compression as compression
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(compression.os, "walk", lambda *args: walks.append(args) or real_walk(*args))
+    cache = ContentCache(str(tmp_path / "content"), max_bytes=20_000, encoding="gzip")
+    for i in range(50):
+        cache.put("bucket", f"posts/{i}.mdx", '"e"', os.urandom(100))
+    assert len(walks) == 1  # the starting total
+    cache.put("bucket", "posts/big.bin", '"e"', os.urandom(15_000))
+    stored = sum(p.stat().st_size for p in (tmp_path / "content").rglob("*") if p.is_file())
+    assert stored <= 18_000
+    assert cache.budget._total == stored
+
+def test_compressed_upload_is_skipped_when_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_COMPRESSION", "gzip")
+    (tmp_path / "a.mdx").write_bytes(TEXT)
+    pairs = [(str(tmp_path / "a.mdx"), "posts/a.mdx")]
+    backend = MemoryStorageBackend()
+    async def scenario():
+        first = await upload_files(backend, pairs, {})
+        stored = await backend.download("posts/a.mdx")
+        digest = first.entries[0][2]
+        second = await upload_files(backend, pairs, {"posts/a.mdx": digest})
+        return first, second, stored
+    first, second, stored = asyncio.run(scenario())
+    assert first.bytes_sent == len(stored) < len(TEXT)
+    assert decompress(stored, "gzip") == TEXT
+    assert (second.uploaded, second.skipped, second.bytes_avoided) == (0, 1, len(stored))
+
+def test_compressed_objects_are_stored_as_what_they_are(tmp_path):
+    payload = compress(TEXT, "gzip")
+    memory = MemoryStorageBackend({"icons/logo.svgz": payload})
+    local = LocalFilesystemBackend(str(tmp_path))
+    async def scenario():
+        for backend in (memory, local):
+            await backend.upload("posts/a.mdx", payload, "text/markdown", content_encoding="gzip")
+        return {e["name"]: e["metadata"] for e in await memory.list("posts") + await memory.list("icons")}
+    listed = asyncio.run(scenario())
+    assert (listed["a.mdx"]["mimetype"], listed["a.mdx"]["contentEncoding"]) == ("application/gzip", "gzip")
+    assert listed["logo.svgz"]["contentEncoding"] is None
+    assert FileEntry.from_listing(dict(name="posts/a.mdx", id="1", metadata=listed["a.mdx"])).encoding == "gzip"
+    # Plain files cannot say how they are encoded, so they hold the original bytes
+    assert (tmp_path / "posts" / "a.mdx").read_bytes() == TEXT
@@ -0,0 +1,61 @@
+# Tests for content_hash and bulk_upload
+
+import asyncio
+import hashlib
+
+from src.bulk_upload import local_files, upload_files
+from src.content_hash import HashManifest, etag_digest, hash_bytes, hash_file, known_digest
+from src.file_store import FileEntry
+from src.storage_backend import MemoryStorageBackend
+
+def test_hash_file_matches_hash_bytes(tmp_path):
+    data = b"x" * 10000
+    path = tmp_path / "a.bin"
+    path.write_bytes(data)
+    assert hash_file(str(path), chunk_size=1000) == hash_bytes(data) == hashlib.md5(data).hexdigest()
+
+def test_etag_digest():
+    md5 = hash_bytes(b"abc")
+    assert etag_digest(f'"{md5}"') == md5
+    assert etag_digest(md5.upper()) == md5
+    assert etag_digest(f'"{md5}-3"') is None
+    assert etag_digest("12-1700000000") is None
+    assert etag_digest(None) is None
+
+def test_manifest_only_trusts_matching_etag(tmp_path):
+    path = str(tmp_path / "cache" / "hashes.json")
+    manifest = HashManifest(path)
+    manifest.record("local", "posts/a.mdx", "abc", "3-100")
+    manifest.save()
+    reloaded = HashManifest(path)
+    assert reloaded.lookup("local", "posts/a.mdx", "3-100") == "abc"
+    assert reloaded.lookup("local", "posts/a.mdx", "3-200") is None
+    assert reloaded.lookup("other", "posts/a.mdx", "3-100") is None
+    entry = FileEntry("posts/a.mdx", size=3, etag="3-100")
+    assert known_digest(entry, reloaded, "local") == "abc"
+    assert known_digest(FileEntry("posts", is_folder=True), reloaded, "local") is None
+
+def test_upload_files_skips_unchanged(tmp_path):
+    (tmp_path / "src" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "same.mdx").write_bytes(b"same")
+    (tmp_path / "src" / "changed.mdx").write_bytes(b"new")
+    (tmp_path / "src" / "sub" / "fresh.mdx").write_bytes(b"fresh")
+    pairs = local_files(str(tmp_path / "src"), "posts/")
+    assert [remote for _, remote in pairs] == ["posts/changed.mdx", "posts/same.mdx", "posts/sub/fresh.mdx"]
+
+    backend = MemoryStorageBackend()
+    async def scenario():
+        await backend.upload("posts/same.mdx", b"same")
+        await backend.upload("posts/changed.mdx", b"old")
+        known = {"posts/same.mdx": hash_bytes(b"same"), "posts/changed.mdx": hash_bytes(b"old")}
+        progress = []
+        report = await upload_files(backend, pairs, known, concurrency=2,
+                                    on_progress=lambda done, total: progress.append((done, total)))
+        return report, progress, await backend.download("posts/changed.mdx")
+    report, progress, changed = asyncio.run(scenario())
+    assert (report.uploaded, report.skipped, report.failed) == (2, 1, [])
+    assert report.bytes_sent == len(b"new") + len(b"fresh")
+    assert report.bytes_avoided == len(b"same")
+    assert sorted(path for path, *_ in report.entries) == ["posts/changed.mdx", "posts/sub/fresh.mdx"]
+    assert progress[-1] == (3, 3)
+    assert changed == b"new"
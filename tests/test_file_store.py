@@ -0,0 +1,85 @@
+# Tests for file_store
+
+from src.file_store import FileEntry, FileStore, parse_timestamp
+
+LISTING = [
+    {'name': 'posts', 'id': None, 'metadata': None},
+    {'name': 'posts/b.mdx', 'id': '1', 'updated_at': '2024-06-18T12:00:00Z',
+     'metadata': {'size': 20, 'mimetype': 'text/markdown', 'eTag': '"e1"'}, 'public_url': 'https://x/b'},
+    {'name': 'posts/a.mdx', 'id': '2', 'updated_at': '2024-06-19T12:00:00Z', 'metadata': {'size': 10}},
+    {'name': 'posts/drafts/.emptyFolderPlaceholder', 'id': '3', 'metadata': {'size': 0}},
+    {'name': 'guides/deep/c.md', 'id': '4', 'metadata': None},
+    {'name': 'root.md', 'id': '5', 'metadata': {'size': 1}},
+]
+
+def test_parse_timestamp():
+    assert parse_timestamp('1970-01-01T00:01:00Z') == 60.0
+    assert parse_timestamp('') is None
+    assert parse_timestamp('notadate') is None
+
+def test_entry_from_listing_keeps_raw_metadata():
+    entry = FileEntry.from_listing(LISTING[1])
+    assert (entry.name, entry.parent, entry.size) == ('b.mdx', 'posts', 20)
+    assert entry.updated == parse_timestamp('2024-06-18T12:00:00Z')
+    assert (entry.etag, entry.mimetype, entry.public_url) == ('"e1"', 'text/markdown', 'https://x/b')
+    assert FileEntry.from_listing(LISTING[0]).is_folder
+
+def test_load_builds_folders_and_skips_placeholders():
+    store = FileStore().load(LISTING)
+    assert store.is_folder('guides') and store.is_folder('guides/deep')
+    assert 'posts/drafts' in store
+    assert 'posts/drafts/.emptyFolderPlaceholder' not in store
+    assert store.children('') == ['guides', 'posts', 'root.md']
+    assert store.children('posts') == ['posts/drafts', 'posts/a.mdx', 'posts/b.mdx']
+    assert [e.path for e in store.walk('posts')] == ['posts/drafts', 'posts/a.mdx', 'posts/b.mdx']
+    assert store.folders() == ['guides', 'posts', 'guides/deep', 'posts/drafts']
+    assert list(store.ancestors('guides/deep/c.md')) == ['guides/deep', 'guides']
+
+def test_remove_and_rename():
+    store = FileStore().load(LISTING)
+    renamed = store.rename('posts/b.mdx', 'posts/z.mdx', public_url='https://x/z')
+    assert renamed.size == 20 and renamed.public_url == 'https://x/z'
+    assert store.children('posts')[-1] == 'posts/z.mdx'
+    assert store.remove('guides').path == 'guides'
+    assert 'guides/deep/c.md' not in store
+    assert store.remove('missing') is None
+    assert len(store) == 5
+
+def test_folder_totals_follow_changes():
+    store = FileStore().load(LISTING)
+    posts = store.get('posts')
+    assert posts.size == 30
+    assert posts.updated == parse_timestamp('2024-06-19T12:00:00Z')
+    store.upsert(FileEntry('posts/drafts/new.mdx', size=5, updated=posts.updated + 60))
+    assert (store.get('posts/drafts').size, posts.size) == (5, 35)
+    assert posts.updated == store.get('posts/drafts/new.mdx').updated
+    # Replacing a file counts only its new size
+    store.upsert(FileEntry('posts/drafts/new.mdx', size=7, updated=posts.updated))
+    assert posts.size == 37
+    store.remove('posts/drafts')
+    assert posts.size == 30
+    assert posts.updated == parse_timestamp('2024-06-19T12:00:00Z')
+    store.remove('posts/a.mdx')
+    assert posts.updated == parse_timestamp('2024-06-18T12:00:00Z')
+
+def test_sorting_keeps_folders_first_and_updates_incrementally():
+    store = FileStore().load(LISTING)
+    store.set_sort('size', reverse=True)
+    assert store.children('posts') == ['posts/drafts', 'posts/b.mdx', 'posts/a.mdx']
+    assert store.children('') == ['posts', 'guides', 'root.md']
+    store.upsert(FileEntry('guides/big.md', size=100))
+    assert store.children('') == ['guides', 'posts', 'root.md']
+    store.upsert(FileEntry('posts/c.mdx', size=15))
+    assert store.children('posts') == ['posts/drafts', 'posts/b.mdx', 'posts/c.mdx', 'posts/a.mdx']
+    store.set_sort('modified')
+    assert store.children('posts')[1:] == ['posts/c.mdx', 'posts/b.mdx', 'posts/a.mdx']
+
+def test_take_changes_reports_rows_to_redraw():
+    store = FileStore().load(LISTING)
+    assert store.take_changes() == (set(), set())
+    store.upsert(FileEntry('posts/new/x.mdx', size=1))
+    touched, removed = store.take_changes()
+    assert touched == {'posts/new/x.mdx', 'posts/new', 'posts'}
+    store.remove('guides')
+    touched, removed = store.take_changes()
+    assert removed == {'guides', 'guides/deep', 'guides/deep/c.md'}
@@ -38,3 +38,14 @@ def test_format_date(manager):
     # Fallback
     assert manager.format_date('notadate') == 'notadate'
     assert manager.format_date('') == ''
+
+def test_listing_lands_in_the_workspace_it_was_requested_for(manager, tmp_path, monkeypatch):
+    from src import config
+    from src.workspace import Workspace
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+    old, shown = Workspace("memory", "mdx-files"), Workspace("memory", "drafts")
+    manager.workspace = shown
+    manager.show_store = lambda status: pytest.fail("a stale listing must not be drawn")
+    manager.display_files([{"name": "posts/a.mdx", "id": "1", "metadata": {"size": 1}}], old)
+    assert "posts/a.mdx" in old.store and old.listed
+    assert len(shown.store) == 0 and not shown.listed
@@ -0,0 +1,84 @@
+# Tests for folder_sync
+
+import asyncio
+import os
+
+import pytest
+from src.folder_sync import SyncState, apply_plan, build_plan
+from src.storage_backend import LocalFilesystemBackend, MemoryStorageBackend
+
+@pytest.fixture(params=["memory", "local"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStorageBackend()
+    return LocalFilesystemBackend(str(tmp_path / "bucket"))
+
+@pytest.fixture
+def folder(tmp_path):
+    path = tmp_path / "articles"
+    path.mkdir()
+    return path
+
+def sync(backend, folder, tmp_path, conflicts="skip", dry_run=False):
+    state = SyncState(str(folder), backend.label, "posts", path=str(tmp_path / "state.json"))
+    async def scenario():
+        plan = await build_plan(backend, str(folder), "posts", state, conflicts)
+        if not dry_run:
+            await apply_plan(backend, plan, str(folder), "posts", state, concurrency=2)
+        return plan
+    return asyncio.run(scenario())
+
+def test_first_sync_then_nothing_to_do(backend, folder, tmp_path):
+    (folder / "a.mdx").write_bytes(b"a")
+    (folder / ".git").mkdir()
+    (folder / ".git" / "HEAD").write_bytes(b"ref")
+    asyncio.run(backend.upload("posts/sub/c.mdx", b"c"))
+    asyncio.run(backend.upload("posts/same.mdx", b"same"))
+    (folder / "same.mdx").write_bytes(b"same")
+
+    dry = sync(backend, folder, tmp_path, dry_run=True)
+    assert (dry.uploads, dry.downloads, dry.agreed) == (["a.mdx"], ["sub/c.mdx"], ["same.mdx"])
+    assert not os.path.exists(folder / "sub")
+
+    sync(backend, folder, tmp_path)
+    assert (folder / "sub" / "c.mdx").read_bytes() == b"c"
+    assert asyncio.run(backend.download("posts/a.mdx")) == b"a"
+    assert len(sync(backend, folder, tmp_path)) == 0
+
+def test_changes_deletes_and_moves(backend, folder, tmp_path):
+    for name in ("a.mdx", "b.mdx", "c.mdx"):
+        (folder / name).write_bytes(name.encode())
+    sync(backend, folder, tmp_path)
+
+    (folder / "a.mdx").write_bytes(b"a2")
+    os.remove(folder / "b.mdx")
+    os.rename(folder / "c.mdx", folder / "moved.mdx")
+    asyncio.run(backend.upload("posts/new.mdx", b"new"))
+    plan = sync(backend, folder, tmp_path)
+    assert plan.uploads == ["a.mdx"]
+    assert plan.delete_remote == ["b.mdx"]
+    assert plan.move_remote == [("c.mdx", "moved.mdx")]
+    assert plan.downloads == ["new.mdx"]
+
+    names = sorted(item["name"] for item in asyncio.run(backend.list("posts")))
+    assert names == ["a.mdx", "moved.mdx", "new.mdx"]
+    assert asyncio.run(backend.download("posts/a.mdx")) == b"a2"
+    assert len(sync(backend, folder, tmp_path)) == 0
+
+    asyncio.run(backend.remove(["posts/new.mdx"]))
+    assert sync(backend, folder, tmp_path).delete_local == ["new.mdx"]
+    assert not (folder / "new.mdx").exists()
+
+def test_conflicts_are_reported_or_resolved(backend, folder, tmp_path):
+    (folder / "a.mdx").write_bytes(b"a")
+    sync(backend, folder, tmp_path)
+    (folder / "a.mdx").write_bytes(b"local edit")
+    asyncio.run(backend.update("posts/a.mdx", b"remote edit"))
+
+    plan = sync(backend, folder, tmp_path)
+    assert plan.conflicts == [("a.mdx", "changed on both sides")]
+    assert asyncio.run(backend.download("posts/a.mdx")) == b"remote edit"
+
+    assert sync(backend, folder, tmp_path, conflicts="remote").downloads == ["a.mdx"]
+    assert (folder / "a.mdx").read_bytes() == b"remote edit"
+    assert len(sync(backend, folder, tmp_path)) == 0
@@ -0,0 +1,134 @@
+# Tests for the request governor
+
+import asyncio
+import io
+import pytest
+from src import config
+from src.governor import GovernedBackend, RequestGovernor
+from src.metrics import Metrics
+from src.storage_backend import MemoryStorageBackend, StorageError
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_RETRY_BASE_DELAY", 0.0)
+
+class FlakyBackend(MemoryStorageBackend):
+    """Fails the first `failures` calls of each operation with `error`."""
+
+    def __init__(self, failures, error):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+        self.calls = {}
+        self.active = 0
+        self.peak = 0
+
+    async def _flaky(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.calls[operation] <= self.failures:
+            raise self.error
+
+    async def upload(self, path, data, *args, **kwargs):
+        await self._flaky("upload")
+        return await super().upload(path, data, *args, **kwargs)
+
+    async def update(self, path, data, *args, **kwargs):
+        await self._flaky("update")
+        return await super().update(path, data, *args, **kwargs)
+
+    async def download(self, path):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.001)
+            await self._flaky("download")
+            return await super().download(path)
+        finally:
+            self.active -= 1
+
+    async def download_to(self, path, dest):
+        dest.write(b"partial")
+        await self._flaky("download_to")
+        return await super().download_to(path, dest)
+
+def governed(backend, **kwargs):
+    return GovernedBackend(backend, RequestGovernor(**kwargs), metrics=Metrics())
+
+def test_throttled_call_is_retried_after_retry_after():
+    backend = FlakyBackend(2, StorageError("Too many requests", status=429, retry_after=0.01))
+    storage = governed(backend, initial=8)
+    asyncio.run(storage.upload("posts/a.mdx", b"hello"))
+    assert backend.calls["upload"] == 3
+    state = storage.governor.snapshot()
+    assert state["throttled"] == 2 and state["retries"] == 2
+    assert state["limit"] == 2
+    assert state["in_flight"] == 0
+    assert storage.metrics.snapshot()["storage.retry.upload"]["count"] == 2
+
+def test_server_errors_are_only_retried_for_idempotent_calls():
+    error = StorageError("Service unavailable", status=503)
+    backend = FlakyBackend(1, error)
+    storage = governed(backend)
+    with pytest.raises(StorageError):
+        asyncio.run(storage.upload("posts/a.mdx", b"hello"))
+    assert backend.calls["upload"] == 1
+    asyncio.run(backend.upload("posts/a.mdx", b"hello"))
+    asyncio.run(storage.update("posts/a.mdx", b"changed"))
+    assert backend.calls["update"] == 2
+
+def test_unexpected_errors_cut_the_limit_without_retrying():
+    backend = FlakyBackend(1, RuntimeError("decoder failed"))
+    asyncio.run(MemoryStorageBackend.upload(backend, "posts/a.mdx", b"hello"))
+    storage = governed(backend, initial=8)
+    with pytest.raises(RuntimeError):
+        asyncio.run(storage.download("posts/a.mdx"))
+    state = storage.governor.snapshot()
+    assert backend.calls["download"] == 1
+    assert state["limit"] == 4 and state["in_flight"] == 0
+
+def test_retries_give_up_and_raise():
+    backend = FlakyBackend(10, StorageError("Network error: reset", network=True))
+    storage = GovernedBackend(backend, RequestGovernor(), retries=2, metrics=Metrics())
+    with pytest.raises(StorageError):
+        asyncio.run(storage.download("posts/a.mdx"))
+    assert backend.calls["download"] == 3
+
+def test_failed_download_to_is_rewound_before_retrying():
+    backend = FlakyBackend(0, StorageError("Gateway timeout", status=504))
+    asyncio.run(backend.upload("posts/a.mdx", b"content"))
+    backend.failures = 1
+    storage = governed(backend)
+    dest = io.BytesIO(b"head:")
+    dest.seek(0, io.SEEK_END)
+    assert asyncio.run(storage.download_to("posts/a.mdx", dest)) == 7
+    assert dest.getvalue() == b"head:partialcontent"
+
+def test_limit_grows_under_load_and_bounds_concurrency():
+    backend = FlakyBackend(0, None)
+    asyncio.run(backend.upload("posts/a.mdx", b"x"))
+    storage = governed(backend, initial=2, maximum=6)
+
+    async def run():
+        await asyncio.gather(*(storage.download("posts/a.mdx") for _ in range(200)))
+
+    asyncio.run(run())
+    assert storage.governor.snapshot()["limit"] == 6
+    assert backend.peak <= 6
+
+def test_one_burst_of_failures_cuts_the_limit_once():
+    governor = RequestGovernor(initial=16, maximum=16)
+
+    async def run():
+        tickets = [await governor.acquire() for _ in range(8)]
+        for ticket in tickets:
+            await governor.release(ticket, "list", failed=True)
+
+    asyncio.run(run())
+    assert governor.snapshot()["limit"] == 8
+
+def test_retry_delay_honours_retry_after_and_caps_backoff(monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(config, "STORAGE_RETRY_MAX_DELAY", 4.0)
+    governor = RequestGovernor()
+    assert governor.retry_delay(1, retry_after=30.0) == 30.0
+    assert all(0 <= governor.retry_delay(10) <= 4.0 for _ in range(50))
@@ -0,0 +1,72 @@
+# Tests for image_pipeline
+
+import asyncio
+import io
+
+import pytest
+from src import config
+from src.image_pipeline import (
+    VariantCache, detect_content_type, is_variant, make_variants, publish_variants, variant_path, variants_of,
+)
+from src.storage_backend import MemoryStorageBackend
+
+def png_bytes(width, height):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_detect_content_type():
+    assert detect_content_type(b"\x89PNG\r\n\x1a\n....", "posts/hero.mdx") == "image/png"
+    assert detect_content_type(b"\xff\xd8\xff\xe0", "hero") == "image/jpeg"
+    assert detect_content_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ", "a.bin") == "image/webp"
+    assert detect_content_type(b"# Title", "posts/a.mdx") == "text/markdown"
+
+def test_variant_names():
+    assert variant_path("posts/hero.png", 480) == "posts/hero.w480.webp"
+    assert is_variant("posts/hero.w480.webp") and not is_variant("posts/hero.webp")
+    siblings = ["posts/hero.png", "posts/hero.w480.webp", "posts/hero2.w480.webp"]
+    assert variants_of("posts/hero.png", siblings) == ["posts/hero.w480.webp"]
+    assert variants_of("posts/hero.mdx", ["posts/hero.w480.webp"]) == []
+
+def test_variant_cache_round_trip(tmp_path):
+    cache = VariantCache(str(tmp_path))
+    key = cache.key(b"image", (480, 960), 80)
+    assert key != cache.key(b"image", (480,), 80)
+    assert cache.get(key) is None
+    cache.put(key, [(480, b"small"), (1200, b"")])
+    assert cache.get(key) == [(480, b"small"), (1200, b"")]
+
+def test_no_variants_for_text_or_when_disabled(monkeypatch):
+    assert asyncio.run(make_variants(b"# Title", "text/markdown")) == []
+    monkeypatch.setattr(config, "IMAGE_VARIANTS_ENABLED", False)
+    assert asyncio.run(make_variants(b"\x89PNG\r\n\x1a\n", "image/png")) == []
+
+def test_publish_variants_resizes_and_caches(tmp_path, monkeypatch):
+    data = png_bytes(1000, 500)
+    monkeypatch.setattr(config, "IMAGE_VARIANT_WIDTHS", (480, 1600))
+    backend = MemoryStorageBackend()
+    cache = VariantCache(str(tmp_path))
+    written = asyncio.run(publish_variants(backend, "posts/hero.png", data, "image/png", cache))
+    assert [path for path, _, _ in written] == ["posts/hero.w480.webp", "posts/hero.w1000.webp"]
+    assert all(variant[8:12] == b"WEBP" for _, variant, _ in written)
+
+    from PIL import Image
+    with Image.open(io.BytesIO(asyncio.run(backend.download("posts/hero.w480.webp")))) as small:
+        assert small.size == (480, 240)
+
+    # A second upload of the same image is served from the cache
+    import src.image_pipeline as image_pipeline
+    monkeypatch.setattr(image_pipeline, "worker_pool", lambda: pytest.fail("image was re-encoded"))
+    again = asyncio.run(publish_variants(backend, "posts/copy.png", data, "image/png", cache))
+    assert [variant for _, variant, _ in again] == [variant for _, variant, _ in written]
+
+def test_variant_cache_keeps_a_running_total(tmp_path):
+    cache = VariantCache(str(tmp_path), max_bytes=1000)
+    cache.put("aa1", [(480, b"x" * 300)])
+    cache.put("aa1", [(480, b"x" * 100)])
+    cache.put("bb2", [(480, b"y" * 300)])
+    assert cache.budget._total == 108 + 308  # aa1 replaced, not added
+    cache.put("cc3", [(480, b"z" * 700)])
+    assert cache.get("aa1") is None and cache.get("cc3") == [(480, b"z" * 700)]
+    assert cache.budget._total == sum(p.stat().st_size for p in tmp_path.rglob("*") if p.is_file())
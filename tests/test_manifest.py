@@ -0,0 +1,92 @@
+# Tests for manifest
+
+import asyncio
+import csv
+import json
+import pytest
+from src.manifest import checkpoint_path, decode_cursor, encode_cursor, export_manifest, walk_positions
+from src.storage_backend import MemoryStorageBackend
+
+OBJECTS = {f"posts/{i:03}.mdx": b"x" * i for i in range(30)}
+OBJECTS.update({f"posts/drafts/{i}.mdx": b"d" for i in range(5)})
+OBJECTS["images/a.png"] = b"png"
+
+def make_backend():
+    return MemoryStorageBackend(OBJECTS)
+
+class PagedBackend(MemoryStorageBackend):
+    """Records the largest page requested and can fail after a number of listings."""
+    def __init__(self, objects, fail_after=None):
+        super().__init__(objects)
+        self.largest = 0
+        self.fail_after = fail_after
+
+    async def list(self, prefix="", limit=1000, offset=0):
+        if self.fail_after is not None:
+            if self.fail_after == 0:
+                raise ConnectionError("listing failed")
+            self.fail_after -= 1
+        page = await super().list(prefix, limit, offset)
+        self.largest = max(self.largest, len(page))
+        return page
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_cursor_round_trips():
+    position = [(3, "posts"), (17, "a b.mdx")]
+    assert decode_cursor(encode_cursor(position)) == position
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+def test_export_lists_every_object_under_prefix(tmp_path):
+    out = str(tmp_path / "manifest.jsonl")
+    report = asyncio.run(export_manifest(make_backend(), out, prefix="posts", batch_size=7))
+    rows = read_jsonl(out)
+    assert report.rows == len(rows) == 35
+    assert rows[0]["path"] == "posts/000.mdx" and rows[0]["size"] == 0
+    assert rows[5]["url"] == "memory://mdx-files/object/public/posts/005.mdx"
+    assert rows[-1]["path"] == "posts/drafts/4.mdx"
+    assert not (tmp_path / "manifest.jsonl.cursor").exists()
+
+def test_walk_reads_one_page_at_a_time():
+    backend = PagedBackend({f"posts/{i}.mdx": b"x" for i in range(100)})
+
+    async def collect():
+        return [entry["name"] async for entry, _ in walk_positions(backend, "", page_size=8)]
+
+    assert len(asyncio.run(collect())) == 100
+    assert backend.largest <= 8
+
+def test_interrupted_export_resumes_without_duplicates(tmp_path):
+    out = str(tmp_path / "manifest.csv")
+    backend = PagedBackend(OBJECTS, fail_after=3)
+    with pytest.raises(ConnectionError):
+        asyncio.run(export_manifest(backend, out, batch_size=4))
+    state = json.load(open(checkpoint_path(out)))
+    assert state["rows"] > 0
+    backend.fail_after = None
+    report = asyncio.run(export_manifest(backend, out, resume=True, batch_size=4))
+    assert report.resumed
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row["path"] for row in rows) == sorted(OBJECTS)
+    assert report.rows == len(rows)
+    with open(out, encoding="utf-8") as f:
+        assert f.read().count("path,size") == 1
+
+def test_resume_skips_objects_deleted_since(tmp_path):
+    backend = make_backend()
+
+    async def positions():
+        return [(entry["name"], position) async for entry, position in walk_positions(backend, "posts")]
+
+    walked = asyncio.run(positions())
+    name, position = walked[9]
+    asyncio.run(backend.remove([name, walked[3][0]]))
+
+    async def rest():
+        return [entry["name"] async for entry, _ in walk_positions(backend, "posts", position)]
+
+    assert asyncio.run(rest()) == [n for n, _ in walked[10:]]
@@ -0,0 +1,89 @@
+# Tests for metrics
+
+import asyncio
+import pytest
+from src.metrics import Histogram, InstrumentedBackend, Metrics, timed
+from src.storage_backend import MemoryStorageBackend, StorageError
+
+def test_histogram_percentiles_and_buckets():
+    histogram = Histogram(window=100)
+    for ms in range(1, 101):
+        histogram.add(ms / 1000)
+    assert histogram.percentile(50) == 0.05
+    assert histogram.percentile(95) == 0.095
+    assert histogram.percentile(99) == 0.099
+    assert sum(histogram.buckets) == 100
+    assert Histogram(window=10).percentile(50) is None
+
+def test_histogram_window_keeps_recent_samples():
+    histogram = Histogram(window=3)
+    for seconds in (9.0, 1.0, 1.0, 1.0):
+        histogram.add(seconds)
+    assert histogram.percentile(99) == 1.0
+    assert histogram.count == 4
+    assert histogram.total == 12.0
+
+def test_span_records_bytes_and_errors():
+    metrics = Metrics()
+    with metrics.span("storage.download") as span:
+        span.bytes = 42
+    with pytest.raises(ValueError):
+        with metrics.span("storage.download"):
+            raise ValueError("boom")
+    summary = metrics.snapshot()["storage.download"]
+    assert summary["count"] == 2
+    assert summary["errors"] == 1
+    assert summary["bytes"] == 42
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+
+    @timed("ui.work", metrics)
+    def work():
+        return "done"
+
+    with metrics.span("storage.list") as span:
+        span.bytes = 10
+    assert work() == "done"
+    assert metrics.snapshot() == {}
+
+def test_timed_decorator():
+    metrics = Metrics()
+
+    @timed("ui.filter_files", metrics)
+    def filter_files(query):
+        return query.upper()
+
+    assert filter_files("abc") == "ABC"
+    assert metrics.snapshot()["ui.filter_files"]["count"] == 1
+
+def test_instrumented_backend():
+    metrics = Metrics()
+    backend = InstrumentedBackend(MemoryStorageBackend({"a.mdx": b"12345"}), metrics)
+
+    async def scenario():
+        await backend.upload("b.mdx", b"xyz")
+        await backend.download("a.mdx")
+        await backend.list("")
+        with pytest.raises(StorageError):
+            await backend.download("missing.mdx")
+
+    asyncio.run(scenario())
+    snapshot = metrics.snapshot()
+    assert backend.label == "memory"
+    assert snapshot["storage.upload"]["bytes"] == 3
+    assert snapshot["storage.download"]["bytes"] == 5
+    assert snapshot["storage.download"]["errors"] == 1
+    assert snapshot["storage.list"]["count"] == 1
+
+def test_prometheus_export():
+    metrics = Metrics()
+    metrics.record("storage.list", 0.003)
+    metrics.record("storage.list", 20.0, error=True)
+    text = metrics.to_prometheus(prefix="app")
+    assert '# TYPE app_span_seconds histogram' in text
+    assert 'app_span_seconds_bucket{span="storage.list",le="0.005"} 1' in text
+    assert 'app_span_seconds_bucket{span="storage.list",le="+Inf"} 2' in text
+    assert 'app_span_seconds_count{span="storage.list"} 2' in text
+    assert 'app_span_errors_total{span="storage.list"} 1' in text
+    assert '"storage.list"' in metrics.to_json()
@@ -0,0 +1,41 @@
+# Tests for paged_viewer
+
+import pytest
+from src.paged_viewer import PagedDocument, is_large_file, LARGE_FILE_THRESHOLD
+
+@pytest.fixture
+def make_document(tmp_path):
+    documents = []
+    def _make(data):
+        path = tmp_path / "doc.txt"
+        path.write_bytes(data)
+        doc = PagedDocument(str(path))
+        documents.append(doc)
+        return doc
+    yield _make
+    for doc in documents:
+        doc.close()
+
+def test_is_large_file():
+    assert not is_large_file(0)
+    assert not is_large_file(LARGE_FILE_THRESHOLD - 1)
+    assert is_large_file(LARGE_FILE_THRESHOLD)
+
+def test_read_lines_windows(make_document):
+    doc = make_document(b"".join(b"line %d\n" % i for i in range(10)))
+    assert doc.read_lines(0, 3) == ("line 0\nline 1\nline 2\n", 3)
+    assert doc.read_lines(8, 5) == ("line 8\nline 9\n", 2)
+    assert doc.read_lines(10, 5) == ("", 0)
+    assert doc.line_count == 10
+
+def test_last_line_without_newline(make_document):
+    doc = make_document("a\nb\nünïcode".encode("utf-8"))
+    assert doc.has_line(2)
+    assert not doc.has_line(3)
+    assert doc.read_lines(2, 1) == ("ünïcode", 1)
+    assert doc.line_count == 3
+
+def test_empty_document(make_document):
+    doc = make_document(b"")
+    assert doc.line_count == 0
+    assert doc.read_lines(0, 10) == ("", 0)
@@ -0,0 +1,94 @@
+# Tests for prefetch
+
+import asyncio
+from src.compression import ContentCache
+from src.file_store import FileEntry, FileStore
+from src.governor import GovernedBackend, RequestGovernor
+from src.prefetch import Prefetcher, siblings
+from src.storage_backend import MemoryStorageBackend
+
+class SlowBackend(MemoryStorageBackend):
+    def __init__(self, objects, delay=0.0):
+        super().__init__(objects)
+        self.delay = delay
+        self.downloads = []
+
+    async def download(self, path):
+        self.downloads.append(path)
+        await asyncio.sleep(self.delay)
+        return await super().download(path)
+
+def entries(backend):
+    return {path: FileEntry(path, size=len(obj.data), etag=obj.etag) for path, obj in backend._objects.items()}
+
+def test_siblings_after_then_before():
+    store = FileStore()
+    store.load([{"name": f"posts/{i}.mdx", "id": str(i)} for i in range(6)] + [{"name": "posts/sub", "id": None}])
+    assert [e.path for e in siblings(store, "posts/2.mdx", 4)] == [
+        "posts/3.mdx", "posts/4.mdx", "posts/5.mdx", "posts/1.mdx"]
+
+def test_round_fetches_within_budget_and_skips_cached(tmp_path):
+    backend = SlowBackend({f"posts/{i}.mdx": b"x" * 100 for i in range(6)})
+    cache = ContentCache(str(tmp_path))
+    listed = entries(backend)
+    cache.put(backend.label, "posts/0.mdx", listed["posts/0.mdx"].etag, b"x" * 100)
+    prefetcher = Prefetcher(cache, max_bytes=350, concurrency=2)
+    fetched = asyncio.run(prefetcher.run(backend, [listed[f"posts/{i}.mdx"] for i in range(6)]))
+    assert fetched == 3
+    assert sorted(backend.downloads) == ["posts/1.mdx", "posts/2.mdx", "posts/3.mdx"]
+    assert cache.get(backend.label, "posts/2.mdx", listed["posts/2.mdx"].etag) == b"x" * 100
+
+def test_cancelled_round_finishes_started_downloads_only(tmp_path):
+    backend = SlowBackend({f"posts/{i}.mdx": b"x" for i in range(6)}, delay=0.05)
+    cache = ContentCache(str(tmp_path))
+    listed = list(entries(backend).values())
+    prefetcher = Prefetcher(cache, concurrency=1)
+
+    async def scenario():
+        round_ = asyncio.ensure_future(prefetcher.run(backend, listed))
+        await asyncio.sleep(0.02)
+        round_.cancel()
+        # Opening the file being prefetched joins that download
+        await prefetcher.wait(backend.label, "posts/0.mdx")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert backend.downloads == ["posts/0.mdx"]
+    assert cache.has(backend.label, "posts/0.mdx", listed[0].etag)
+
+def test_prefetch_leaves_governor_slots_for_the_user(tmp_path):
+    raw = SlowBackend({f"posts/{i}.mdx": b"x" for i in range(4)}, delay=0.01)
+    governor = RequestGovernor(initial=2, minimum=1, maximum=2)
+    backend = GovernedBackend(raw, governor)
+    prefetcher = Prefetcher(ContentCache(str(tmp_path)), concurrency=4, reserved_slots=1)
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, governor.in_flight)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        watcher = asyncio.ensure_future(watch())
+        await prefetcher.run(backend, list(entries(raw).values()))
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert len(raw.downloads) == 4
+    assert peak == 1
+
+def test_failed_prefetch_leaves_the_open_to_a_normal_download(tmp_path):
+    backend = SlowBackend({"posts/a.mdx": b"not gzip"}, delay=0.05)
+    entry = entries(backend)["posts/a.mdx"]
+    entry.encoding = "gzip"  # listed as compressed, but the bytes do not decode
+    prefetcher = Prefetcher(ContentCache(str(tmp_path)))
+
+    async def scenario():
+        task = asyncio.ensure_future(prefetcher.fetch(backend, entry))
+        await asyncio.sleep(0)
+        await prefetcher.wait(backend.label, entry.path)
+        return await task
+
+    assert asyncio.run(scenario()) is False
+    assert prefetcher.metrics.snapshot()["prefetch.download"]["errors"] >= 1
@@ -0,0 +1,58 @@
+# Tests for profiling
+
+import os
+import pstats
+from src.async_bridge import AsyncBridge
+from src.profiling import ActionProfiler
+
+def busy_work():
+    return sum(len(str(i)) for i in range(20000))
+
+def test_unarmed_actions_are_not_profiled(tmp_path):
+    profiler = ActionProfiler(str(tmp_path))
+    assert not profiler.begin("refresh")
+    assert profiler.end("refresh") == []
+    assert os.listdir(tmp_path) == []
+
+def test_armed_action_writes_reports(tmp_path):
+    profiler = ActionProfiler(str(tmp_path))
+    profiler.arm("refresh")
+    assert profiler.begin("refresh")
+    assert profiler.active == "refresh"
+    # Another action cannot start or end the running session
+    assert not profiler.begin("search")
+    assert profiler.end("search") == []
+    busy_work()
+    paths = profiler.end("refresh")
+    assert profiler.active is None
+    assert [p.rsplit("-", 1)[1] for p in paths] == ["ui.pstats", "alloc.txt"]
+    stats = pstats.Stats(paths[0])
+    assert any(func[2] == "busy_work" for func in stats.stats)
+    with open(paths[1], encoding="utf-8") as f:
+        assert f.readline() == "Action: refresh\n"
+    # Arming is one-shot
+    assert not profiler.begin("refresh")
+
+def test_auto_mode_profiles_io_loop(tmp_path):
+    bridge = AsyncBridge()
+    try:
+        profiler = ActionProfiler(str(tmp_path), auto=True, loop=bridge.loop)
+
+        async def io_work():
+            return busy_work()
+
+        assert profiler.begin("upload")
+        bridge.run(io_work())
+        paths = profiler.end("upload")
+    finally:
+        bridge.close()
+    assert paths[1].endswith("-upload-io.pstats")
+    assert any(func[2] == "busy_work" for func in pstats.Stats(paths[1]).stats)
+
+def test_manual_start_stop(tmp_path):
+    profiler = ActionProfiler(str(tmp_path / "reports"))
+    assert profiler.stop() == []
+    assert profiler.start()
+    assert not profiler.start()
+    paths = profiler.stop()
+    assert len(paths) == 2 and all(os.path.exists(p) for p in paths)
@@ -0,0 +1,68 @@
+# Tests for references
+
+import asyncio
+from src.file_store import FileEntry
+from src.references import ReferenceGraph, extract_references, scan
+from src.storage_backend import MemoryStorageBackend
+
+ARTICLE = """import Chart from "./Chart.jsx"
+import { useState } from "react"
+
+![hero](./img/hero.png "Hero") [next](other.mdx) [site](/blog/route)
+[external](https://example.com/a.png) [anchor](#top)
+<img src="/images/a.jpg" srcSet="/images/a.w480.webp 480w, /images/a.w960.webp 960w" />
+<Video src={"memory://mdx-files/object/public/media/v.mp4?t=1"} />
+
+[ref]: ../shared/report%202024.pdf
+
+```mdx
+![in code](./not-a-link.png)
+```
+"""
+
+class CountingBackend(MemoryStorageBackend):
+    def __init__(self, objects):
+        super().__init__(objects)
+        self.downloads = []
+
+    async def download(self, path):
+        self.downloads.append(path)
+        return await super().download(path)
+
+def listing(backend):
+    return [FileEntry(path, etag=obj.etag) for path, obj in backend._objects.items()]
+
+def test_extract_resolves_links_images_and_imports():
+    assert extract_references(ARTICLE, "posts/2024/a.mdx", ("memory://mdx-files/object/public/",)) == [
+        "images/a.jpg", "images/a.w480.webp", "images/a.w960.webp", "media/v.mp4",
+        "posts/2024/Chart.jsx", "posts/2024/img/hero.png", "posts/2024/other.mdx", "posts/shared/report 2024.pdf",
+    ]
+
+def test_graph_tracks_referrers_broken_links_and_orphans():
+    graph = ReferenceGraph()
+    graph.update("posts/a.mdx", "e1", "![x](../images/a.png) [gone](/images/gone.png)")
+    graph.update("posts/b.mdx", "e2", "![c](/images/c.w480.webp)")
+    entries = [FileEntry(path) for path in (
+        "posts/a.mdx", "posts/b.mdx", "images/a.png", "images/c.png", "images/c.w480.webp",
+        "images/orphan.jpg", "images/.emptyFolderPlaceholder")]
+    assert graph.referrers("images/a.png") == ["posts/a.mdx"]
+    assert graph.broken({entry.path for entry in entries}) == [("posts/a.mdx", "images/gone.png")]
+    assert [entry.path for entry in graph.orphans(entries)] == ["images/orphan.jpg"]
+    graph.rename("posts/a.mdx", "posts/moved.mdx")
+    assert graph.referrers("images/a.png") == ["posts/moved.mdx"]
+    graph.forget(["posts/moved.mdx"])
+    assert graph.referrers("images/a.png") == []
+
+def test_scan_only_downloads_changed_articles(tmp_path):
+    backend = CountingBackend({"posts/a.mdx": b"![x](a.png)", "posts/b.mdx": b"[a](a.mdx)", "posts/a.png": b"png"})
+    graph = ReferenceGraph(str(tmp_path / "graph.json"))
+    report = asyncio.run(scan(backend, graph, listing(backend)))
+    assert report.scanned == 2 and sorted(backend.downloads) == ["posts/a.mdx", "posts/b.mdx"]
+
+    asyncio.run(backend.update("posts/b.mdx", b"no links"))
+    asyncio.run(backend.remove(["posts/a.mdx"]))
+    reloaded = ReferenceGraph(str(tmp_path / "graph.json"))
+    backend.downloads.clear()
+    asyncio.run(scan(backend, reloaded, listing(backend)))
+    assert backend.downloads == ["posts/b.mdx"]
+    assert reloaded.referrers("posts/a.png") == [] and reloaded.references("posts/b.mdx") == []
@@ -0,0 +1,80 @@
+# Tests for revisions
+
+import os
+from src.revisions import RevisionStore, apply_delta, diff_text, make_delta
+
+def article(n, extra=""):
+    return "".join(f"Paragraph {i} of a long enough article.\n" for i in range(n)).encode() + extra.encode()
+
+def test_delta_round_trips_text_and_binary():
+    old = article(50)
+    new = article(20) + b"inserted\n" + article(50)[len(article(30)):] + b"\xff\xfe no newline"
+    assert apply_delta(old, make_delta(old, new)) == new
+    assert apply_delta(b"", make_delta(b"", new)) == new
+
+def test_record_skips_unchanged_content_and_stores_deltas(tmp_path):
+    store = RevisionStore(str(tmp_path), keyframe_interval=3)
+    for n in range(1, 6):
+        store.record("bucket", "posts/a.mdx", article(100, f"edit {n}\n"), "saved")
+    store.record("bucket", "posts/a.mdx", article(100, "edit 5\n"), "loaded")
+    history = store.history("bucket", "posts/a.mdx")
+    assert [r["id"] for r in history] == [1, 2, 3, 4, 5]
+    assert [r["kind"] for r in history] == ["full", "delta", "delta", "full", "delta"]
+    assert history[1]["stored"] < history[0]["stored"]
+    for n, revision in enumerate(history, 1):
+        assert store.content("bucket", "posts/a.mdx", revision["id"]) == article(100, f"edit {n}\n")
+
+def test_old_revisions_are_pruned_without_breaking_deltas(tmp_path):
+    store = RevisionStore(str(tmp_path), max_revisions=3, keyframe_interval=10)
+    for n in range(1, 8):
+        store.record("bucket", "posts/a.mdx", article(100, f"edit {n}\n"), "saved")
+    history = store.history("bucket", "posts/a.mdx")
+    assert [r["id"] for r in history] == [5, 6, 7]
+    assert history[0]["kind"] == "full"
+    assert store.content("bucket", "posts/a.mdx", 6) == article(100, "edit 6\n")
+    blobs = sorted(os.listdir(store._dir("bucket", "posts/a.mdx")))
+    assert blobs == ["5.gz", "6.gz", "7.gz", "index.json"]
+
+def test_least_recently_changed_histories_are_dropped(tmp_path):
+    store = RevisionStore(str(tmp_path), max_bytes=1500)
+    store.record("bucket", "posts/old.mdx", os.urandom(1000), "loaded")
+    store.record("bucket", "posts/new.mdx", os.urandom(1000), "loaded")
+    assert store.history("bucket", "posts/old.mdx") == []
+    assert len(store.history("bucket", "posts/new.mdx")) == 1
+
+def test_recording_walks_the_histories_only_to_trim(tmp_path, monkeypatch):
+    import src.revisions as revisions
+    walks = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(revisions.os, "scandir", lambda path: walks.append(path) or real_scandir(path))
+    store = RevisionStore(str(tmp_path), max_bytes=20_000)
+    for n in range(20):
+        store.record("bucket", f"posts/{n}.mdx", article(10, f"edit {n}\n"), "loaded")
+    walked = len(walks)  # the starting total only
+    assert walked <= 2
+    store.record("bucket", "posts/big.mdx", os.urandom(15_000), "loaded")
+    assert len(walks) > walked
+    stored = sum(f.stat().st_size for f in tmp_path.rglob("*") if f.is_file())
+    assert stored <= 18_000 and store._total == stored
+    assert len(store.history("bucket", "posts/big.mdx")) == 1
+
+def test_history_follows_a_rename_and_diffs(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    store.record("bucket", "posts/a.mdx", b"one\ntwo\n", "loaded")
+    store.record("bucket", "posts/a.mdx", b"one\n2\n", "saved")
+    store.move("bucket", "posts/a.mdx", "posts/b.mdx")
+    assert store.history("bucket", "posts/a.mdx") == []
+    diff = store.diff("bucket", "posts/b.mdx", 1, 2)
+    assert "-two\n" in diff and "+2\n" in diff
+    assert store.diff("bucket", "posts/b.mdx", 2, current=b"one\n2\n") == ""
+    assert diff_text(b"a\n", b"b\n", "x", "y").startswith("--- x\n+++ y\n")
+
+def test_recent_lists_saved_files_of_a_bucket(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    store.record("bucket", "posts/viewed.mdx", b"a", "loaded")
+    store.record("bucket", "posts/old.mdx", b"a", "saved")
+    store.record("other", "posts/other.mdx", b"a", "saved")
+    store.record("bucket", "posts/new.mdx", b"a", "restored")
+    os.utime(store._dir("bucket", "posts/old.mdx"), (0, 0))
+    assert store.recent("bucket", 5) == ["posts/new.mdx", "posts/old.mdx"]
+    assert store.recent("bucket", 1) == ["posts/new.mdx"]
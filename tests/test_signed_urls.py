@@ -0,0 +1,68 @@
+# Tests for signed_urls
+
+import asyncio
+from src.signed_urls import SignedUrlCache
+from src.storage_backend import LocalFilesystemBackend, MemoryStorageBackend
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+class CountingBackend(MemoryStorageBackend):
+    def __init__(self, objects):
+        super().__init__(objects)
+        self.batches = []
+
+    async def signed_urls(self, paths, expires_in):
+        self.batches.append(list(paths))
+        return await super().signed_urls(paths, expires_in)
+
+def make_cache(count=10, **kwargs):
+    backend = CountingBackend({f"posts/{i}.mdx": b"x" for i in range(count)})
+    return backend, SignedUrlCache(backend, **kwargs)
+
+def test_fetch_signs_in_batches_and_reuses_cached_urls():
+    backend, cache = make_cache(10, expires_in=600, margin=60, batch_size=4)
+    paths = [f"posts/{i}.mdx" for i in range(10)]
+    urls = asyncio.run(cache.fetch(paths))
+    assert list(urls) == paths
+    assert all("/object/sign/" in url for url in urls.values())
+    assert [len(batch) for batch in backend.batches] == [4, 4, 2]
+    assert asyncio.run(cache.fetch(paths)) == urls
+    assert len(backend.batches) == 3
+
+def test_missing_objects_are_left_out():
+    backend, cache = make_cache(2)
+    seen = []
+    urls = asyncio.run(cache.fetch(["posts/0.mdx", "posts/gone.mdx"], on_batch=seen.append))
+    assert list(urls) == ["posts/0.mdx"]
+    assert list(seen[0]) == ["posts/0.mdx"]
+    assert cache.stale(["posts/0.mdx", "posts/gone.mdx"]) == ["posts/gone.mdx"]
+
+def test_urls_go_stale_before_they_expire():
+    clock = Clock()
+    backend, cache = make_cache(3, expires_in=600, margin=60, clock=clock)
+    asyncio.run(cache.fetch(["posts/0.mdx", "posts/1.mdx"]))
+    assert cache.next_refresh() == 540
+    clock.now += 539
+    assert cache.get("posts/0.mdx") is not None
+    clock.now += 1
+    assert cache.get("posts/0.mdx") is None
+    assert cache.next_refresh() == 0
+    asyncio.run(cache.fetch(["posts/0.mdx", "posts/1.mdx", "posts/2.mdx"]))
+    assert backend.batches[-1] == ["posts/0.mdx", "posts/1.mdx", "posts/2.mdx"]
+
+def test_forget_drops_urls():
+    backend, cache = make_cache(1)
+    asyncio.run(cache.fetch(["posts/0.mdx"]))
+    cache.forget(["posts/0.mdx"])
+    assert cache.get("posts/0.mdx") is None
+    assert cache.next_refresh() is None
+
+def test_local_backend_signs_existing_files(tmp_path):
+    backend = LocalFilesystemBackend(str(tmp_path))
+    asyncio.run(backend.upload("posts/a.mdx", b"a"))
+    urls = asyncio.run(backend.signed_urls(["posts/a.mdx", "posts/b.mdx"], 60))
+    assert list(urls) == ["posts/a.mdx"] and urls["posts/a.mdx"].startswith("file://")
@@ -0,0 +1,43 @@
+# Tests for startup
+
+import io
+import sys
+import pytest
+from src.metrics import Metrics
+from src.startup import ImportTimer, StartupMetrics
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    (tmp_path / "startup_outer.py").write_text("import time\nimport startup_inner\ntime.sleep(0.01)\n")
+    (tmp_path / "startup_inner.py").write_text("import time\ntime.sleep(0.02)\nVALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ("startup_outer", "startup_inner"):
+        sys.modules.pop(name, None)
+
+def test_import_timer_records_self_and_cumulative(modules):
+    timer = ImportTimer().install()
+    try:
+        import startup_outer
+    finally:
+        timer.uninstall()
+    records = {name: (own, cumulative, depth) for name, own, cumulative, depth in timer.records}
+    outer, inner = records["startup_outer"], records["startup_inner"]
+    assert inner[2] == outer[2] + 1
+    assert outer[1] >= inner[1] >= 0.02
+    assert outer[0] == pytest.approx(outer[1] - inner[1])
+    # The real loader is restored once the module has run
+    assert type(startup_outer.__loader__).__name__ == "SourceFileLoader"
+    assert timer not in sys.meta_path
+    assert "startup_inner" in timer.report()
+
+def test_startup_metrics_report_once():
+    metrics = Metrics()
+    stream = io.StringIO()
+    startup = StartupMetrics(metrics=metrics, stream=stream)
+    startup.mark("window")
+    startup.finish("first_listing")
+    startup.finish("first_listing")
+    assert [phase for phase, _ in startup.phases] == ["window", "first_listing"]
+    assert stream.getvalue().count("Startup:") == 1
+    assert set(metrics.snapshot()) == {"startup.window", "startup.first_listing"}
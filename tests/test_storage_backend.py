@@ -0,0 +1,206 @@
+# Tests for storage_backend
+
+import asyncio
+import io
+
+import httpx
+import pytest
+from src.storage_backend import (
+    LocalFilesystemBackend, MemoryStorageBackend, SimulatedConditions, StorageBackend,
+    StorageError, stream_download, walk, _translate_error,
+)
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def collect(aiter):
+    return [item async for item in aiter]
+
+@pytest.fixture(params=["memory", "local"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStorageBackend()
+    return LocalFilesystemBackend(str(tmp_path / "bucket"))
+
+def test_backends_implement_protocol(backend):
+    assert isinstance(backend, StorageBackend)
+
+def test_crud_round_trip(backend):
+    async def scenario():
+        await backend.upload("posts/a.mdx", b"# A")
+        with pytest.raises(StorageError) as exists:
+            await backend.upload("posts/a.mdx", b"again")
+        assert exists.value.already_exists
+        await backend.update("posts/a.mdx", b"# A2")
+        assert await backend.download("posts/a.mdx") == b"# A2"
+        await backend.copy("posts/a.mdx", "posts/b.mdx")
+        await backend.move("posts/a.mdx", "drafts/a.mdx")
+        with pytest.raises(StorageError) as missing:
+            await backend.download("posts/a.mdx")
+        assert missing.value.not_found
+        removed = await backend.remove(["posts/b.mdx", "posts/missing.mdx"])
+        assert [r["name"] for r in removed] == ["posts/b.mdx"]
+        return await collect(walk(backend, include_folders=True))
+    entries = run(scenario())
+    assert [(e["name"], e["id"] is None) for e in entries] == [("drafts", True), ("drafts/a.mdx", False)]
+    assert entries[1]["metadata"]["size"] == 4
+
+def test_update_missing_object_fails(backend):
+    with pytest.raises(StorageError) as error:
+        run(backend.update("nope.mdx", b""))
+    assert error.value.not_found
+
+def test_list_is_one_level_and_paginated(backend):
+    async def scenario():
+        for i in range(5):
+            await backend.upload(f"posts/{i}.mdx", b"x")
+        await backend.upload("root.mdx", b"x")
+        root = await backend.list("")
+        first = await backend.list("posts", limit=2, offset=0)
+        last = await backend.list("posts", limit=2, offset=4)
+        return root, first, last
+    root, first, last = run(scenario())
+    assert [(e["name"], e["id"] is None) for e in root] == [("posts", True), ("root.mdx", False)]
+    assert [e["name"] for e in first] == ["0.mdx", "1.mdx"]
+    assert [e["name"] for e in last] == ["4.mdx"]
+
+def test_walk_pages_through_large_folders():
+    backend = MemoryStorageBackend({f"logs/{i:03}.log": b"x" for i in range(25)})
+    names = run(collect(walk(backend, "logs", page_size=10)))
+    assert [e["name"] for e in names] == [f"logs/{i:03}.log" for i in range(25)]
+
+def test_download_to_writes_stream(backend):
+    async def scenario():
+        await backend.upload("big.log", b"0123456789")
+        dest = io.BytesIO()
+        written = await backend.download_to("big.log", dest)
+        return written, dest.getvalue()
+    assert run(scenario()) == (10, b"0123456789")
+
+def test_invalid_paths_rejected(backend):
+    with pytest.raises(StorageError):
+        run(backend.upload("../escape.mdx", b"x"))
+    with pytest.raises(StorageError):
+        run(backend.upload("/absolute.mdx", b"x"))
+
+def test_memory_prunes_empty_folders():
+    backend = MemoryStorageBackend({"a/b/c.mdx": b"x"})
+    run(backend.remove(["a/b/c.mdx"]))
+    assert run(backend.list("")) == []
+
+def test_simulated_failures_and_latency():
+    conditions = SimulatedConditions(latency=0.01, failure_rate=1.0, seed=1)
+    backend = MemoryStorageBackend({"a.mdx": b"x"}, conditions=conditions)
+    with pytest.raises(StorageError) as error:
+        run(backend.download("a.mdx"))
+    assert error.value.status == 503
+
+def test_translate_storage_api_error_keeps_status_and_retry_after():
+    from storage3.exceptions import StorageApiError
+    request = httpx.Request("GET", "https://example.test")
+    response = httpx.Response(429, headers={"retry-after": "7"}, request=request)
+    try:
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            raise StorageApiError("Too many requests", "TooManyRequests", 429) from exc
+    except StorageApiError as e:
+        translated = _translate_error(e)
+    assert isinstance(translated, StorageError)
+    assert translated.status == 429
+    assert translated.retry_after == 7.0
+
+def test_stream_download_resumes_with_range():
+    body = b"x" * 1000 + b"y" * 1000
+    requests = []
+
+    class DroppingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield body[:1000]
+            raise httpx.ReadError("connection dropped")
+
+    def handler(request):
+        requests.append(request.headers.get("range"))
+        if "range" in request.headers:
+            start = int(request.headers["range"].split("=")[1].rstrip("-"))
+            return httpx.Response(206, content=body[start:])
+        return httpx.Response(200, headers={"accept-ranges": "bytes"}, stream=DroppingStream())
+
+    dest = io.BytesIO()
+    async def download():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await stream_download(client, "https://example.test/object/b/big.log", {}, dest)
+
+    written = asyncio.run(download())
+
+    assert requests == [None, "bytes=1000-"]
+    assert dest.getvalue() == body
+    assert written == len(body)
+
+def test_stream_download_without_range_support_raises():
+    class DroppingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"partial"
+            raise httpx.ReadError("connection dropped")
+
+    def handler(request):
+        return httpx.Response(200, stream=DroppingStream())
+
+    async def download():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await stream_download(client, "https://example.test/object/b/big.log", {}, io.BytesIO())
+
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(download())
+
+def test_supabase_backend_translates_errors():
+    from storage3 import AsyncStorageClient
+    from src.storage_backend import SupabaseStorageBackend
+
+    def handler(request):
+        return httpx.Response(400, json={"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            storage = AsyncStorageClient("https://example.test/storage/v1/", {}, http_client=http_client)
+            backend = SupabaseStorageBackend(storage.from_("mdx-files"))
+            with pytest.raises(StorageError) as error:
+                await backend.upload("posts/a.mdx", b"x")
+            return error.value
+
+    error = run(scenario())
+    assert error.already_exists and error.status == 409
+
+def test_supabase_backend_labels_compressed_objects():
+    from storage3 import AsyncStorageClient
+    from src.storage_backend import SupabaseStorageBackend
+    requests = []
+    listing = [
+        {"name": "a.mdx", "id": "1", "metadata": {"mimetype": "application/gzip"},
+         "user_metadata": {"contentEncoding": "gzip", "contentType": "text/markdown"}},
+        {"name": "b.mdx", "id": "2", "metadata": {"mimetype": "application/zstd"}},
+        {"name": "logo.svgz", "id": "3", "metadata": {"mimetype": "image/svg+xml"}, "user_metadata": None},
+    ]
+
+    def handler(request):
+        requests.append(request)
+        if "/object/list/" in request.url.path:
+            return httpx.Response(200, json=listing)
+        return httpx.Response(200, json={"Key": "mdx-files/posts/a.mdx"})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            storage = AsyncStorageClient("https://example.test/storage/v1/", {}, http_client=http_client)
+            backend = SupabaseStorageBackend(storage.from_("mdx-files"))
+            await backend.upload("posts/a.mdx", b"\x1f\x8b", "text/markdown", content_encoding="gzip",
+                                 cache_control="max-age=300, immutable")
+            return await backend.list("posts")
+
+    entries = run(scenario())
+    body = requests[0].read()
+    # Storage does not keep a Content-Encoding, so the URL serves a gzip file, labelled as one
+    assert "content-encoding" not in requests[0].headers
+    assert b"Content-Type: application/gzip" in body
+    assert b'{"contentEncoding": "gzip", "contentType": "text/markdown"}' in body
+    assert b"300, immutable" in body
+    assert [e["metadata"]["contentEncoding"] for e in entries] == ["gzip", "zstd", None]
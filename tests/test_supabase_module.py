@@ -10,3 +10,41 @@ def test_is_supabase_url():
     assert is_supabase_url('https://xyzcompany.supabase.co')
     assert not is_supabase_url('http://example.com')
     assert not is_supabase_url('https://example.com')
+
+from src import config
+from src.supabase_module import create_async_supabase_client, create_http_client, http2_available
+
+def test_create_http_client_uses_pool_settings(monkeypatch):
+    monkeypatch.setattr(config, 'STORAGE_POOL_MAX_CONNECTIONS', 7)
+    monkeypatch.setattr(config, 'STORAGE_POOL_MAX_KEEPALIVE', 3)
+    monkeypatch.setattr(config, 'STORAGE_READ_TIMEOUT', 12.5)
+    with create_http_client() as client:
+        pool = client._transport._pool
+        assert pool._max_connections == 7
+        assert pool._max_keepalive_connections == 3
+        assert pool._http2 == http2_available()
+        assert client.timeout.read == 12.5
+
+def test_http2_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(config, 'STORAGE_HTTP2', False)
+    with create_http_client() as client:
+        assert not client._transport._pool._http2
+
+def test_storage_reuses_shared_http_client():
+    import asyncio
+
+    async def scenario():
+        async with create_http_client(asynchronous=True) as http_client:
+            client = await create_async_supabase_client('https://xyzcompany.supabase.co', 'anon-key', http_client)
+            return client.storage.from_('mdx-files')._client is http_client
+
+    assert asyncio.run(scenario())
+
+def test_async_http_client_uses_pool_settings(monkeypatch):
+    import asyncio
+    import httpx
+    monkeypatch.setattr(config, 'STORAGE_POOL_MAX_CONNECTIONS', 9)
+    client = create_http_client(asynchronous=True)
+    assert isinstance(client, httpx.AsyncClient)
+    assert client._transport._pool._max_connections == 9
+    asyncio.run(client.aclose())
@@ -0,0 +1,107 @@
+# Tests for ui_dispatcher
+
+import threading
+
+from src.ui_dispatcher import UIDispatcher
+
+class FakeClock:
+    """Advances by `step` seconds every time it is read."""
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+def test_posts_run_in_order():
+    ui = UIDispatcher()
+    calls = []
+    for i in range(5):
+        ui.post(calls.append, i)
+    assert ui.tick() is False
+    assert calls == [0, 1, 2, 3, 4]
+
+def test_coalesce_keeps_latest_update_per_key():
+    ui = UIDispatcher()
+    shown = []
+    for i in range(1000):
+        ui.coalesce("status", shown.append, f"status {i}")
+    ui.coalesce("progress", shown.append, "progress")
+    ui.tick()
+    assert shown == ["status 999", "progress"]
+
+def test_budget_spreads_work_across_ticks():
+    # Every clock read costs 1ms against a 8ms budget
+    ui = UIDispatcher(budget_ms=8, clock=FakeClock(0.001))
+    calls = []
+    for i in range(20):
+        ui.post(calls.append, i)
+    assert ui.tick() is True
+    first_batch = len(calls)
+    assert 0 < first_batch < 20
+    while ui.tick():
+        pass
+    assert calls == list(range(20))
+
+def test_incremental_job_reports_progress_and_completion():
+    ui = UIDispatcher(budget_ms=10, clock=FakeClock(0.001))
+    inserted, progress, done = [], [], []
+    ui.run_incremental(range(50), inserted.append, on_progress=progress.append, on_done=lambda: done.append(True))
+    ticks = 1
+    while ui.tick():
+        ticks += 1
+    assert inserted == list(range(50))
+    assert ticks > 1
+    assert progress == sorted(progress) and progress[-1] == 50
+    assert done == [True]
+
+def test_cancelled_job_stops_without_completing():
+    ui = UIDispatcher(budget_ms=5, clock=FakeClock(0.001))
+    inserted, done = [], []
+    job = ui.run_incremental(range(100), inserted.append, on_done=lambda: done.append(True))
+    ui.tick()
+    job.cancel()
+    while ui.tick():
+        pass
+    assert len(inserted) < 100
+    assert done == []
+
+def test_post_is_thread_safe():
+    ui = UIDispatcher()
+    calls = []
+    threads = [threading.Thread(target=lambda: [ui.post(calls.append, 1) for _ in range(500)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    while ui.tick():
+        pass
+    assert len(calls) == 2000
+
+def test_failing_callback_is_reported_and_later_work_runs():
+    class Root:
+        def __init__(self):
+            self.errors, self.scheduled = [], []
+        def report_callback_exception(self, exc_type, value, tb):
+            self.errors.append(value)
+        def after(self, ms, callback):
+            self.scheduled.append(callback)
+
+    def fail(_):
+        raise RuntimeError("boom")
+
+    ui = UIDispatcher()
+    root = Root()
+    calls = []
+    ui.post(calls.append, 1)
+    ui.post(fail, 2)
+    ui.post(calls.append, 3)
+    ui.coalesce("status", fail, "status")
+    ui.coalesce("progress", calls.append, "progress")
+    ui.attach(root)
+    assert calls == [1, 3, "progress"]
+    assert [str(e) for e in root.errors] == ["boom", "boom"]
+    # The next frame is still scheduled, and later posts run on it
+    ui.post(calls.append, 4)
+    root.scheduled[-1]()
+    assert calls[-1] == 4
@@ -0,0 +1,58 @@
+# Tests for workspace
+
+import asyncio
+from src import config
+from src.storage_backend import open_backend
+from src.workspace import Workspaces, project_settings
+
+SECRETS = {
+    "supabase_url": "https://legacy.supabase.co",
+    "firestore_key": "legacy-key",
+    "projects": {
+        "staging": {"supabase_url": "https://staging.supabase.co", "firestore_key": "s-key",
+                    "buckets": ["mdx-files", "drafts"]},
+        "production": {"supabase_url": "https://prod.supabase.co", "firestore_key": "p-key"},
+    },
+}
+
+def test_project_settings_keeps_top_level_credentials_as_default():
+    projects = project_settings(SECRETS)
+    assert list(projects) == ["default", "staging", "production"]
+    assert projects["default"]["buckets"] == list(config.STORAGE_BUCKETS)
+    assert projects["staging"]["buckets"] == ["mdx-files", "drafts"]
+    assert project_settings({"supabase_url": "https://a.supabase.co"})["default"]["firestore_key"] is None
+
+def test_buckets_of_a_project_share_client_and_governor():
+    workspaces = Workspaces.configured("supabase", SECRETS)
+    titles = [workspace.title for workspace in workspaces.items]
+    assert titles == ["default / mdx-files", "staging / mdx-files", "staging / drafts", "production / mdx-files"]
+
+    async def run():
+        return [await workspaces.open(workspace) for workspace in workspaces.items]
+
+    default, staging, drafts, production = asyncio.run(run())
+    assert staging.governor is drafts.governor
+    assert staging.governor is not production.governor
+    assert staging.bucket._client is drafts.bucket._client
+    assert staging.bucket._client is not production.bucket._client
+    assert (default.label, drafts.label) == ("mdx-files", "staging:drafts")
+
+def test_workspaces_keep_separate_state(monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_BUCKETS", ("mdx-files", "drafts"))
+    workspaces = Workspaces.configured("memory")
+    first, second = workspaces.items
+    asyncio.run(workspaces.open(first))
+    assert first.opened and not second.opened
+    assert first.backend.label == "memory"
+    assert first.store is not second.store
+    assert first.content_cache.directory != second.content_cache.directory
+    asyncio.run(workspaces.open(second))
+    assert second.backend.label == "memory:drafts"
+    assert asyncio.run(workspaces.open(second)) is second.backend
+
+def test_local_buckets_live_next_to_the_default_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_STORAGE_ROOT", str(tmp_path / "store"))
+    default = asyncio.run(open_backend("local"))
+    drafts = asyncio.run(open_backend("local", "drafts"))
+    assert default.root == str(tmp_path / "store")
+    assert drafts.root == str(tmp_path / "store-drafts")